@@ -0,0 +1,44 @@
+"""
+format_values 与逐行 process_value_to_str 的耗时对比
+
+运行: python benchmarks/bench_format_values.py [行数]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'libre_automate_py'))
+from myutil import format_values, process_value_to_str  # noqa: E402
+
+
+def make_data(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    numbers = rng.normal(0, 1e6, n)
+    types = rng.choice(['', '增减值', '/10000', '*100', '+10', '-5', '/3'], n)
+    values = [f"{x:.4f}" if i % 7 else ('文本' if i % 2 else '') for i, x in enumerate(numbers)]
+    return pd.DataFrame({'type': types, 'value': values})
+
+
+def main(n: int = 100000) -> None:
+    df = make_data(n)
+
+    start = time.perf_counter()
+    expected = df.apply(process_value_to_str, axis=1)
+    row_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = format_values(df, 'value', 'type', 2)
+    vec_time = time.perf_counter() - start
+
+    assert (expected == result).all()
+    print(f"rows: {n}")
+    print(f"df.apply(process_value_to_str): {row_time:.3f}s")
+    print(f"format_values:                  {vec_time:.3f}s")
+    print(f"speedup: {row_time / vec_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -1,8 +1,7 @@
 from workbook import Workbook
 from word import Word
-from myutil import array2df, process_value_to_str
+from myutil import array2df, format_values
 import pandas as pd
-from typing import Sequence
 import os
 import shutil
 from officeLoader import OfficeLoader
@@ -12,7 +11,7 @@ if __name__ == '__main__':
     wb = Workbook(read_only=True, filepath=rf"{data_path}\data.xls", visible=False)
     data = wb.get_used_value(0, range_name='A1:C121')
     df = array2df(data)
-    processed_values = df.apply(process_value_to_str, axis=1)
+    processed_values = format_values(df, 'value', 'type')
 
     wb.close()
     date_str = "2025年3月"
@@ -22,10 +21,12 @@ if __name__ == '__main__':
         shutil.copy2(template_file, result_file)
     word = Word(read_only=False, filepath=result_file, visible=True)
     df['label'] = df['label'].apply(lambda x: f"$({x})" if pd.notna(x) and x != '' else x)
-    labels_list: Sequence[str] = df['label'].tolist()
-    values_list: Sequence[str] = processed_values.tolist()
+    mapping = dict(zip(df['label'], processed_values))
 
-    word.replace_words(labels_list, values_list)
+    # 模板每月相同，占位符索引按模板内容缓存在模板目录中
+    index_dir = os.path.join(os.path.dirname(template_file), '.placeholder_index')
+    replaced, missing, unmatched = word.fill_placeholders(mapping, cache_dir=index_dir)
+    print(f"replaced {replaced}, labels missing from data: {missing}, unmatched labels: {unmatched}")
    # Word.save()
     office_loader = OfficeLoader()
     office_loader.close()
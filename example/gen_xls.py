@@ -1,4 +1,3 @@
-import shutil
 import os
 
 from numpy.f2py.auxfuncs import throw_error
@@ -6,24 +5,74 @@ from numpy.f2py.auxfuncs import throw_error
 from workbook import Workbook
 from myutil import *
 from officeLoader import OfficeLoader
+from manifest import BuildManifest
+from dataset_cache import DatasetCache
+from source_cache import SourceCache
 from ooodev.utils.data_type.range_obj import RangeObj
 from ooodev.format.calc.direct.cell.borders import Side
 from ooodev.formatters.formatter_table import FormatterTable, FormatTableItem
 
 
+# 各数据源必须包含的列，加载前先只读表头检查
+SOURCE_COLUMNS = {
+    '借新还旧汇总.xlsx': ['贷款发放行名称', '贷款笔数', '发放金额', '贷款余额'],
+    '借新还旧明细.xlsx': ['贷款发放行名称', '贷款客户名称', '借新还旧次数', '发放日期', '到期日期',
+                     '发放金额', '贷款余额', '欠本天数', '欠息天数', '五级分类', '贷款发放类型'],
+    '逾期贷款.xlsx': ['贷款发放行名称', '贷款客户名称', '发放日期', '到期日期', '发放金额',
+                  '贷款余额', '欠本天数', '欠息天数', '五级分类', '贷款发放类型'],
+    '借新还旧.xlsx': ['上报时间', '贷款发放行名称', '贷款客户名称', '贷款发放类型', '发放日期', '到期日期',
+                  '发放金额', '贷款余额', '五级分类', '欠本天数', '欠息天数'],
+    '多头授信.xlsx': ['CUSTOMERNAME', 'BANKNAME', 'COUNT_CREDIT', 'STARTDATE', 'DUEDATE', 'LOANBALANCE',
+                  'CUSTOMER_LOANBALANCE', 'FIVECLASSIFY'],
+    '五级分类.xlsx': ['客户名称', '贷款发放行', '发放日期', '到期日期', '发放金额', '贷款余额', '贷款余额小计', '五级分类'],
+    '前20大客户.xlsx': ['贷款客户名称', '发放机构', '发放金额', '贷款余额明细', '客户贷款余额', '贷款余额', '五级分类'],
+    '前20大关注.xlsx': ['贷款客户名称', '贷款发放机构', '发放日期', '到期日期', '发放金额', '贷款余额明细',
+                    '客户贷款余额', '贷款余额'],
+    '前20大不良.xlsx': ['贷款客户名称', '发放机构', '发放金额', '贷款余额明细', '客户贷款余额',
+                    '全部对公客户不良贷款余额', '五级分类'],
+    '煤炭企业.xlsx': ['贷款客户名称', '机构名称', '发放日期', '到期日期', '发放金额', '客户贷款余额', '贷款余额', '五级分类'],
+    '科技型企业.xlsx': ['贷款客户名称', '机构名称', '发放日期', '到期日期', '发放金额', '贷款余额', '五级分类'],
+    '高新企业.xlsx': ['贷款客户名称', '机构名称', '发放日期', '到期日期', '发放金额', '贷款余额', '五级分类'],
+}
+
+
 def foo():
     wb_src = Workbook(read_only=True, filepath=r"F:\客户风险\数据\2024年11月重点客户风险排查情况表.xlsx", visible=False)
     sheet1_props = wb_src.doc.sheets[0].get_custom_properties()
 
 
+# 同一数据源（如 借新还旧.xlsx）可能供多张报表使用，解析结果放入共享内存，只读取一次
+dataset_cache = DatasetCache()
+# 磁盘列式缓存，需要安装 pyarrow，在 main() 中按结果目录初始化
+source_cache = None
+
+
+def load_source(src_file: str) -> pd.DataFrame:
+    def read():
+        print(f"open workbook {src_file}")
+        src_wb = Workbook(read_only=True, filepath=src_file, visible=False)
+        try:
+            # 同名数据源每月结构相同，按文件名缓存推断出的列类型
+            return array2df(src_wb.get_used_value(0, as_grid=True), source=os.path.basename(src_file))
+        finally:
+            src_wb.close()
+
+    def read_cached():
+        # 磁盘缓存命中时不再经过 soffice
+        if source_cache is None:
+            return read()
+        return source_cache.load(src_file, read, sheet_n=0, header='auto')
+
+    key = f"{os.path.abspath(src_file)}:{os.stat(src_file).st_mtime_ns}"
+    return dataset_cache.get_or_load(key, read_cached)
+
+
 def gen_xls(src_file: str, tgt_wb: Workbook, sheet_n, data_cell_name: str, date_str: str = None,
             date_cell_name: str = None,
             order: [] = None,
             sum_cells_list: [] = None, merge_list: [] = None, merge_idx_name: str = None,
             idx_row: int = None) -> None:
-    print("open workbook")
-    src_wb = Workbook(read_only=True, filepath=src_file, visible=False)
-    data = array2df(src_wb.get_used_value(0))
+    data = load_source(src_file)
     if order is not None:
         data = reorder_dataframe_columns(data, order)
 
@@ -34,7 +83,6 @@ def gen_xls(src_file: str, tgt_wb: Workbook, sheet_n, data_cell_name: str, date_
         if idx_row is not None:
             data.insert(idx_row, 'merge_index', merge_index)
 
-    src_wb.close()
     print("copy data")
     tgt_wb.set_pandas_range(data, sheet_n, data_cell_name)
     if date_str is not None or date_cell_name is not None:
@@ -47,9 +95,15 @@ def gen_xls(src_file: str, tgt_wb: Workbook, sheet_n, data_cell_name: str, date_
             tgt_wb.merge_same_cells(sheet_n, cell, merge_index)
 
     if sum_cells_list is not None:
-        for cell in sum_cells_list:
-            print(f"sum {sum_cells_list}")
-            tgt_wb.sum_col(sheet_n, cell)
+        print(f"sum {sum_cells_list}")
+        tgt_wb.sum_cols(sheet_n, sum_cells_list)
+
+
+def open_result(template_file: str, result_file: str, visible: bool = True) -> Workbook:
+    # 已有结果文件时直接打开，否则从内存中的模板克隆，save() 时才写盘
+    if os.path.exists(result_file):
+        return Workbook(read_only=False, filepath=result_file, visible=visible)
+    return Workbook.from_template(template_file, filepath=result_file, visible=visible)
 
 
 def key_customers(template_path: str, data_path: str, result_path: str, date_str: str) -> None:
@@ -65,9 +119,7 @@ def key_customers(template_path: str, data_path: str, result_path: str, date_str
          '贷款余额', '欠本天数', '欠息天数', '五级分类', '贷款发放类型']
     ]
     result_file = os.path.join(result_path, f"{date_str}重点客户风险排查情况表.xlsx")
-    if not os.path.exists(result_file):
-        shutil.copy2(template_file, result_file)
-    wb_tgt = Workbook(read_only=False, filepath=result_file, visible=True)
+    wb_tgt = open_result(template_file, result_file, visible=True)
     data = [
         [src_list[0], wb_tgt, 0, 'A5', date_str, 'A2', orders[0], ['B4', 'C4', 'D4'], None],
         [src_list[1], wb_tgt, 1, 'A4', date_str, 'A2', orders[1], None, ['A4'], '贷款发放行名称'],
@@ -92,9 +144,7 @@ def covering_up_asset_quality(template_path: str, data_path: str, result_path: s
     ]
 
     result_file = os.path.join(result_path, f"{date_str}疑似掩盖资产质量贷款台账.xlsx")
-    if not os.path.exists(result_file):
-        shutil.copy2(template_file, result_file)
-    wb_tgt = Workbook(read_only=False, filepath=result_file, visible=True)
+    wb_tgt = open_result(template_file, result_file, visible=True)
     data = [
         [src_path, wb_tgt, 0, 'A5', date_str, 'A2', orders[0], ['F4', 'G4'], ['A5', 'B5']],
         [src_path, wb_tgt, 1, 'A4', date_str, 'A2', orders[1], None, None],
@@ -126,9 +176,7 @@ def bank_data_tables(template_path: str, data_path: str, result_path: str, date_
         ['贷款客户名称', '机构名称', '发放日期', '到期日期', '发放金额', '客户贷款余额', '贷款余额', '五级分类']
     ]
     result_file = os.path.join(result_path, f"{date_str}昭通市银行业对公客户贷款相关台账.xlsx")
-    if not os.path.exists(result_file):
-        shutil.copy2(template_file, result_file)
-    wb_tgt = Workbook(read_only=False, filepath=result_file, visible=visible)
+    wb_tgt = open_result(template_file, result_file, visible=visible)
     # src_file tgt_wb sheet_n, data_cell_name date_str date_cell_name orde sum_cells_list merge_list merge_idx_name    idx_row:
     data = [
         [src_list[0], wb_tgt, 0, 'A5', date_str, 'A2', orders[0], ['G4'], ['A5', 'B5', 'C5', 'D5', 'H5'], orders[0][0],
@@ -198,9 +246,7 @@ def tech_companies(template_path: str, data_path: str, result_path: str, date_st
         ['贷款客户名称', '机构名称', '发放日期', '到期日期', '发放金额', '贷款余额', '五级分类'],
     ]
     result_file = os.path.join(result_path, f"{date_str}昭通市科技型企业和高新企业贷款相关台账.xlsx")
-    if not os.path.exists(result_file):
-        shutil.copy2(template_file, result_file)
-    wb_tgt = Workbook(read_only=False, filepath=result_file, visible=visible)
+    wb_tgt = open_result(template_file, result_file, visible=visible)
     data = [
         [src_list[0], wb_tgt, 0, 'A5', date_str, 'A2', orders[0], ['E4', 'F4'], ['A5', 'B5'], orders[0][0], None],
         [src_list[1], wb_tgt, 1, 'A5', date_str, 'A2', orders[1], ['E4', 'F4'], ['A5', 'B5'], orders[1][0], None], ]
@@ -243,13 +289,46 @@ def main():
     if not check_result['all_exist']:
         raise FileNotFoundError(f"部分文件不存在")
 
-    key_customers(template_path, data_path, result_path, date_str)
-
-    covering_up_asset_quality(template_path, data_path, result_path, date_str)
-    bank_data_tables(template_path, data_path, result_path, date_str)
-    tech_companies(template_path, data_path, result_path, date_str)
-    office_loader = OfficeLoader()
-    office_loader.close()
+    # 一次性报告所有数据源的列名问题，避免处理到中途才发现
+    probe_schema([os.path.join(data_path, x) for x in src_files],
+                 {os.path.join(data_path, x): SOURCE_COLUMNS[x] for x in src_files})
+
+    global source_cache
+    try:
+        source_cache = SourceCache(os.path.join(result_path, '.source_cache'))
+    except ImportError:
+        source_cache = None
+
+    schema_cache = os.path.join(result_path, 'schema_cache.json')
+    load_schema_cache(schema_cache)
+
+    # 报表函数、模板、数据源、输出文件名；输入和输出都没有变化的报表跳过
+    reports = [
+        (key_customers, "重点客户风险排查情况表-模板.xlsx", src_files[0:3], "重点客户风险排查情况表.xlsx"),
+        (covering_up_asset_quality, "疑似掩盖资产质量贷款台账-模板.xlsx", src_files[3:4], "疑似掩盖资产质量贷款台账.xlsx"),
+        (bank_data_tables, "昭通市银行业对公客户贷款相关台账-模板.xlsx", src_files[4:10],
+         "昭通市银行业对公客户贷款相关台账.xlsx"),
+        (tech_companies, "昭通市科技型企业和高新企业贷款相关台账-模板.xlsx", src_files[10:12],
+         "昭通市科技型企业和高新企业贷款相关台账.xlsx"),
+    ]
+    manifest = BuildManifest(os.path.join(result_path, 'build_manifest.json'))
+    # 出错时也要释放共享内存和 office 实例，避免在 /dev/shm 中留下数据集
+    try:
+        for func, template_name, src_names, result_name in reports:
+            inputs = [os.path.join(template_path, template_name)] + [os.path.join(data_path, x) for x in src_names]
+            outputs = [os.path.join(result_path, f"{date_str}{result_name}")]
+            if not manifest.needs_rebuild(func.__name__, inputs, outputs, params={'date_str': date_str}):
+                print(f"skip {func.__name__}")
+                continue
+            func(template_path, data_path, result_path, date_str)
+            manifest.record(func.__name__, inputs, outputs, params={'date_str': date_str})
+            manifest.save()
+
+        save_schema_cache(schema_cache)
+    finally:
+        dataset_cache.close()
+        # 关闭 office 时会一并释放模板缓存
+        OfficeLoader.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import argparse
+import os
+import sys
+from typing import Iterable, Iterator, List, Tuple
+from ooodev.loader import Lo
+from ooodev.utils.file_io import FileIO
+from ooodev.utils.props import Props
+from officeLoader import OfficeLoader, OfficePool
+from streams import filter_name
+
+
+def output_path(path: str, target_format: str, output_dir: str | None = None) -> str:
+    """目标文件路径：与源文件同名，扩展名换成目标格式，默认放在源文件所在目录"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    directory = output_dir if output_dir is not None else os.path.dirname(os.path.abspath(path))
+    return os.path.join(directory, f"{stem}.{target_format.lower().lstrip('.')}")
+
+
+def _convert_one(job: Tuple[str, str, str, dict]) -> Tuple[str, str, str | None]:
+    # 在当前进程的 soffice 中隐藏、只读打开源文件，直接按目标过滤器导出，数据不经过 Python
+    src, dst, target_format, load_props = job
+    try:
+        OfficeLoader()
+        component = Lo.get_desktop().loadComponentFromURL(
+            FileIO.fnm_to_url(FileIO.get_absolute_path(src)), "_blank", 0,
+            Props.make_props(Hidden=True, ReadOnly=True, **load_props))
+        if component is None:
+            raise RuntimeError("soffice could not load the file")
+        try:
+            kind = 'calc' if component.supportsService("com.sun.star.sheet.SpreadsheetDocument") else 'writer'
+            FileIO.make_directory(dst)
+            component.storeToURL(FileIO.fnm_to_url(dst),
+                                 Props.make_props(FilterName=filter_name(kind, target_format), Overwrite=True))
+        finally:
+            component.close(True)
+    except Exception as e:
+        # 单个文件失败不影响整批，错误随结果返回
+        return src, dst, f"{type(e).__name__}: {e}"
+    return src, dst, None
+
+
+def convert(paths: Iterable[str], target_format: str, output_dir: str | None = None, workers: int = 1,
+            filter_options: str | None = None) -> Iterator[Tuple[str, str, str | None]]:
+    """
+    批量转换文件格式，如 xls -> xlsx、doc -> docx、xlsx/docx -> pdf
+
+    Args:
+        paths: 源文件路径
+        target_format: 目标格式（扩展名），按源文件是表格还是文档选择导出过滤器
+        output_dir: 输出目录，为 None 时输出到源文件所在目录
+        workers: 大于 1 时由 OfficePool 的多个常驻 soffice 实例并行转换
+        filter_options: 导入过滤器选项（FilterOptions），如 csv 的分隔符和编码 '44,34,76'
+
+    Returns:
+        逐个产出 (源文件, 目标文件, 错误信息) 的迭代器，成功时错误信息为 None；多进程时按完成顺序产出
+
+    Raises:
+        ValueError: 多个源文件输出到同一目标文件（如 data.xls 和 data.doc 都转为 pdf），
+                    或目标文件就是某个源文件（如目标格式与源格式相同），在开始转换前检查
+    """
+    load_props = {} if filter_options is None else {'FilterOptions': filter_options}
+    jobs = [(src, output_path(src, target_format, output_dir), target_format, load_props) for src in paths]
+
+    def normalize(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    sources = {normalize(src) for src, _, _, _ in jobs}
+    targets = {}
+    for src, dst, _, _ in jobs:
+        if normalize(dst) in sources:
+            raise ValueError(f"Converting {src} would overwrite source file {dst}")
+        if normalize(dst) in targets:
+            raise ValueError(f"{targets[normalize(dst)]} and {src} would both be converted to {dst}")
+        targets[normalize(dst)] = src
+    return _run(jobs, workers)
+
+
+def _run(jobs: List[Tuple[str, str, str, dict]], workers: int) -> Iterator[Tuple[str, str, str | None]]:
+    if workers <= 1:
+        for job in jobs:
+            yield _convert_one(job)
+        return
+    with OfficePool(workers) as pool:
+        yield from pool.imap_unordered(_convert_one, jobs)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="使用 LibreOffice 批量转换文件格式")
+    parser.add_argument('paths', nargs='+', help="源文件")
+    parser.add_argument('-t', '--to', required=True, help="目标格式，如 xlsx、docx、pdf")
+    parser.add_argument('-o', '--output-dir', default=None, help="输出目录，默认与源文件相同")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="并行的 soffice 实例数")
+    parser.add_argument('--filter-options', default=None, help="导入过滤器选项")
+    args = parser.parse_args(argv)
+
+    try:
+        results = convert(args.paths, args.to, args.output_dir, args.workers, args.filter_options)
+    except ValueError as e:
+        parser.error(str(e))
+
+    failed = 0
+    total = len(args.paths)
+    try:
+        for i, (src, dst, error) in enumerate(results, 1):
+            if error is None:
+                print(f"[{i}/{total}] {src} -> {dst}")
+            else:
+                failed += 1
+                print(f"[{i}/{total}] {src} 转换失败: {error}", file=sys.stderr)
+    finally:
+        # 中途出错或被中断时也要退出进程池、关闭 soffice
+        results.close()
+        if args.workers <= 1:
+            OfficeLoader.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+from __future__ import annotations
+import hashlib
+import multiprocessing
+import pickle
+import struct
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+# 元数据块布局：[引用计数 int64][布局长度 int64][pickle 后的布局]
+_HEADER = struct.Struct('qq')
+_ALIGN = 64
+
+
+def _block_name(key: str) -> str:
+    # 共享内存名长度有限（macOS 为 31 个字符），按 key 的摘要命名
+    return 'lap_' + hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _encode_column(series: pd.Series) -> Tuple[dict, List[np.ndarray]]:
+    """
+    把一列拆成若干可直接放入共享内存的数组
+
+    数值、布尔和日期列原样保存；可空整数保存数据和掩码；其余列按字典编码保存为
+    int32 编码数组，唯一值列表单独 pickle。
+    """
+    values = series.array
+    if isinstance(values, pd.arrays.IntegerArray) or isinstance(values, pd.arrays.FloatingArray) \
+            or isinstance(values, pd.arrays.BooleanArray):
+        return {'kind': 'masked', 'dtype': str(series.dtype)}, [values._data, values._mask]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return ({'kind': 'dict', 'categories': list(series.cat.categories), 'ordered': series.cat.ordered},
+                [series.cat.codes.to_numpy().astype(np.int32)])
+    if series.dtype.kind in 'biufM' and not isinstance(series.dtype, pd.DatetimeTZDtype):
+        return {'kind': 'plain'}, [series.to_numpy()]
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return {'kind': 'dict', 'categories': list(uniques), 'ordered': False}, [codes.astype(np.int32)]
+
+
+def _decode_column(spec: dict, arrays: List[np.ndarray]):
+    if spec['kind'] == 'masked':
+        dtype = pd.api.types.pandas_dtype(spec['dtype'])
+        return dtype.construct_array_type()(arrays[0], arrays[1])
+    if spec['kind'] == 'dict':
+        return pd.Categorical.from_codes(arrays[0], categories=spec['categories'], ordered=spec['ordered'])
+    return arrays[0]
+
+
+class DatasetCache:
+    """
+    基于 multiprocessing.shared_memory 的数据集缓存
+
+    同一台机器上的多个工作进程可以按 key 附加到已发布的 DataFrame，不必重复读取和转换数据源。
+    数值、日期列零拷贝映射到共享内存，字符串列按字典编码保存，附加后为 category 类型。
+    返回的 DataFrame 底层数组为只读，需要修改时先 copy()。
+    每个数据集有一个跨进程的引用计数，最后一个引用释放时删除共享内存。
+
+    多进程使用时应在创建进程池前构造同一把锁，并通过 initializer 传给各工作进程::
+
+        lock = multiprocessing.Lock()
+        pool = multiprocessing.Pool(initializer=init_worker, initargs=(lock,))
+    """
+
+    def __init__(self, lock=None) -> None:
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        self._handles: Dict[str, Tuple[shared_memory.SharedMemory, shared_memory.SharedMemory]] = {}
+
+    def publish(self, key: str, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        把 df 复制到共享内存并登记引用，返回映射到共享内存的 DataFrame
+
+        Raises:
+            FileExistsError: key 已被发布
+        """
+        specs, arrays = [], []
+        for i in range(df.shape[1]):
+            spec, column_arrays = _encode_column(df.iloc[:, i])
+            spec['arrays'] = [(str(a.dtype), a.shape) for a in column_arrays]
+            specs.append(spec)
+            arrays.extend(column_arrays)
+
+        offsets, size = [], 0
+        for a in arrays:
+            offsets.append(size)
+            size += -(-a.nbytes // _ALIGN) * _ALIGN
+        layout = pickle.dumps({'columns': list(df.columns), 'index': df.index, 'specs': specs,
+                               'offsets': offsets, 'size': size, 'attrs': df.attrs})
+
+        name = _block_name(key)
+        # 持锁写完全部内容，其他进程不会附加到写了一半的数据集
+        with self.lock:
+            meta = shared_memory.SharedMemory(name=name, create=True, size=_HEADER.size + len(layout))
+            data = None
+            try:
+                data = shared_memory.SharedMemory(name=name + '_d', create=True, size=max(size, 1))
+                for a, offset in zip(arrays, offsets):
+                    np.ndarray(a.shape, dtype=a.dtype, buffer=data.buf, offset=offset)[...] = a
+                _HEADER.pack_into(meta.buf, 0, 1, len(layout))
+                meta.buf[_HEADER.size:_HEADER.size + len(layout)] = layout
+            except BaseException:
+                # 分配或写入失败（如 /dev/shm 空间不足）时删除已创建的块，不留下残缺的数据集
+                for shm in (meta, data):
+                    if shm is not None:
+                        shm.close()
+                        shm.unlink()
+                raise
+        self._handles[key] = (meta, data)
+        return self._frame(key)
+
+    def attach(self, key: str) -> pd.DataFrame | None:
+        """附加到已发布的数据集并增加引用计数，不存在时返回 None"""
+        if key in self._handles:
+            return self._frame(key)
+        name = _block_name(key)
+        with self.lock:
+            try:
+                meta = shared_memory.SharedMemory(name=name)
+                data = shared_memory.SharedMemory(name=name + '_d')
+            except FileNotFoundError:
+                return None
+            struct.pack_into('q', meta.buf, 0, struct.unpack_from('q', meta.buf, 0)[0] + 1)
+        self._handles[key] = (meta, data)
+        return self._frame(key)
+
+    def _frame(self, key: str) -> pd.DataFrame:
+        meta, data = self._handles[key]
+        _, length = _HEADER.unpack_from(meta.buf, 0)
+        layout = pickle.loads(meta.buf[_HEADER.size:_HEADER.size + length])
+        offsets = iter(layout['offsets'])
+        columns = {}
+        for i, spec in enumerate(layout['specs']):
+            arrays = [np.ndarray(shape, dtype=dtype, buffer=data.buf, offset=next(offsets))
+                      for dtype, shape in spec['arrays']]
+            for a in arrays:
+                # 共享内存被所有进程共用，设为只读，修改前需先复制
+                a.flags.writeable = False
+            columns[i] = _decode_column(spec, arrays)
+        df = pd.DataFrame(columns, index=layout['index'], copy=False)
+        df.columns = layout['columns']
+        df.attrs = layout['attrs']
+        return df
+
+    def get_or_load(self, key: str, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """已发布时直接附加，否则调用 loader 读取后发布"""
+        df = self.attach(key)
+        if df is not None:
+            return df
+        try:
+            return self.publish(key, loader())
+        except FileExistsError:
+            # 其他进程抢先发布了同一数据集
+            return self.attach(key)
+
+    def release(self, key: str) -> None:
+        """
+        释放本进程对数据集的引用，计数归零时删除共享内存
+
+        释放后此前返回的 DataFrame 不可再使用
+        """
+        handles = self._handles.pop(key, None)
+        if handles is None:
+            return
+        meta, data = handles
+        # 计数和删除在同一把锁内完成，避免与正在附加的进程交错
+        with self.lock:
+            count = struct.unpack_from('q', meta.buf, 0)[0] - 1
+            struct.pack_into('q', meta.buf, 0, count)
+            if count <= 0:
+                meta.unlink()
+                data.unlink()
+        for shm in (meta, data):
+            try:
+                shm.close()
+            except BufferError:
+                # 仍有 DataFrame 引用该内存，映射随对象回收
+                pass
+
+    def close(self) -> None:
+        """释放本进程持有的全部数据集"""
+        for key in list(self._handles):
+            self.release(key)
+
+    def __enter__(self) -> DatasetCache:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -0,0 +1,146 @@
+from __future__ import annotations
+from typing import Iterator, List, Tuple
+import numpy as np
+import pandas as pd
+
+_NUMBER_TYPES = (float, int, np.floating, np.integer)
+
+
+def _to_float_column(col: np.ndarray) -> Tuple[np.ndarray, np.ndarray] | None:
+    # 非空值全部是数值的 object 列转为 float64 + 空值掩码，否则返回 None
+    empty = col == ''
+    filled = col[~empty]
+    if not all(isinstance(v, _NUMBER_TYPES) and not isinstance(v, bool) for v in filled):
+        return None
+    values = np.full(len(col), np.nan)
+    values[~empty] = filled.astype(np.float64)
+    return values, empty
+
+
+class Grid:
+    """
+    按列保存的表格数据，用于在读写表格和 DataFrame 之间传递
+
+    每列是一个 NumPy 数组：数值列为 float64 并附带空值掩码（空值处为 NaN），
+    日期列为 datetime64（空值为 NaT），其余为 object（空值为 ''）。
+    行切片返回共享内存的视图，不复制数据。
+    """
+    __slots__ = ('columns', 'masks', 'names')
+
+    def __init__(self, columns: List[np.ndarray], masks: List[np.ndarray | None] | None = None,
+                 names: list | None = None) -> None:
+        if len({len(col) for col in columns}) > 1:
+            raise ValueError("All columns must have the same length")
+        self.columns = columns
+        self.masks = masks if masks is not None else [None] * len(columns)
+        self.names = names
+
+    @classmethod
+    def from_rows(cls, rows: Tuple[Tuple, ...], names: list | None = None, infer: bool = True) -> Grid:
+        """由 get_array 返回的二维元组按列构建，infer 为 True 时把纯数值列转为 float64"""
+        columns = [np.array(col, dtype=object) for col in zip(*rows)]
+        if not columns and names is not None:
+            columns = [np.empty(0, dtype=object) for _ in names]
+        grid = cls(columns, names=names)
+        return grid.compact() if infer else grid
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> Grid:
+        """由 DataFrame 构建，float64 和 datetime64[ns] 列不复制数据"""
+        columns, masks = [], []
+        for i in range(df.shape[1]):
+            series = df.iloc[:, i]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                columns.append(series.to_numpy())
+                masks.append(None)
+            elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                columns.append(values)
+                masks.append(np.isnan(values))
+            else:
+                values = series.to_numpy(dtype=object)
+                columns.append(np.where(pd.isna(values), '', values) if series.hasnans else values)
+                masks.append(None)
+        return cls(columns, masks, list(df.columns))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self), len(self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        """数组占用的字节数，object 列只计指针"""
+        return sum(col.nbytes for col in self.columns) + sum(m.nbytes for m in self.masks if m is not None)
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            masks = [m[item] if m is not None else None for m in self.masks]
+            return Grid([col[item] for col in self.columns], masks, self.names)
+        return tuple(self._cell(j, item) for j in range(len(self.columns)))
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def _cell(self, j: int, i: int):
+        col, mask = self.columns[j], self.masks[j]
+        if mask is not None:
+            return '' if mask[i] else float(col[i])
+        if col.dtype.kind == 'M':
+            return '' if np.isnat(col[i]) else col[i]
+        return col[i]
+
+    def compact(self) -> Grid:
+        """把非空值全部为数值的 object 列转为 float64 列，其余列原样保留"""
+        columns, masks = list(self.columns), list(self.masks)
+        for j, col in enumerate(columns):
+            if col.dtype == object:
+                converted = _to_float_column(col)
+                if converted is not None:
+                    columns[j], masks[j] = converted
+        return Grid(columns, masks, self.names)
+
+    def nonempty_rows(self) -> np.ndarray:
+        """返回至少有一个非空单元格的行的布尔掩码"""
+        keep = np.zeros(len(self), dtype=bool)
+        for col, mask in zip(self.columns, self.masks):
+            if mask is not None:
+                keep |= ~mask
+            elif col.dtype.kind == 'M':
+                keep |= ~np.isnat(col)
+            else:
+                keep |= col != ''
+        return keep
+
+    def take(self, rows: np.ndarray) -> Grid:
+        """按布尔掩码或行号选取行（会复制数据）"""
+        masks = [m[rows] if m is not None else None for m in self.masks]
+        return Grid([col[rows] for col in self.columns], masks, self.names)
+
+    def to_frame(self) -> pd.DataFrame:
+        """转为 DataFrame，数值列和日期列不复制数据"""
+        df = pd.DataFrame({j: col for j, col in enumerate(self.columns)}, copy=False)
+        df.columns = self.names if self.names is not None else list(range(len(self.columns)))
+        return df
+
+    def to_rows(self) -> Tuple[Tuple, ...]:
+        """转为可直接写入表格的二维元组：空值写为空，日期写为文本"""
+        columns = []
+        for col, mask in zip(self.columns, self.masks):
+            if mask is not None:
+                values = col.astype(object)
+                values[mask] = ''
+            elif col.dtype.kind == 'M':
+                valid = col[~np.isnat(col)]
+                has_time = (valid != valid.astype('datetime64[D]')).any()
+                values = np.datetime_as_string(col, unit='s' if has_time else 'D').astype(object)
+                if has_time:
+                    values = np.char.replace(values.astype(str), 'T', ' ').astype(object)
+                values[np.isnat(col)] = ''
+            else:
+                values = col
+            columns.append(values.tolist())
+        return tuple(zip(*columns))
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(path: str) -> str:
+    """
+    分块计算文件内容的 blake2b 摘要（hashlib 计算时释放 GIL，可多线程并行）
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildManifest:
+    """
+    构建清单：记录输入、模板和输出文件的大小、修改时间和内容摘要，
+    据此判断哪些报表需要重新生成
+
+    清单以 JSON 保存在结果目录中，格式为
+    {"files": {路径: {"size", "mtime", "hash"}}, "targets": {报表名: {"params", "inputs", "outputs"}}}
+    """
+
+    def __init__(self, path: str, workers: int = 8) -> None:
+        self.path = path
+        self.workers = workers
+        self.files = {}
+        self.targets = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.files = data.get('files', {})
+            self.targets = data.get('targets', {})
+
+    def fingerprint(self, paths: Iterable[str]) -> Dict[str, str | None]:
+        """
+        返回 {绝对路径: 摘要}，文件不存在时摘要为 None
+
+        大小和修改时间与上次记录一致的文件直接复用旧摘要，其余文件并行计算
+        """
+        result = {}
+        stale = []
+        for path in dict.fromkeys(os.path.abspath(p) for p in paths):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                result[path] = None
+                self.files.pop(path, None)
+                continue
+            entry = self.files.get(path)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+                result[path] = entry['hash']
+            else:
+                stale.append((path, stat))
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(stale))) as pool:
+                hashes = pool.map(file_hash, [path for path, _ in stale])
+                for (path, stat), digest in zip(stale, hashes):
+                    self.files[path] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': digest}
+                    result[path] = digest
+        return result
+
+    def needs_rebuild(self, target: str, inputs: List[str], outputs: List[str], params: dict | None = None) -> bool:
+        """
+        判断报表是否需要重新生成：没有记录、参数变化、任一输入变化，或输出缺失、被改动
+        """
+        record = self.targets.get(target)
+        if record is None or record.get('params') != (params or {}):
+            return True
+        current = self.fingerprint(list(inputs) + list(outputs))
+        recorded = {**record['inputs'], **record['outputs']}
+        if set(recorded) != set(current):
+            return True
+        return any(digest is None or recorded[path] != digest for path, digest in current.items())
+
+    def record(self, target: str, inputs: List[str], outputs: List[str], params: dict | None = None) -> None:
+        """报表生成成功后记录本次的输入和输出摘要"""
+        missing = [p for p in outputs if not os.path.exists(p)]
+        if missing:
+            raise FileNotFoundError(f"Outputs not found: {missing}")
+        digests = self.fingerprint(list(inputs) + list(outputs))
+        self.targets[target] = {
+            'params': params or {},
+            'inputs': {os.path.abspath(p): digests[os.path.abspath(p)] for p in inputs},
+            'outputs': {os.path.abspath(p): digests[os.path.abspath(p)] for p in outputs},
+        }
+
+    def save(self) -> None:
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files, 'targets': self.targets}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
@@ -1,9 +1,15 @@
 from __future__ import annotations
+import numpy as np
 import pandas as pd
+from functools import lru_cache
 from typing import Tuple
 from typing import Union
+import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from xlsx_reader import read_xlsx_rows
+from grid import Grid
 
 
 def is_number_regex(s):
@@ -31,38 +37,320 @@ def number_to_rounded_str(n: Union[int, float], digits: int = 2) -> str:
         raise ValueError(f"Input n = {n} must be int or float")
 
 
-def auto_convert_objects(df):
-    # 遍历所有object类型的列
-    for col in df.select_dtypes(include='object').columns:
-        # 原始列的缺失值数量
-        original_nulls = df[col].isnull().sum()
-        # 尝试转换为数值
-        # print(f'col:{col}')
-        # print(df[col])
-        # if df[col].shape[1] !=1:
-        #     raise Exception(f"the sheet has {df[col].shape[1]} cols named {col}")
-        numeric_series = pd.to_numeric(df[col], errors='coerce')
-        new_nulls = numeric_series.isnull().sum()
-
-        # 判断是否可以转换为数值类型
-        if new_nulls == original_nulls:
-            df[col] = numeric_series.astype('float64')
+_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S', '%Y年%m月%d日')
+# 数据源 -> {列名: 类型}，同一数据源后续月份直接复用，不再推断
+_SCHEMA_CACHE = {}
+
+
+def infer_column_kind(series: pd.Series, sample_size: int = 1000) -> str:
+    """
+    根据抽样推断列类型
+
+    Returns:
+        str: 'float'、'int'、'date:<格式>'、'category' 或 'string'
+    """
+    values = series.mask(series == '').dropna()
+    if values.empty:
+        return 'string'
+    if len(values) > sample_size:
+        values = values.iloc[np.linspace(0, len(values) - 1, sample_size).astype(np.int64)]
+
+    numeric = pd.to_numeric(values, errors='coerce')
+    if numeric.notna().all():
+        return 'int' if (numeric == np.floor(numeric)).all() else 'float'
+
+    text = values.astype(str)
+    for fmt in _DATE_FORMATS:
+        if pd.to_datetime(text, format=fmt, errors='coerce').notna().all():
+            return f'date:{fmt}'
+
+    # 重复取值较多的列（如贷款发放行名称）使用分类类型
+    if len(values) >= 8 and values.nunique() <= len(values) // 2:
+        return 'category'
+    return 'string'
+
+
+def _convert_column(series: pd.Series, kind: str) -> pd.Series | None:
+    # 转换后新增了缺失值说明类型不符，返回 None
+    if kind in ('float', 'int', 'date') or kind.startswith('date:'):
+        blank = series.mask(series == '')
+        if kind in ('float', 'int'):
+            converted = pd.to_numeric(blank, errors='coerce')
         else:
-            # 转换为字符串类型
-            df[col] = df[col].astype('string')
+            fmt = kind[5:] or None
+            converted = pd.to_datetime(blank.astype(object), format=fmt, errors='coerce')
+        if converted.isna().sum() != blank.isna().sum():
+            return None
+        if kind == 'int':
+            if not (converted.dropna() == np.floor(converted.dropna())).all():
+                return None
+            return converted.astype('Int64')
+        return converted.astype('float64') if kind == 'float' else converted
+    if kind == 'category':
+        return series.astype('category')
+    if kind == 'string':
+        return series.astype('string')
+    raise ValueError(f"Unknown column kind: {kind}")
+
+
+def _convert_masked(series: pd.Series, mask: np.ndarray, kind: str | None) -> Tuple[pd.Series | None, str | None]:
+    # Grid 的数值列（空单元格处为 NaN）直接按 int/float 转换，结果与 object 列的规则一致；
+    # 整列为空、指定为其他类型或不是整数时返回 (None, None)，由调用方还原为 object 列处理
+    if mask.all() or kind not in (None, 'int', 'float'):
+        return None, None
+    values = series.to_numpy()
+    filled = values[~mask]
+    integral = bool((filled == np.floor(filled)).all())
+    kind = kind or ('int' if integral else 'float')
+    if kind == 'float':
+        return series, kind
+    if not integral:
+        return None, None
+    ints = pd.arrays.IntegerArray(np.where(mask, 0, values).astype(np.int64), mask.copy())
+    return pd.Series(ints, index=series.index), kind
+
+
+def auto_convert_objects(df, overrides: dict | None = None, source: str | None = None, sample_size: int = 1000,
+                         masks: list | None = None):
+    """
+    推断并转换所有 object 类型列，每列只转换一次
+
+    Args:
+        df: 数据
+        overrides: 用户指定的列类型，如 {'发放日期': 'date:%Y-%m-%d'}
+        source: 数据源标识，推断结果按数据源缓存，后续直接复用
+        sample_size: 推断时每列抽样的行数
+        masks: 与列对应的空值掩码（Grid.masks），有掩码的 float64 列视为数值和空单元格组成的列，
+               与 object 列按相同规则转换和覆盖类型
+    """
+    overrides = overrides or {}
+    schema = dict(_SCHEMA_CACHE.get(source, {})) if source is not None else {}
+    schema.update(overrides)
+    # 按位置遍历，重复列名也能逐列处理
+    for i, col in enumerate(df.columns):
+        mask = masks[i] if masks is not None else None
+        if mask is not None:
+            converted, kind = _convert_masked(df.iloc[:, i], mask, schema.get(col))
+            if converted is not None:
+                df.isetitem(i, converted)
+                schema[col] = kind
+                continue
+            # 还原为 get_array 形式的 object 列（空单元格为 ''），按下面的规则转换
+            values = df.iloc[:, i].to_numpy(dtype=object)
+            df.isetitem(i, pd.Series(np.where(mask, '', values), index=df.index, dtype=object))
+        if not pd.api.types.is_object_dtype(df.dtypes.iloc[i]):
+            continue
+        series = df.iloc[:, i]
+        kind = schema.get(col) or infer_column_kind(series, sample_size)
+        converted = _convert_column(series, kind)
+        if converted is None:
+            if col in overrides:
+                raise ValueError(f"Column {col} cannot be converted to {kind}")
+            # 抽样或缓存的类型不适用，按整列重新推断
+            kind = infer_column_kind(series, len(series))
+            converted = _convert_column(series, kind)
+        df.isetitem(i, converted)
+        schema[col] = kind
+        if kind.startswith('date:'):
+            # 记录原文本的格式，frame_to_rows 写回时保持原样
+            df.attrs.setdefault('date_formats', {})[col] = [kind[5:], _is_zero_padded(series, converted, kind[5:])]
+    if source is not None:
+        _SCHEMA_CACHE[source] = schema
     return df
 
 
-def array2df(data_set: Tuple[Tuple, ...]) -> pd.DataFrame:
-    # 识别列名行（假设列名行所有字段非空）
-    columns = next(item for item in data_set if all(field != '' for field in item))
+def load_schema_cache(path: str) -> None:
+    if os.path.isfile(path):
+        with open(path, encoding='utf-8') as f:
+            _SCHEMA_CACHE.update(json.load(f))
+
+
+def save_schema_cache(path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(_SCHEMA_CACHE, f, ensure_ascii=False, indent=2)
+
+
+def format_dates(series: pd.Series, fmt: str, zero_padded: bool = True) -> pd.Series:
+    """按 strftime 格式把日期列格式化为文本，zero_padded 为 False 时月、日不补零（如 2024年1月5日）"""
+    if zero_padded or ('%m' not in fmt and '%d' not in fmt):
+        return series.dt.strftime(fmt)
+    # %-m 之类的写法在 Windows 上不可用，按片段拼接
+    result = pd.Series('', index=series.index, dtype=object)
+    for part in re.split(r'(%m|%d)', fmt):
+        if part == '%m':
+            result = result + series.dt.month.astype('Int64').astype(str)
+        elif part == '%d':
+            result = result + series.dt.day.astype('Int64').astype(str)
+        elif part:
+            result = result + series.dt.strftime(part)
+    return result.where(series.notna())
+
+
+def _is_zero_padded(text: pd.Series, dates: pd.Series, fmt: str) -> bool:
+    # 原文本与补零格式化结果一致，或与不补零的结果不一致时按补零处理
+    valid = dates.notna()
+    original = text[valid].astype(str)
+    if (format_dates(dates[valid], fmt) == original).all():
+        return True
+    return not (format_dates(dates[valid], fmt, zero_padded=False) == original).all()
+
+
+def frame_to_rows(df: pd.DataFrame) -> list:
+    """
+    将 DataFrame 转为可直接写入表格的二维列表：缺失值写为空，日期写为文本
+
+    由文本推断出的日期列（df.attrs['date_formats']）按原文本格式写回，其余日期列写为 ISO 格式
+    """
+    date_formats = df.attrs.get('date_formats', {})
+    columns = []
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        fmt = date_formats.get(df.columns[i])
+        if fmt is not None and pd.api.types.is_datetime64_any_dtype(series):
+            series = format_dates(series, *fmt)
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            has_time = (series.dropna() != series.dropna().dt.normalize()).any()
+            series = series.dt.strftime('%Y-%m-%d %H:%M:%S' if has_time else '%Y-%m-%d')
+        series = series.astype(object)
+        columns.append(series.where(series.notna(), '').tolist())
+    return [list(row) for row in zip(*columns)]
+
+
+def _header_names(header_block: Tuple[Tuple, ...], sep: str) -> list:
+    if len(header_block) == 1:
+        return list(header_block[0])
+    # 多行表头：上层的合并单元格只在左上角有值，向右补齐后逐层拼接
+    levels = []
+    for level, row in enumerate(header_block):
+        filled = list(row)
+        if level < len(header_block) - 1:
+            for j in range(1, len(filled)):
+                if filled[j] == '' and filled[j - 1] != '':
+                    filled[j] = filled[j - 1]
+        levels.append(filled)
+    names = []
+    for parts in zip(*levels):
+        merged = []
+        for part in parts:
+            if part != '' and (not merged or merged[-1] != str(part)):
+                merged.append(str(part))
+        names.append(sep.join(merged))
+    return names
+
+
+def _dedupe_names(names: list) -> list:
+    # 与 pandas 读取 csv 时一致：重复列名依次加 .1、.2 后缀
+    seen = {}
+    result = []
+    for name in names:
+        count = seen.get(name, 0)
+        result.append(name if count == 0 else f"{name}.{count}")
+        seen[name] = count + 1
+    return result
+
+
+def _locate_header(data_set: Tuple[Tuple, ...], header: int | str | None, header_rows: int, sep: str,
+                   dedupe_columns: bool) -> Tuple[int, list]:
+    """返回 (数据起始行号, 列名列表)"""
+    if header is None:
+        return 0, list(range(len(data_set[0]))) if data_set else []
+    if header == 'auto':
+        # 识别列名行（假设列名行所有字段非空）
+        header = next((i for i in range(len(data_set) - header_rows + 1)
+                       if all(f != '' for f in _header_names(data_set[i:i + header_rows], sep))), None)
+        if header is None:
+            raise ValueError("No header row found")
+    names = _header_names(data_set[header:header + header_rows], sep)
+    if dedupe_columns:
+        names = _dedupe_names(names)
+    return header + header_rows, names
+
+
+def array2df(data_set: Tuple[Tuple, ...] | Grid, header: int | str | None = 'auto', header_rows: int = 1,
+             sep: str = '_', dedupe_columns: bool = True, overrides: dict | None = None,
+             source: str | None = None, drop_empty_rows: bool = True) -> pd.DataFrame:
+    """
+    将表格区域的二维元组转换为 DataFrame
+
+    Args:
+        data_set: get_used_value 等返回的二维元组或 Grid
+        header: 表头起始行号；'auto' 取第一组所有字段非空的表头行；None 表示没有表头
+        header_rows: 表头占用的行数，多行（合并）表头按 sep 拼接为列名
+        dedupe_columns: 是否为重复列名加 .1、.2 后缀
+        overrides / source: 传给 auto_convert_objects
+        drop_empty_rows: 是否去掉所有单元格都为空的数据行（与原有行为一致，默认去掉）；
+                         需要保持行数和行位置与表格一一对应时设为 False，空行的各列为缺失值
+    """
+    start, names = _locate_header(data_set, header, header_rows, sep, dedupe_columns)
+
+    # 按列构建；Grid 输入按切片视图处理，数值列按掩码转换，与二维元组结果一致
+    if isinstance(data_set, Grid):
+        body = data_set[start:].compact()
+    else:
+        body = Grid.from_rows(data_set[start:], names=names, infer=False)
+    if drop_empty_rows:
+        body = body.take(body.nonempty_rows())
+    body.names = names
+    df = body.to_frame()
+    return auto_convert_objects(df, overrides=overrides, source=source, masks=body.masks)
+
+
+def _read_header_rows(path: str, max_rows: int) -> Tuple[Tuple, ...]:
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        return read_xlsx_rows(path, max_rows=max_rows)
+    # 其他格式通过 soffice 只读打开，只取前几行
+    from workbook import Workbook
+    wb = Workbook(read_only=True, filepath=path, visible=False)
+    try:
+        used_rng = wb.doc.sheets[0].find_used_range_obj()
+        end_row = min(used_rng.end_row_index, used_rng.start_row_index + max_rows - 1)
+        return wb.get_used_value(0, f"{column_index_to_name(used_rng.start_col_index)}{used_rng.start_row_index + 1}:"
+                                    f"{column_index_to_name(used_rng.end_col_index)}{end_row + 1}")
+    finally:
+        wb.close()
+
+
+def probe_schema(paths: list, expected_columns: list | dict, header: int | str = 'auto', header_rows: int = 1,
+                 max_rows: int = 20, workers: int = 8, raise_error: bool = True) -> dict:
+    """
+    在正式加载前只读取各数据源的表头，检查是否包含所需列
 
-    # 提取数据行（排除列名行）
-    rows = [list(item) for item in data_set if item != columns]
+    Args:
+        paths: 数据源文件路径列表
+        expected_columns: 所有文件共用的列名列表，或 {路径: 列名列表}
+        max_rows: 查找表头时最多读取的行数
+        workers: 并行读取 xlsx 的线程数，其他格式经 soffice 串行读取
+        raise_error: 有问题时是否抛出 ValueError，异常信息包含全部问题
 
-    # 创建DataFrame
-    df = pd.DataFrame(rows, columns=columns)
-    return auto_convert_objects(df)
+    Returns:
+        dict: {路径: 问题描述}，所有文件都通过时为空字典
+    """
+    def check(path):
+        expected = expected_columns.get(path) if isinstance(expected_columns, dict) else expected_columns
+        if expected is None:
+            return "no expected columns given"
+        if not os.path.exists(path):
+            return "file not found"
+        try:
+            _, names = _locate_header(_read_header_rows(path, max_rows), header, header_rows, '_', True)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+        missing = [col for col in expected if col not in names]
+        return f"missing columns {missing}" if missing else None
+
+    xlsx = [p for p in paths if p.lower().endswith(('.xlsx', '.xlsm'))]
+    problems = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(xlsx)))) as pool:
+        for path, problem in zip(xlsx, pool.map(check, xlsx)):
+            problems[path] = problem
+    for path in paths:
+        if path not in problems:
+            problems[path] = check(path)
+    problems = {p: problems[p] for p in paths if problems[p] is not None}
+
+    if problems and raise_error:
+        raise ValueError("Schema check failed:\n" + "\n".join(f"{p}: {msg}" for p, msg in problems.items()))
+    return problems
 
 
 #       type  label              value                      description
@@ -112,45 +400,234 @@ def process_value_to_str(row: [], decimal_places: int = 2) -> str:
         return number_to_rounded_str(value, decimal_places)  # 未知type，不处理
 
 
-def get_cell_col_name(cell_name: str) -> str:
-    match = re.match(r"^([A-Za-z]+)(\d+)$", cell_name)
-    if not match:
-        raise ValueError("Invalid input format")
-    letters = match.group(1).upper()
-    return letters
+_NUMBER_PATTERN = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+# type 列中的运算：0 不处理，1 增减值，2-5 依次为 + - * /
+_TYPE_OPERATORS = {'+': 2, '-': 3, '*': 4, '/': 5}
+
+
+def _parse_value_type(type_str) -> Tuple[int, float]:
+    if not isinstance(type_str, str) or type_str == '':
+        return 0, 0.0
+    if type_str == '增减值':
+        return 1, 0.0
+    op = _TYPE_OPERATORS.get(type_str[0])
+    if op is None:
+        return 0, 0.0
+    return op, float(type_str[1:])
+
+
+def _rounded_strs(values: np.ndarray, digits: int) -> np.ndarray:
+    # 与 number_to_rounded_str 对浮点数的处理保持一致
+    result = np.empty(len(values), dtype=object)
+    is_int = np.isfinite(values) & (values == np.floor(values))
+    small = is_int & (np.abs(values) < 2 ** 62)
+    result[small] = values[small].astype(np.int64).astype(str)
+    result[is_int & ~small] = [str(int(v)) for v in values[is_int & ~small].tolist()]
+    rest = ~is_int
+    if digits == 0:
+        result[rest] = [str(int(round(v, 0))) for v in values[rest].tolist()]
+    else:
+        result[rest] = [f"{round(v, digits)}" for v in values[rest].tolist()]
+    return result
 
 
-def convert_cell_name_to_list(cell_name: str) -> list:
-    # 使用正则表达式分割字母和数字部分
-    match = re.match(r"^([A-Za-z]+)(\d+)$", cell_name)
-    if not match:
-        raise ValueError("Invalid input format")
+def format_values(df: pd.DataFrame, value_col: str = 'value', type_col: str = 'type',
+                  decimal_places: int = 2) -> pd.Series:
+    """
+    process_value_to_str 的向量化版本，按 type 列对 value 列批量运算并格式化
+
+    Args:
+        df: 数据
+        value_col: 数值列名
+        type_col: 运算类型列名（''、'增减值' 或 '/10000' 之类的运算）
+        decimal_places: 保留的小数位数
+
+    Returns:
+        pd.Series: 与 df.apply(process_value_to_str, axis=1) 结果相同的字符串序列
+    """
+    values = df[value_col]
+    n = len(values)
+    result = values.astype(object).to_numpy(copy=True)
+
+    if pd.api.types.is_numeric_dtype(values):
+        empty = values.isna().to_numpy()
+        numeric = ~empty
+        numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        text = values.astype(object).where(values.notna(), '')
+        empty = (text == '').to_numpy()
+        if pd.api.types.infer_dtype(text, skipna=False) == 'string':
+            is_str = np.ones(n, dtype=bool)
+            stripped = text.str.strip()
+        else:
+            is_str = text.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+            stripped = text.where(is_str, '').astype(str).str.strip()
+        numeric = stripped.str.fullmatch(_NUMBER_PATTERN).to_numpy(dtype=bool) & ~empty
+        if not is_str.all():
+            # 非字符串的数值直接参与运算
+            numeric |= ~is_str & text.map(lambda v: isinstance(v, (int, float))).to_numpy(dtype=bool)
+        numbers = np.full(n, np.nan)
+        # 与 float() 一致：超出整数范围的长数字串按浮点解析，超出浮点范围的得到 inf
+        numbers[numeric & is_str] = stripped[numeric & is_str].to_numpy().astype(np.float64)
+        numbers[numeric & ~is_str] = text[numeric & ~is_str].to_numpy(dtype=np.float64)
+    result[empty] = ''
+
+    # type 列只对不同取值解析一次
+    codes, uniques = pd.factorize(df[type_col], use_na_sentinel=False)
+    parsed = [_parse_value_type(t) for t in uniques]
+    ops = np.array([p[0] for p in parsed], dtype=np.int8)[codes] if n else np.zeros(0, dtype=np.int8)
+    operands = np.array([p[1] for p in parsed], dtype=np.float64)[codes] if n else np.zeros(0)
+
+    if np.any(numeric & (ops == 5) & (operands == 0)):
+        raise ZeroDivisionError("float division by zero")
+    x = numbers[numeric]
+    op = ops[numeric]
+    operand = operands[numeric]
+    with np.errstate(all='ignore'):
+        y = np.select(
+            [op == 1, op == 2, op == 3, op == 4, op == 5],
+            [np.abs(x), x + operand, x - operand, x * operand, x / np.where(operand == 0, 1, operand)],
+            default=x,
+        )
+    formatted = _rounded_strs(y, decimal_places)
+    change = op == 1
+    prefix = np.where(x[change] >= 0, '增加', '减少').astype(object)
+    formatted[change] = prefix + formatted[change]
+    result[numeric] = formatted
+    return pd.Series(result, index=df.index)
+
+
+MAX_COLS = 16384  # XFD
+MAX_ROWS = 1048576
+
+# 可选的工作表前缀：Sheet1. / $Sheet1. / Sheet1! / 'My Sheet'!
+_SHEET_PREFIX = r"(?:\$?(?:'(?:[^']|'')+'|[^'!.:$]+)[.!])?"
+_CELL_PATTERN = re.compile(rf"^{_SHEET_PREFIX}\$?([A-Za-z]{{1,3}})\$?(\d+)$")
+_R1C1_PATTERN = re.compile(rf"^{_SHEET_PREFIX}[Rr](\d+)[Cc](\d+)$")
+_COLUMN_PATTERN = re.compile(rf"^{_SHEET_PREFIX}\$?([A-Za-z]{{1,3}})$")
+_ROW_PATTERN = re.compile(rf"^{_SHEET_PREFIX}\$?(\d+)$")
+_LETTERS = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+
+
+@lru_cache(maxsize=None)
+def column_name_to_index(name: str) -> int:
+    """列名转列号（从 0 开始），如 A -> 0，AA -> 26，XFD -> 16383"""
+    if not name.isascii() or not name.isalpha():
+        raise ValueError(f"Invalid column name: {name}")
+    index = 0
+    for c in name.upper():
+        index = index * 26 + (ord(c) - ord('A') + 1)
+    if index > MAX_COLS:
+        raise ValueError(f"Column out of range: {name}")
+    return index - 1
+
+
+@lru_cache(maxsize=None)
+def column_index_to_name(index: int) -> str:
+    """列号（从 0 开始）转列名，如 0 -> A，26 -> AA"""
+    if not 0 <= index < MAX_COLS:
+        raise ValueError(f"Column index out of range: {index}")
+    letters = ""
+    n = index + 1
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
 
-    letters = match.group(1).upper()
-    numbers = match.group(2)
 
-    # 转换字母部分为数值（类似Excel列编号）
-    column = 0
-    for c in letters:
-        column = column * 26 + (ord(c) - ord('A'))
+def _check_row(row: int, text: str) -> int:
+    if not 1 <= row <= MAX_ROWS:
+        raise ValueError(f"Row out of range: {text}")
+    return row - 1
 
-    # 转换数字部分为整数
-    row = int(numbers) - 1
 
-    return [column, row]
+@lru_cache(maxsize=65536)
+def parse_cell_name(cell_name: str) -> Tuple[int, int]:
+    """
+    解析单元格地址为 (列号, 行号)，均从 0 开始
 
+    支持 A1、$A$1、Sheet1.A1、'My Sheet'!A1 以及 R1C1 形式
+    """
+    match = _CELL_PATTERN.match(cell_name)
+    if match:
+        return column_name_to_index(match.group(1)), _check_row(int(match.group(2)), cell_name)
+    match = _R1C1_PATTERN.match(cell_name)
+    if match:
+        col = int(match.group(2))
+        if not 1 <= col <= MAX_COLS:
+            raise ValueError(f"Column out of range: {cell_name}")
+        return col - 1, _check_row(int(match.group(1)), cell_name)
+    raise ValueError("Invalid input format")
+
+
+@lru_cache(maxsize=65536)
+def parse_range_name(range_name: str) -> Tuple[int, int, int, int]:
+    """
+    解析区域地址为 (起始列, 起始行, 结束列, 结束行)，均从 0 开始
 
-def convert_range_name_to_list(range_name) -> list:
-    # 分割范围字符串为起始和结束单元格
+    除 A1:C3 外还支持整列 A:C 和整行 3:5
+    """
     parts = range_name.split(':')
     if len(parts) != 2:
         raise ValueError("Invalid range format. Expected format like 'A1:C3'")
+    start, end = parts
+    col_start, col_end = _COLUMN_PATTERN.match(start), _COLUMN_PATTERN.match(end)
+    if col_start and col_end:
+        return column_name_to_index(col_start.group(1)), 0, column_name_to_index(col_end.group(1)), MAX_ROWS - 1
+    row_start, row_end = _ROW_PATTERN.match(start), _ROW_PATTERN.match(end)
+    if row_start and row_end:
+        return 0, _check_row(int(row_start.group(1)), start), MAX_COLS - 1, _check_row(int(row_end.group(1)), end)
+    return parse_cell_name(start) + parse_cell_name(end)
 
-    start = convert_cell_name_to_list(parts[0])
-    end = convert_cell_name_to_list(parts[1])
 
+def encode_cells(cols, rows) -> np.ndarray:
+    """
+    批量将列号、行号（从 0 开始）数组转换为 A1 形式的地址数组
+    """
+    cols = np.asarray(cols, dtype=np.int64)
+    rows = np.asarray(rows, dtype=np.int64)
+    if np.any((cols < 0) | (cols >= MAX_COLS)) or np.any((rows < 0) | (rows >= MAX_ROWS)):
+        raise ValueError("Cell index out of range")
+    n1 = cols
+    n2 = n1 // 26 - 1
+    n3 = np.where(n2 >= 0, n2 // 26 - 1, -1)
+    names = _LETTERS[n1 % 26]
+    names = np.char.add(np.where(n2 >= 0, _LETTERS[n2 % 26], ''), names)
+    names = np.char.add(np.where(n3 >= 0, _LETTERS[n3 % 26], ''), names)
+    return np.char.add(names, (rows + 1).astype(str))
+
+
+def decode_cells(cell_names) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批量将 A1 形式的地址数组转换为 (列号数组, 行号数组)，均从 0 开始
+    """
+    names = np.asarray(cell_names, dtype=object)
+    parts = pd.Series(names).str.extract(_CELL_PATTERN)
+    invalid = parts[0].isna().to_numpy()
+    if invalid.any():
+        raise ValueError(f"Invalid input format: {names[int(np.argmax(invalid))]}")
+    letters = np.char.rjust(parts[0].str.upper().to_numpy().astype('U3'), 3).astype('S3')
+    codes = letters.view(np.uint8).reshape(-1, 3).astype(np.int64)
+    values = np.where(codes == ord(' '), 0, codes - ord('A') + 1)
+    cols = values[:, 0] * 676 + values[:, 1] * 26 + values[:, 2] - 1
+    rows = parts[1].to_numpy().astype(np.int64) - 1
+    if np.any(cols >= MAX_COLS) or np.any((rows < 0) | (rows >= MAX_ROWS)):
+        raise ValueError("Cell address out of range")
+    return cols, rows
+
+
+def get_cell_col_name(cell_name: str) -> str:
+    return column_index_to_name(parse_cell_name(cell_name)[0])
+
+
+def convert_cell_name_to_list(cell_name: str) -> list:
+    # 返回 [列号, 行号]，均从 0 开始
+    return list(parse_cell_name(cell_name))
+
+
+def convert_range_name_to_list(range_name) -> list:
     # 组合结果：[起始列, 起始行, 结束列, 结束行]
-    return start + end
+    return list(parse_range_name(range_name))
 
 
 def convert_list_to_range_name(lst):
@@ -176,17 +653,65 @@ def convert_list_to_range_name(lst):
         raise ValueError("列和行必须为整数")
     if column < 1 or row < 1:
         raise ValueError("列和行必须大于等于 1")
+    if row > MAX_ROWS:
+        raise ValueError(f"行号不能超过 {MAX_ROWS}")
 
     # 转换列号为字母部分（如 1 -> A，27 -> AA）
-    letters = ""
-    n = column
-    while n > 0:
-        n -= 1  # 调整为从0开始计算
-        remainder = n % 26
-        letters = chr(ord('A') + remainder) + letters
-        n = n // 26
+    return f"{column_index_to_name(column - 1)}{row}"
+
+
+def group_cells_into_blocks(cells) -> list:
+    """
+    将若干单元格坐标合并为尽量少的连续矩形块
+
+    Args:
+        cells: 可迭代的 [列号, 行号] 坐标（从 0 开始）
+
+    Returns:
+        list: 每个元素为 [起始列, 起始行, 结束列, 结束行]，与 convert_range_name_to_list 的格式一致
+    """
+    # 先按行把相邻列合并成横向区间
+    runs = []
+    for col, row in sorted(set((c, r) for c, r in cells), key=lambda x: (x[1], x[0])):
+        if runs and runs[-1][3] == row and runs[-1][2] == col - 1:
+            runs[-1][2] = col
+        else:
+            runs.append([col, row, col, row])
+
+    # 再把列跨度相同、行相邻的区间纵向合并
+    blocks = []
+    open_blocks = {}
+    for run in runs:
+        key = (run[0], run[2])
+        block = open_blocks.get(key)
+        if block is not None and block[3] == run[1] - 1:
+            block[3] = run[3]
+        else:
+            open_blocks[key] = run
+            blocks.append(run)
+    return blocks
+
+
+_RANGE_REF_PATTERN = re.compile(r"(\$?[A-Za-z]+\$?\d+:\$?[A-Za-z]+\$?)(\d+)")
+
+
+def shift_range_end_rows(formula: str, end_row: int, n: int) -> str:
+    """
+    将公式中结束行为 end_row 的区域引用向下延伸 n 行（如 =SUM(F5:F20) -> =SUM(F5:F23)）
+
+    Args:
+        formula: 公式字符串
+        end_row: 需要延伸的区域结束行号（从 1 开始）
+        n: 延伸的行数
+
+    Returns:
+        str: 调整后的公式
+    """
+    def _shift(match):
+        row = int(match.group(2))
+        return f"{match.group(1)}{row + n if row == end_row else row}"
 
-    return f"{letters}{row}"
+    return _RANGE_REF_PATTERN.sub(_shift, formula)
 
 
 def reorder_dataframe_columns(df, new_order):
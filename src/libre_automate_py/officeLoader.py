@@ -1,12 +1,21 @@
+import multiprocessing
+import multiprocessing.util
 import threading
 from contextlib import contextmanager
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
+from ooodev.conn.cache import Cache
 from ooodev.loader import Lo
 
 class OfficeLoader:
     _instance: Optional["OfficeLoader"] = None
     _lock = threading.Lock()
     _loader = None
+    # 传给 Lo.ConnectSocket 的连接参数，如 port
+    _connect_kwargs = {}
+    # 传给 Lo.load_office 的 Cache，决定 soffice 使用的用户配置目录，为 None 时使用默认配置
+    _cache_obj = None
+    # 关闭 office 前调用的回调，用于释放绑定在当前实例上的缓存文档
+    _close_callbacks = []
 
     def __new__(cls):
         # 双重检查锁确保线程安全
@@ -15,18 +24,32 @@ class OfficeLoader:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
                     # 初始化 Office 连接
-                    cls._loader = Lo.load_office(Lo.ConnectSocket())
+                    cls._loader = Lo.load_office(Lo.ConnectSocket(**cls._connect_kwargs), cache_obj=cls._cache_obj)
         return cls._instance
 
+    @classmethod
+    def configure(cls, cache_obj: Optional[Cache] = None, **connect_kwargs) -> None:
+        """设置连接参数（如 port）和用户配置目录（cache_obj），需在首次创建实例之前调用"""
+        cls._cache_obj = cache_obj
+        cls._connect_kwargs = connect_kwargs
+
     @classmethod
     def get_loader(cls):
         if cls._instance is None:
             raise RuntimeError("OfficeLoader instance not initialized")
         return cls._loader
 
+    @classmethod
+    def register_close(cls, callback: Callable[[], None]) -> None:
+        """登记在 close() 关闭 office 之前调用的回调，重复登记只调用一次"""
+        if callback not in cls._close_callbacks:
+            cls._close_callbacks.append(callback)
+
     @classmethod
     def close(cls):
         if cls._instance is not None:
+            for callback in cls._close_callbacks:
+                callback()
             Lo.close_office()
             cls._instance = None  # 允许重新初始化
             cls._loader = None
@@ -38,4 +61,51 @@ class OfficeLoader:
         try:
             yield cls.get_loader()
         finally:
-            cls.close()
\ No newline at end of file
+            cls.close()
+
+
+def _init_worker(counter, base_port: int, connect_kwargs: dict) -> None:
+    # 每个工作进程使用独立端口和独立的用户配置目录启动自己的 soffice，进程退出时关闭。
+    # soffice 按用户配置目录保持单实例，共用默认配置时后启动的进程会连到同一个 soffice，
+    # 任一工作进程关闭都会关掉它；profile_path='' 表示在临时目录中新建配置，关闭连接时删除
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    OfficeLoader.configure(port=base_port + index, cache_obj=Cache(profile_path=''), **connect_kwargs)
+    OfficeLoader()
+    multiprocessing.util.Finalize(None, OfficeLoader.close, exitpriority=10)
+
+
+class OfficePool:
+    """
+    office 实例池：每个工作进程持有一个常驻的 soffice 实例，任务之间复用
+
+    ooodev 的连接状态是进程级的，因此用进程池而不是线程池；任务函数需可被 pickle（模块级函数），
+    在工作进程中照常通过 OfficeLoader() 取得本进程的连接。
+    """
+
+    def __init__(self, workers: int = 2, base_port: int = 2003, **connect_kwargs) -> None:
+        # soffice 连接不能跨 fork 继承，统一使用 spawn
+        ctx = multiprocessing.get_context('spawn')
+        counter = ctx.Value('i', 0)
+        self._pool = ctx.Pool(workers, initializer=_init_worker, initargs=(counter, base_port, connect_kwargs))
+
+    def imap(self, func: Callable, iterable: Iterable) -> Iterator:
+        """按提交顺序逐个返回结果，可边处理边输出进度"""
+        return self._pool.imap(func, iterable)
+
+    def imap_unordered(self, func: Callable, iterable: Iterable) -> Iterator:
+        return self._pool.imap_unordered(func, iterable)
+
+    def map(self, func: Callable, iterable: Iterable) -> list:
+        return self._pool.map(func, iterable)
+
+    def close(self) -> None:
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self) -> "OfficePool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -0,0 +1,217 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, List, Tuple, Union
+import numpy as np
+from myutil import parse_cell_name, parse_range_name, convert_list_to_range_name
+
+
+class CellRange:
+    """
+    单个矩形区域，坐标均从 0 开始且包含端点
+    """
+    __slots__ = ('col_start', 'row_start', 'col_end', 'row_end')
+
+    def __init__(self, col_start: int, row_start: int, col_end: int, row_end: int) -> None:
+        if col_start > col_end or row_start > row_end:
+            raise ValueError(f"Invalid range: {(col_start, row_start, col_end, row_end)}")
+        self.col_start = col_start
+        self.row_start = row_start
+        self.col_end = col_end
+        self.row_end = row_end
+
+    @classmethod
+    def from_name(cls, name: str) -> CellRange:
+        if ':' in name:
+            return cls(*parse_range_name(name))
+        col, row = parse_cell_name(name)
+        return cls(col, row, col, row)
+
+    @property
+    def name(self) -> str:
+        start = convert_list_to_range_name([self.col_start + 1, self.row_start + 1])
+        end = convert_list_to_range_name([self.col_end + 1, self.row_end + 1])
+        return f"{start}:{end}"
+
+    @property
+    def size(self) -> int:
+        return (self.col_end - self.col_start + 1) * (self.row_end - self.row_start + 1)
+
+    def __iter__(self) -> Iterator[int]:
+        yield self.col_start
+        yield self.row_start
+        yield self.col_end
+        yield self.row_end
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CellRange):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return f"CellRange('{self.name}')"
+
+    def contains(self, other: CellRange) -> bool:
+        return (self.col_start <= other.col_start and self.row_start <= other.row_start
+                and self.col_end >= other.col_end and self.row_end >= other.row_end)
+
+    def intersection(self, other: CellRange) -> CellRange | None:
+        col_start, row_start = max(self.col_start, other.col_start), max(self.row_start, other.row_start)
+        col_end, row_end = min(self.col_end, other.col_end), min(self.row_end, other.row_end)
+        if col_start > col_end or row_start > row_end:
+            return None
+        return CellRange(col_start, row_start, col_end, row_end)
+
+
+RangeLike = Union[CellRange, str, Tuple[int, int, int, int]]
+
+
+def _to_rects(ranges: Iterable[RangeLike]) -> np.ndarray:
+    if isinstance(ranges, RangeSet):
+        return ranges.rects
+    rects = []
+    for rng in ranges:
+        if isinstance(rng, str):
+            rng = CellRange.from_name(rng)
+        rects.append(tuple(rng))
+    return np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+
+
+def _merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # 区间均为左闭右开
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _combine_intervals(a: List[Tuple[int, int]], b: List[Tuple[int, int]], op: str) -> List[Tuple[int, int]]:
+    if op == 'union':
+        return _merge_intervals(a + b)
+    result = []
+    if op == 'intersection':
+        i = j = 0
+        while i < len(a) and j < len(b):
+            start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+            if start < end:
+                result.append((start, end))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return result
+    # difference
+    j = 0
+    for start, end in a:
+        while j < len(b) and b[j][1] <= start:
+            j += 1
+        k = j
+        while start < end and k < len(b) and b[k][0] < end:
+            if b[k][0] > start:
+                result.append((start, b[k][0]))
+            start = max(start, b[k][1])
+            k += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def _sweep(a: np.ndarray, b: np.ndarray, op: str) -> np.ndarray:
+    """
+    按列边界切成竖条，逐条对行区间做集合运算，再把区间相同的相邻竖条合并成矩形
+    """
+    edges = np.unique(np.concatenate([a[:, 0], a[:, 2] + 1, b[:, 0], b[:, 2] + 1]))
+    rects = []
+    open_runs = {}  # (行起, 行止) -> [列起, 列止]
+    for left, right in zip(edges[:-1].tolist(), edges[1:].tolist()):
+        columns = []
+        for rects_in in (a, b):
+            active = rects_in[(rects_in[:, 0] <= left) & (rects_in[:, 2] >= left)]
+            columns.append(_merge_intervals(list(zip(active[:, 1].tolist(), (active[:, 3] + 1).tolist()))))
+        intervals = _combine_intervals(columns[0], columns[1], op)
+
+        next_runs = {}
+        for interval in intervals:
+            run = open_runs.pop(interval, None)
+            if run is not None and run[1] == left - 1:
+                run[1] = right - 1
+            else:
+                if run is not None:
+                    rects.append((run[0], interval[0], run[1], interval[1] - 1))
+                run = [left, right - 1]
+            next_runs[interval] = run
+        for interval, run in open_runs.items():
+            rects.append((run[0], interval[0], run[1], interval[1] - 1))
+        open_runs = next_runs
+    for interval, run in open_runs.items():
+        rects.append((run[0], interval[0], run[1], interval[1] - 1))
+    rects.sort(key=lambda r: (r[1], r[0]))
+    return np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+
+
+class RangeSet:
+    """
+    由若干矩形区域组成的集合，内部以 (n, 4) 的整数数组保存
+
+    用于在调用 UNO 之前规划合并、格式和写入区域，把大量零散区域合并成尽量少的矩形
+    """
+    __slots__ = ('rects',)
+
+    def __init__(self, ranges: Iterable[RangeLike] = ()) -> None:
+        self.rects = _to_rects(ranges)
+
+    @classmethod
+    def _from_rects(cls, rects: np.ndarray) -> RangeSet:
+        result = cls.__new__(cls)
+        result.rects = rects
+        return result
+
+    def __len__(self) -> int:
+        return len(self.rects)
+
+    def __iter__(self) -> Iterator[CellRange]:
+        for rect in self.rects.tolist():
+            yield CellRange(*rect)
+
+    def __repr__(self) -> str:
+        return f"RangeSet({self.names()})"
+
+    def names(self) -> List[str]:
+        return [rng.name for rng in self]
+
+    def add(self, rng: RangeLike) -> None:
+        self.rects = np.vstack([self.rects, _to_rects([rng])])
+
+    @property
+    def cell_count(self) -> int:
+        # 先合并重叠部分，避免重复计数
+        rects = self.coalesce().rects
+        return int(((rects[:, 2] - rects[:, 0] + 1) * (rects[:, 3] - rects[:, 1] + 1)).sum())
+
+    def coalesce(self) -> RangeSet:
+        if len(self.rects) == 0:
+            return RangeSet()
+        return RangeSet._from_rects(_sweep(self.rects, self.rects[:0], 'union'))
+
+    def union(self, other: Iterable[RangeLike]) -> RangeSet:
+        return RangeSet._from_rects(np.vstack([self.rects, _to_rects(other)])).coalesce()
+
+    def intersection(self, other: Iterable[RangeLike]) -> RangeSet:
+        other_rects = _to_rects(other)
+        if len(self.rects) == 0 or len(other_rects) == 0:
+            return RangeSet()
+        return RangeSet._from_rects(_sweep(self.rects, other_rects, 'intersection'))
+
+    def difference(self, other: Iterable[RangeLike]) -> RangeSet:
+        if len(self.rects) == 0:
+            return RangeSet()
+        return RangeSet._from_rects(_sweep(self.rects, _to_rects(other), 'difference'))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
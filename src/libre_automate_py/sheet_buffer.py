@@ -0,0 +1,99 @@
+from __future__ import annotations
+from typing import Tuple
+from myutil import group_cells_into_blocks
+
+_MISSING = object()
+
+
+class SheetBuffer:
+    """
+    延迟写入模式下单个工作表的虚拟副本
+
+    记录尚未写入 soffice 的单元格值、公式、合并区域和边框区域，
+    flush 时再合并为尽量少的批量调用。
+    """
+
+    def __init__(self) -> None:
+        self.cells = {}  # (列, 行) -> 值
+        self.formulas = set()  # 由 set_formulas 写入的单元格，flush 时按公式写入，其余值按文本原样写入
+        self.merges = {}  # (起始列, 起始行, 结束列, 结束行) -> None，保持插入顺序
+        self.borders = {}  # 区域名 -> None，保持插入顺序
+
+    def __bool__(self) -> bool:
+        return bool(self.cells or self.merges or self.borders)
+
+    def set_value(self, col: int, row: int, value, formula: bool = False) -> None:
+        self.cells[(col, row)] = value
+        if formula:
+            self.formulas.add((col, row))
+        else:
+            self.formulas.discard((col, row))
+
+    def set_block(self, col: int, row: int, values) -> None:
+        for r, row_values in enumerate(values):
+            for c, value in enumerate(row_values):
+                self.cells[(col + c, row + r)] = value
+                self.formulas.discard((col + c, row + r))
+
+    def get(self, col: int, row: int, default=_MISSING):
+        value = self.cells.get((col, row), default)
+        if value is _MISSING:
+            raise KeyError((col, row))
+        return value
+
+    def overlay(self, col: int, row: int, values: Tuple[Tuple, ...]) -> Tuple[Tuple, ...]:
+        # 用缓冲区中的待写值覆盖从 soffice 读到的区域
+        if not self.cells:
+            return values
+        result = [list(r) for r in values]
+        for (c, r), value in self.cells.items():
+            if 0 <= r - row < len(result) and 0 <= c - col < len(result[r - row]):
+                result[r - row][c - col] = value
+        return tuple(tuple(r) for r in result)
+
+    def add_merge(self, col_start: int, row_start: int, col_end: int, row_end: int) -> None:
+        rect = (col_start, row_start, col_end, row_end)
+        # 已被更大合并区域覆盖的计划直接忽略，反之替换掉被覆盖的旧计划
+        for old in self.merges:
+            if old[0] <= col_start and old[1] <= row_start and old[2] >= col_end and old[3] >= row_end:
+                return
+        for old in [m for m in self.merges
+                    if col_start <= m[0] and row_start <= m[1] and col_end >= m[2] and row_end >= m[3]]:
+            del self.merges[old]
+        self.merges[rect] = None
+
+    def add_border(self, range_name: str) -> None:
+        self.borders[range_name] = None
+
+    def extent(self):
+        """返回待写单元格的最大 [列号, 行号]，没有待写单元格时返回 None"""
+        if not self.cells:
+            return None
+        return [max(c for c, _ in self.cells), max(r for _, r in self.cells)]
+
+    def value_blocks(self) -> list:
+        """
+        将待写值按普通值和公式分组，并各自合并为矩形块
+
+        Returns:
+            list: (是否公式, [起始列, 起始行, 结束列, 结束行], 二维元组) 组成的列表
+        """
+        formula_cells = [k for k in self.cells if k in self.formulas]
+        value_cells = [k for k in self.cells if k not in self.formulas]
+
+        result = []
+        for is_formula, cells in ((False, value_cells), (True, formula_cells)):
+            for block in group_cells_into_blocks(cells):
+                col_start, row_start, col_end, row_end = block
+                rows = tuple(
+                    tuple(self.cells[(col, row)] for col in range(col_start, col_end + 1))
+                    for row in range(row_start, row_end + 1)
+                )
+                result.append((is_formula, block, rows))
+        return result
+
+    def clear(self) -> None:
+        self.cells.clear()
+        self.formulas.clear()
+        self.merges.clear()
+        self.borders.clear()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from typing import Callable
+import pandas as pd
+from manifest import file_hash
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow 为可选依赖
+    pa = None
+    feather = None
+
+_SUFFIX = '.arrow'
+_COLUMNS_KEY = b'libre_automate_py.columns'
+_ATTRS_KEY = b'libre_automate_py.attrs'
+
+
+class SourceCache:
+    """
+    已解析数据源的磁盘列式缓存（Arrow IPC 格式，读取时内存映射）
+
+    以文件内容摘要、工作表序号和读取参数为键，保存 array2df 转换后的 DataFrame，
+    命中时不再经过 soffice。缓存目录总大小超过 max_bytes 时按最近使用时间淘汰。
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 2 << 30) -> None:
+        if pa is None:
+            raise ImportError("SourceCache requires pyarrow, install it with: pip install pyarrow")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, path: str, sheet_n: int = 0, **options) -> str:
+        """由文件内容、工作表和读取参数生成缓存键"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(file_hash(path).encode())
+        h.update(json.dumps([sheet_n, options], sort_keys=True, default=str).encode('utf-8'))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """
+        读取缓存，未命中时返回 None
+
+        没有缺失值的数值列和日期列直接引用内存映射的文件，不复制（这些列为只读，修改前需先 copy()）；
+        字符串、分类和含缺失值的列转换时无法避免复制。
+        """
+        path = self._path(key)
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        # 以修改时间记录最近使用时间，供淘汰时排序
+        os.utime(path)
+        columns = json.loads(table.schema.metadata[_COLUMNS_KEY])
+        attrs = json.loads(table.schema.metadata.get(_ATTRS_KEY, b'{}'))
+        # 每列单独成块，避免合并成二维块时整表复制；转换过的列随即释放
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+        df.columns = columns
+        df.attrs = attrs
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """
+        写入缓存，含有 Arrow 无法表示的列（如混合类型的 object 列）时不缓存
+
+        Returns:
+            bool: 是否写入成功
+        """
+        # Arrow 要求列名为字符串且不重复，按位置命名，原列名放在元数据中
+        frame = df.set_axis([str(i) for i in range(df.shape[1])], axis=1)
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return False
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            _COLUMNS_KEY: json.dumps(list(df.columns), ensure_ascii=False, default=str).encode('utf-8'),
+            # 日期列的原文本格式等附加信息，frame_to_rows 写回时使用
+            _ATTRS_KEY: json.dumps(df.attrs, ensure_ascii=False, default=str, skipkeys=True).encode('utf-8'),
+        })
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        # 不压缩，读取时可直接内存映射
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        """按最近使用时间从旧到新删除缓存文件，直到总大小不超过 max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # Windows 下仍被内存映射的文件无法删除，留待下次淘汰
+                continue
+            total -= size
+
+    def load(self, path: str, loader: Callable[[], pd.DataFrame], sheet_n: int = 0, **options) -> pd.DataFrame:
+        """命中缓存时直接返回，否则调用 loader（通常经 soffice 读取）并写入缓存"""
+        key = self.key(path, sheet_n, **options)
+        df = self.get(key)
+        if df is None:
+            df = loader()
+            self.put(key, df)
+        return df
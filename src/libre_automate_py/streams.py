@@ -0,0 +1,76 @@
+from __future__ import annotations
+import uno
+import unohelper
+from com.sun.star.io import XInputStream, XOutputStream
+from ooodev.loader import Lo
+from ooodev.utils.props import Props
+
+# 按文档类型和扩展名选择 soffice 导出过滤器
+FILTERS = {
+    'calc': {
+        'xlsx': 'Calc MS Excel 2007 XML',
+        'xls': 'MS Excel 97',
+        'ods': 'calc8',
+        'csv': 'Text - txt - csv (StarCalc)',
+        'pdf': 'calc_pdf_Export',
+    },
+    'writer': {
+        'docx': 'MS Word 2007 XML',
+        'doc': 'MS Word 97',
+        'odt': 'writer8',
+        'rtf': 'Rich Text Format',
+        'txt': 'Text',
+        'pdf': 'writer_pdf_Export',
+    },
+}
+
+
+class BytesOutputStream(unohelper.Base, XOutputStream):
+    """把 soffice 写出的数据收集到内存中的 XOutputStream"""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def writeBytes(self, seq) -> None:
+        self.data.extend(seq.value)
+
+    def flush(self) -> None:
+        pass
+
+    def closeOutput(self) -> None:
+        pass
+
+
+def filter_name(kind: str, fmt: str) -> str:
+    """由文档类型（'calc' 或 'writer'）和目标格式（扩展名）取得导出过滤器名"""
+    try:
+        return FILTERS[kind][fmt.lower().lstrip('.')]
+    except KeyError:
+        raise ValueError(f"Unsupported {kind} format: {fmt}") from None
+
+
+def load_from_bytes(data: bytes, filter: str | None = None, hidden: bool = True, read_only: bool = False, **kwargs):
+    """
+    通过 XInputStream 从内存加载文档，不经过临时文件
+
+    Args:
+        filter: 导入过滤器名，为 None 时由 soffice 自动识别
+        kwargs: 其他加载属性，如 AsTemplate=True
+
+    Returns:
+        加载得到的文档组件（XComponent）
+    """
+    stream = Lo.create_instance_mcf(XInputStream, "com.sun.star.io.SequenceInputStream",
+                                    args=(uno.ByteSequence(data),), raise_err=True)
+    props = {'InputStream': stream, 'Hidden': hidden, 'ReadOnly': read_only, **kwargs}
+    if filter is not None:
+        props['FilterName'] = filter
+    desktop = Lo.get_desktop()
+    return desktop.loadComponentFromURL("private:stream", "_blank", 0, Props.make_props(**props))
+
+
+def store_to_bytes(component, filter: str, **kwargs) -> bytes:
+    """通过 XOutputStream 把文档导出为内存中的字节串"""
+    stream = BytesOutputStream()
+    component.storeToURL("private:stream", Props.make_props(FilterName=filter, OutputStream=stream, **kwargs))
+    return bytes(stream.data)
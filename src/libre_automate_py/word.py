@@ -6,10 +6,50 @@ from ooodev.write import WriteDoc
 from ooodev.write import Write
 from com.sun.star.util import XSearchable, XReplaceDescriptor, XReplaceable
 from com.sun.star.text import XTextRange
-from typing import Sequence
-from officeLoader import OfficeLoader
+from com.sun.star.awt.FontSlant import ITALIC
+from com.sun.star.lang import Locale
+from com.sun.star.text.ControlCharacter import PARAGRAPH_BREAK
+from com.sun.star.style.BreakType import PAGE_BEFORE
+from typing import Iterable, Iterator, List, Mapping, Sequence, Tuple
+import json
+import os
+import re
+from officeLoader import OfficeLoader, OfficePool
+from streams import load_from_bytes, store_to_bytes, filter_name
+from manifest import file_hash
+from myutil import frame_to_rows
+import pandas as pd
+
+# 报告模板中 $(标签) 形式的占位符（ICU 正则）
+PLACEHOLDER_PATTERN = r'\$\([^)]*\)'
+
+
+def _iterate(enumeration) -> Iterator:
+    while enumeration.hasMoreElements():
+        yield enumeration.nextElement()
+
+
+def _utf16_len(s: str) -> int:
+    # UNO 文本光标按 UTF-16 码元计数
+    return len(s.encode('utf-16-le')) // 2
+
+
+def _render_one(job: Tuple[str, dict, str]) -> str:
+    # render_batch 的单个任务，在工作进程中执行
+    template, mapping, output = job
+    word = Word.from_template(template, filepath=output, visible=False)
+    try:
+        word.replace_many(mapping, pattern=PLACEHOLDER_PATTERN)
+        word.save()
+    finally:
+        word.close()
+    return output
+
 
 class Word:
+    # (office 实例, 模板绝对路径, 修改时间) -> 模板的 ODF 字节串，每个 office 实例只加载一次模板
+    _templates = {}
+
     def __init__(self, read_only: bool = False, filepath: str | None = None, visible: bool = True) -> None:
         self._read_only = read_only
         self._filepath = filepath
@@ -28,6 +68,72 @@ class Word:
             Lo.close_office()
             raise
 
+    @classmethod
+    def from_template(cls, template_path: str, filepath: str | None = None, visible: bool = False) -> Word:
+        """从模板在内存中复制出新文档，新文档只在 save() 时落盘"""
+        loader = OfficeLoader().get_loader()
+        template_fnm = FileIO.get_absolute_path(template_path)
+        key = (id(loader), str(template_fnm), os.path.getmtime(template_fnm))
+        data = cls._templates.get(key)
+        if data is None:
+            template_doc = WriteDoc.open_doc(fnm=template_fnm, loader=loader, visible=False, ReadOnly=True)
+            try:
+                data = store_to_bytes(template_doc.component, 'writer8')
+            finally:
+                template_doc.close_doc()
+            cls._templates[key] = data
+
+        word = cls.__new__(cls)
+        word._read_only = False
+        word._filepath = filepath
+        word._visible = visible
+        word.doc = WriteDoc(load_from_bytes(data, filter='writer8', hidden=not visible))
+        return word
+
+    @classmethod
+    def from_bytes(cls, data: bytes, filter: str | None = None, read_only: bool = False,
+                   visible: bool = False) -> Word:
+        """
+        从内存中的文件内容打开文档，不经过临时文件
+
+        Args:
+            data: 文件内容，如上传的 docx
+            filter: 导入过滤器名，如 'MS Word 2007 XML'，为 None 时由 soffice 自动识别
+        """
+        OfficeLoader().get_loader()
+        word = cls.__new__(cls)
+        word._read_only = read_only
+        word._filepath = None
+        word._visible = visible
+        word.doc = WriteDoc(load_from_bytes(data, filter=filter, hidden=not visible, read_only=read_only))
+        return word
+
+    @staticmethod
+    def render_batch(template: str, rows: pd.DataFrame | Iterable[dict], output_pattern: str,
+                     workers: int = 1) -> List[str]:
+        """
+        由同一模板批量生成文档，每行数据生成一份
+
+        Args:
+            template: 模板路径
+            rows: DataFrame 或字典序列，键为文档中的占位符，如 '$(机构)'
+            output_pattern: 输出路径模板，可引用行内字段和行号，如 r'out/{index}_{$(机构)}.docx'，
+                            按扩展名保存为对应格式
+            workers: 大于 1 时分配到 OfficePool 的多个 soffice 实例并行生成
+
+        Returns:
+            list: 按行顺序排列的输出路径
+        """
+        records = rows.to_dict('records') if isinstance(rows, pd.DataFrame) else list(rows)
+        jobs = []
+        for i, record in enumerate(records):
+            mapping = {k: '' if pd.isna(v) else v for k, v in record.items()}
+            jobs.append((template, mapping, output_pattern.format_map({**record, 'index': i})))
+        if workers <= 1:
+            return [_render_one(job) for job in jobs]
+        with OfficePool(workers) as pool:
+            return list(pool.imap(_render_one, jobs))
+
     def save(self, save_path: str | None = None) -> None:
         if not self.doc:
             raise RuntimeError("No document to save.")
@@ -44,6 +150,12 @@ class Word:
             Lo.close_office()
             raise
 
+    def to_bytes(self, fmt: str = 'docx') -> bytes:
+        """按目标格式（docx、doc、odt、rtf、txt、pdf）导出为内存中的字节串，不经过临时文件"""
+        if not self.doc:
+            raise RuntimeError("No document to save.")
+        return store_to_bytes(self.doc.component, filter_name('writer', fmt))
+
     def close(self) -> None:
         self.doc.close_doc()
 
@@ -56,39 +168,83 @@ class Word:
         text = Write.get_all_text(cursor)
         return text
 
-    def italicize_all(self, phrase: str) -> int:
-        # cursor = Write.get_view_cursor(doc) # can be used when visible
-        cursor = self.doc.get_cursor()
-        cursor.goto_start()
-        page_cursor = self.doc.get_view_cursor()
-        result = 0
-        try:
-            searchable = self.doc.qi(XSearchable, True)
-            search_desc = searchable.createSearchDescriptor()
-            print(f"Searching for all occurrences of '{phrase}'")
-            phrase_len = len(phrase)
-            search_desc.setSearchString(phrase)
+    def _search_all(self, phrases: Sequence[str]):
+        # 多个短语拼成一个正则，只搜索一遍
+        searchable = self.doc.qi(XSearchable, True)
+        search_desc = searchable.createSearchDescriptor()
+        if len(phrases) == 1:
+            search_desc.setSearchString(phrases[0])
+        else:
+            search_desc.setSearchString('|'.join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)))
+            search_desc.setPropertyValue("SearchRegularExpression", True)
+        matches = searchable.findAll(search_desc)
+        return [Lo.qi(XTextRange, matches.getByIndex(i)) for i in range(matches.getCount())]
 
-            matches = searchable.findAll(search_desc)
-            result = matches.getCount()
+    def find_all(self, phrases: str | Sequence[str], pages: bool = True) -> List[dict]:
+        """
+        一次搜索查找多个短语
 
-            print(f"No. of matches: {result}")
+        字符位置由上一处匹配向后累加计算，不再每次从文档开头取全部文本
 
-            for i in range(result):
-                match_tr = Lo.qi(XTextRange, matches.getByIndex(i))
-                if match_tr is not None:
-                    cursor.goto_range(match_tr, False)
-                    print(f"  - found: '{match_tr.getString()}'")
-                    print(f"    - on page {page_cursor.get_page()}")
-                    cursor.goto_start(True)
-                    print(
-                        f"    - starting at char position: {len(cursor.get_string()) - phrase_len}"
-                    )
+        Returns:
+            list: {'text', 'range', 'page', 'offset'} 组成的列表，按文档顺序排列；
+                  不在正文中（如表格、页眉）的匹配 offset 为 None，pages 为 False 时 page 为 None
+        """
+        if isinstance(phrases, str):
+            phrases = [phrases]
+        ranges = self._search_all(phrases)
 
-        except Exception:
-            raise
+        body = self.doc.component.getText()
+        cursor = body.createTextCursor()
+        cursor.gotoStart(False)
+        view_cursor = self.doc.component.getCurrentController().getViewCursor() if pages else None
+        offset = 0
+        result = []
+        for match_tr in ranges:
+            match_offset = None
+            try:
+                # 只取上一处匹配到本处之间的文本
+                cursor.gotoRange(match_tr.getStart(), True)
+                offset += len(cursor.getString())
+                cursor.collapseToEnd()
+                match_offset = offset
+            except Exception:
+                pass
+            page = None
+            if view_cursor is not None:
+                view_cursor.gotoRange(match_tr, False)
+                page = view_cursor.getPage()
+            result.append({'text': match_tr.getString(), 'range': match_tr, 'page': page, 'offset': match_offset})
         return result
 
+    def format_all(self, phrases: str | Sequence[str], **char_props) -> int:
+        """
+        对所有匹配设置字符属性，如 format_all(['风险', '不良'], CharWeight=150.0, CharColor=0xFF0000)
+
+        全部短语只搜索一遍，每处匹配用一次 setPropertyValues 设置所有属性，期间锁定界面刷新。
+        Writer 没有对整个匹配集合设置属性的接口（findAll 的结果不支持 XPropertySet，
+        带替换属性的 replaceAll 会重写匹配文本），因此每处匹配仍需一次 UNO 调用。
+
+        Returns:
+            int: 匹配个数
+        """
+        if isinstance(phrases, str):
+            phrases = [phrases]
+        ranges = self._search_all(phrases)
+        # XMultiPropertySet 要求属性名按字母顺序排列，每个匹配只调用一次
+        names = tuple(sorted(char_props))
+        values = tuple(char_props[name] for name in names)
+        self.doc.component.lockControllers()
+        try:
+            for match_tr in ranges:
+                match_tr.setPropertyValues(names, values)
+        finally:
+            self.doc.component.unlockControllers()
+        return len(ranges)
+
+    def italicize_all(self, phrase: str) -> int:
+        return self.format_all(phrase, CharPosture=ITALIC)
+
     def replace_words(self, old_words: Sequence[str], new_words: Sequence[str]) -> int:
         replace_n = 0
 
@@ -104,3 +260,321 @@ class Word:
         replace_desc.setReplaceString(new_word)
         return replaceable.replaceAll(replace_desc)
 
+    def replace_many(self, mapping: Mapping[str, object], pattern: str | None = None) -> Tuple[int, list]:
+        """
+        一次扫描替换全部标签，替换处保留原有字符格式
+
+        Args:
+            mapping: {标签: 替换值}
+            pattern: 用于查找标签的正则（ICU 语法），默认由全部标签拼接，
+                     也可传入 PLACEHOLDER_PATTERN 只按 $(...) 占位符格式查找
+
+        Returns:
+            (替换次数, 文档中未出现的标签列表)
+        """
+        keys = [k for k in mapping if k]
+        if not keys:
+            return 0, []
+        if pattern is None:
+            # 长标签优先，避免 $(a1) 抢先匹配 $(a10) 的前缀
+            pattern = '|'.join(re.escape(k) for k in sorted(keys, key=len, reverse=True))
+
+        searchable = self.doc.qi(XSearchable, True)
+        search_desc = searchable.createSearchDescriptor()
+        search_desc.setSearchString(pattern)
+        search_desc.setPropertyValue("SearchRegularExpression", True)
+        matches = searchable.findAll(search_desc)
+
+        found = set()
+        replaced = 0
+        self.doc.component.lockControllers()
+        try:
+            for i in range(matches.getCount()):
+                match_tr = Lo.qi(XTextRange, matches.getByIndex(i))
+                label = match_tr.getString()
+                if label in mapping:
+                    match_tr.setString(str(mapping[label]))
+                    found.add(label)
+                    replaced += 1
+        finally:
+            self.doc.component.unlockControllers()
+        return replaced, [k for k in keys if k not in found]
+
+    def set_fields(self, mapping: Mapping[str, object]) -> Tuple[int, list]:
+        """
+        按字段名批量设置用户字段和输入字段的值，最后统一刷新一次
+
+        只遍历一次文档的字段集合，耗时与字段数量成正比，与正文长度无关。
+        用户字段以字段名为标签（同名字段共用一个值），输入字段以提示文字（Hint）为标签。
+
+        Args:
+            mapping: {字段名: 值}
+
+        Returns:
+            (更新的字段数, 文档中未出现的字段名列表)
+        """
+        text_fields = self.doc.component.getTextFields()
+        found = set()
+        updated = 0
+        self.doc.component.lockControllers()
+        try:
+            for field in _iterate(text_fields.createEnumeration()):
+                if field.supportsService("com.sun.star.text.textfield.User"):
+                    master = field.getPropertyValue("TextFieldMaster")
+                    name = master.getPropertyValue("Name")
+                    if name in mapping:
+                        # 同名用户字段共用字段主控，只需设置一次
+                        if name not in found:
+                            master.setPropertyValue("Content", str(mapping[name]))
+                        found.add(name)
+                        updated += 1
+                elif field.supportsService("com.sun.star.text.textfield.Input"):
+                    name = field.getPropertyValue("Hint")
+                    if name in mapping:
+                        field.setPropertyValue("Content", str(mapping[name]))
+                        found.add(name)
+                        updated += 1
+            text_fields.refresh()
+        finally:
+            self.doc.component.unlockControllers()
+        return updated, [k for k in mapping if k not in found]
+
+    def _root_texts(self) -> dict:
+        """返回 {根名称: XText}：正文，以及各页面样式中已启用的页眉、页脚（如 'header:Default Page Style'）"""
+        component = self.doc.component
+        roots = {'body': component.getText()}
+        styles = component.getStyleFamilies().getByName("PageStyles")
+        for name in styles.getElementNames():
+            style = styles.getByName(name)
+            for part in ('Header', 'Footer'):
+                if style.getPropertyValue(f"{part}IsOn"):
+                    roots[f"{part.lower()}:{name}"] = style.getPropertyValue(f"{part}Text")
+        return roots
+
+    def _walk_paragraphs(self, text, path: list, include_tables: bool) -> Iterator[Tuple[list, object]]:
+        # 逐个产出 (位置, 段落对象)，表格按单元格递归进入
+        for i, elem in enumerate(_iterate(text.createEnumeration())):
+            if elem.supportsService("com.sun.star.text.TextTable"):
+                if include_tables:
+                    for cell_name in elem.getCellNames():
+                        yield from self._walk_paragraphs(elem.getCellByName(cell_name), path + [[i, cell_name]], True)
+                continue
+            yield path + [i], elem
+
+    def _walk(self, include_tables: bool, include_headers: bool) -> Iterator[Tuple[list, object]]:
+        if include_headers:
+            roots = self._root_texts()
+        else:
+            roots = {'body': self.doc.component.getText()}
+        for root, text in roots.items():
+            yield from self._walk_paragraphs(text, [root], include_tables)
+
+    def iter_paragraphs(self, include_tables: bool = True, include_headers: bool = False) -> Iterator[dict]:
+        """
+        按文档顺序逐段产出 {'text', 'style', 'location'}，不构建整篇文本，可随时停止
+
+        location 的格式与 build_placeholder_index 的 path 相同
+        """
+        for path, paragraph in self._walk(include_tables, include_headers):
+            yield {'text': paragraph.getString(), 'style': paragraph.getPropertyValue("ParaStyleName"),
+                   'location': path}
+
+    def iter_text_portions(self, include_tables: bool = True, include_headers: bool = False) -> Iterator[dict]:
+        """
+        逐个产出段落内的文本片段 {'text', 'type', 'style', 'location'}
+
+        type 为 TextPortionType（如 'Text'、'TextField'），style 为字符样式名，
+        location 为所在段落位置后接片段序号
+        """
+        for path, paragraph in self._walk(include_tables, include_headers):
+            for j, portion in enumerate(_iterate(paragraph.createEnumeration())):
+                yield {'text': portion.getString(), 'type': portion.getPropertyValue("TextPortionType"),
+                       'style': portion.getPropertyValue("CharStyleName"), 'location': path + [j]}
+
+    def build_placeholder_index(self, pattern: str = PLACEHOLDER_PATTERN) -> List[dict]:
+        """
+        扫描正文、表格单元格和页眉页脚，记录每个占位符的位置
+
+        Returns:
+            list: {'label', 'path', 'start', 'length'} 组成的列表。path 第一项为根名称（见 _root_texts），
+                  中间的 [序号, 单元格名] 表示进入表格单元格，最后一项为段落序号；start、length 为段内偏移
+        """
+        regex = re.compile(pattern)
+        index = []
+        for path, paragraph in self._walk(include_tables=True, include_headers=True):
+            text = paragraph.getString()
+            for m in regex.finditer(text):
+                index.append({
+                    'label': m.group(),
+                    'path': path,
+                    'start': _utf16_len(text[:m.start()]),
+                    'length': _utf16_len(m.group()),
+                })
+        return index
+
+    def placeholder_index(self, cache_dir: str | None = None, pattern: str = PLACEHOLDER_PATTERN) -> List[dict]:
+        """
+        返回占位符索引，按文档文件的内容摘要缓存到 cache_dir（默认为文档所在目录下的 .placeholder_index）
+
+        同一模板每月复制后内容相同，第二次起直接读取缓存，不再扫描文档
+        """
+        if not getattr(self, '_input_fnm', None):
+            return self.build_placeholder_index(pattern)
+        cache_dir = cache_dir or os.path.join(os.path.dirname(self._input_fnm), '.placeholder_index')
+        digest = file_hash(self._input_fnm)
+        cache_file = os.path.join(cache_dir, f"{digest}.json")
+        if os.path.isfile(cache_file):
+            with open(cache_file, encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached['pattern'] == pattern:
+                return cached['index']
+        index = self.build_placeholder_index(pattern)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'pattern': pattern, 'index': index}, f, ensure_ascii=False)
+        return index
+
+    @staticmethod
+    def missing_labels(index: List[dict], mapping: Mapping[str, object]) -> List[str]:
+        """模板中出现但数据中没有的标签"""
+        return sorted({entry['label'] for entry in index} - set(mapping))
+
+    def _resolve_paragraph(self, path: list, roots: dict, elements: dict):
+        text = roots[path[0]]
+        for depth, step in enumerate(path[1:], start=1):
+            key = json.dumps(path[:depth], ensure_ascii=False)
+            if key not in elements:
+                elements[key] = list(_iterate(text.createEnumeration()))
+            if isinstance(step, list):
+                text = elements[key][step[0]].getCellByName(step[1])
+            else:
+                return elements[key][step]
+
+    def fill_placeholders(self, mapping: Mapping[str, object], cache_dir: str | None = None) -> Tuple[int, list, list]:
+        """
+        按占位符索引直接定位并替换，不再搜索整篇文档
+
+        索引与文档不一致的位置（如模板被手工改过）退回 replace_many 处理
+
+        Returns:
+            (替换次数, 模板中有但数据中没有的标签, 数据中有但模板中没有的标签)
+        """
+        index = self.placeholder_index(cache_dir)
+        present = {entry['label'] for entry in index}
+        missing = self.missing_labels(index, mapping)
+        unmatched = [k for k in mapping if k and k not in present]
+
+        roots = self._root_texts()
+        elements = {}
+        replaced = 0
+        stale = set()
+        # 同一段落内从后往前替换，前面占位符的偏移不受影响
+        entries = sorted((e for e in index if e['label'] in mapping),
+                         key=lambda e: (json.dumps(e['path'], ensure_ascii=False), -e['start']))
+        self.doc.component.lockControllers()
+        try:
+            for entry in entries:
+                paragraph = self._resolve_paragraph(entry['path'], roots, elements)
+                cursor = paragraph.getText().createTextCursorByRange(paragraph.getStart())
+                cursor.goRight(entry['start'], False)
+                cursor.goRight(entry['length'], True)
+                if cursor.getString() != entry['label']:
+                    stale.add(entry['label'])
+                    continue
+                cursor.setString(str(mapping[entry['label']]))
+                replaced += 1
+        finally:
+            self.doc.component.unlockControllers()
+        if stale:
+            n, _ = self.replace_many({label: mapping[label] for label in stale})
+            replaced += n
+        return replaced, missing, unmatched
+
+    def _number_format_key(self, fmt: str) -> int:
+        formats = self.doc.component.getNumberFormats()
+        locale = Locale()
+        key = formats.queryKey(fmt, locale, False)
+        if key == -1:
+            key = formats.addNew(fmt, locale)
+        return key
+
+    def fill_table(self, table: str | int, df: pd.DataFrame, start_row: int = 1, start_col: int = 0,
+                   grow: bool = True, number_formats: Mapping[str, str] | None = None) -> int:
+        """
+        将 DataFrame 一次写入文档中的表格
+
+        Args:
+            table: 表格名称（如 'Table1'）或序号
+            start_row / start_col: 起始行、列（从 0 开始），默认跳过第一行表头
+            grow: 行数不足时是否一次性插入所需行，为 False 时行数不足抛出 ValueError
+            number_formats: {列名: 数字格式}，如 {'贷款余额': '#,##0.00'}
+
+        Returns:
+            int: 写入的行数
+        """
+        tables = self.doc.component.getTextTables()
+        text_table = tables.getByName(table) if isinstance(table, str) else tables.getByIndex(table)
+        if df.empty:
+            return 0
+
+        rows = text_table.getRows()
+        needed = start_row + len(df)
+        if needed > rows.getCount():
+            if not grow:
+                raise ValueError(f"Table has {rows.getCount()} rows, {needed} needed")
+            rows.insertByIndex(rows.getCount(), needed - rows.getCount())
+
+        end_row, end_col = needed - 1, start_col + df.shape[1] - 1
+        text_table.getCellRangeByPosition(start_col, start_row, end_col, end_row).setDataArray(
+            tuple(tuple(row) for row in frame_to_rows(df)))
+
+        for col, fmt in (number_formats or {}).items():
+            j = start_col + df.columns.get_loc(col)
+            text_table.getCellRangeByPosition(j, start_row, j, end_row).setPropertyValue(
+                "NumberFormat", self._number_format_key(fmt))
+        return len(df)
+
+    def append_documents(self, paths: Iterable[str], page_break: bool = True, page_style: str | None = None) -> int:
+        """
+        依次把整篇文档插入到本文档末尾（insertDocumentFromURL），不经过剪贴板，也不逐个打开源文档
+
+        同名样式以本文档的定义为准，同名区段由 soffice 自动重命名。
+
+        Args:
+            paths: 文档路径，可以是生成器，边生成边插入
+            page_break: 每篇文档是否从新的一页开始
+            page_style: 指定每篇文档起始页使用的页面样式（同时产生分页），为 None 时沿用当前样式
+
+        Returns:
+            int: 插入的文档数
+        """
+        text = self.doc.component.getText()
+        cursor = text.createTextCursor()
+        cursor.gotoEnd(False)
+        # 文档末尾是空段落时直接在该段插入，不额外分页
+        cursor.gotoStartOfParagraph(True)
+        at_empty_paragraph = cursor.getString() == ''
+        cursor.gotoEnd(False)
+
+        count = 0
+        self.doc.component.lockControllers()
+        try:
+            for path in paths:
+                if count > 0 or not at_empty_paragraph:
+                    text.insertControlCharacter(cursor, PARAGRAPH_BREAK, False)
+                    if page_style is not None:
+                        cursor.setPropertyValue("PageDescName", page_style)
+                    elif page_break:
+                        cursor.setPropertyValue("BreakType", PAGE_BEFORE)
+                elif page_style is not None:
+                    cursor.setPropertyValue("PageDescName", page_style)
+                cursor.insertDocumentFromURL(FileIO.fnm_to_url(FileIO.get_absolute_path(path)), ())
+                cursor.gotoEnd(False)
+                count += 1
+        finally:
+            self.doc.component.unlockControllers()
+        return count
+
+
+# 缓存键含 office 实例的 id，实例关闭后清空，避免新实例复用同一 id
+OfficeLoader.register_close(Word._templates.clear)
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import os
 import uno
 from ooodev.calc import CalcDoc
 from ooodev.utils.file_io import FileIO
@@ -8,16 +9,27 @@ from ooodev.utils.type_var import PathOrStr
 from ooodev.calc import CalcDoc, CalcSheet, ZoomKind, CalcSheetView
 from ooodev.office.calc import Calc
 from typing import Tuple
+from com.sun.star.sheet.CellFlags import VALUE, DATETIME, STRING, FORMULA
 from officeLoader import OfficeLoader
+from sheet_buffer import SheetBuffer
+from rangeset import CellRange, RangeSet
+from grid import Grid
+from streams import load_from_bytes, store_to_bytes, filter_name
 from ooodev.format.calc.direct.cell.borders import BorderLineKind
 from ooodev.formatters.formatter_table import FormatterTable, FormatTableItem
 from ooodev.utils.color import CommonColor
 from ooodev.format.calc.direct.cell.borders import Side
 from myutil import *
+import numpy as np
 import pandas as pd
 
 
 class Workbook:
+    # (office 实例, 模板绝对路径, 修改时间) -> 已解析的模板文档，每个 office 实例只解析一次
+    _templates = {}
+    # 延迟写入模式下每个工作表的缓冲区，None 表示直接写入
+    _buffers = None
+
     def __init__(self, read_only: bool = False, filepath: str | None = None, visible: bool = True) -> None:
         self._read_only = read_only
         self._filepath = filepath
@@ -37,9 +49,69 @@ class Workbook:
             Lo.close_office()
             raise
 
+    @classmethod
+    def from_template(cls, template_path: str, filepath: str | None = None, visible: bool = False) -> Workbook:
+        loader = OfficeLoader().get_loader()
+        template_fnm = FileIO.get_absolute_path(template_path)
+        key = (id(loader), str(template_fnm), os.path.getmtime(template_fnm))
+        template_doc = cls._templates.get(key)
+        if template_doc is None:
+            template_doc = CalcDoc.open_doc(fnm=template_fnm, loader=loader, visible=False, ReadOnly=True)
+            cls._templates[key] = template_doc
+
+        wb = cls.__new__(cls)
+        wb._read_only = False
+        wb._filepath = filepath
+        wb._visible = visible
+        wb.doc = None
+        try:
+            wb.doc = CalcDoc.create_doc(loader=loader, visible=visible)
+            # 在内存中逐个复制模板工作表，新文档只在 save() 时落盘
+            sheets = wb.doc.component.getSheets()
+            blank_names = sheets.getElementNames()
+            for i, name in enumerate(blank_names):
+                sheets.getByName(name).setName(f"__blank_{i}")
+            for i, name in enumerate(template_doc.component.getSheets().getElementNames()):
+                sheets.importSheet(template_doc.component, name, i)
+            for i in range(len(blank_names)):
+                sheets.removeByName(f"__blank_{i}")
+        except Exception:
+            if wb.doc is not None:
+                wb.doc.close_doc()
+            raise
+        return wb
+
+    @classmethod
+    def from_bytes(cls, data: bytes, filter: str | None = None, read_only: bool = False,
+                   visible: bool = False) -> Workbook:
+        """
+        从内存中的文件内容打开工作簿，不经过临时文件
+
+        Args:
+            data: 文件内容，如上传的 xlsx
+            filter: 导入过滤器名，如 'Calc MS Excel 2007 XML'，为 None 时由 soffice 自动识别
+        """
+        OfficeLoader().get_loader()
+        wb = cls.__new__(cls)
+        wb._read_only = read_only
+        wb._filepath = None
+        wb._visible = visible
+        wb.doc = CalcDoc(load_from_bytes(data, filter=filter, hidden=not visible, read_only=read_only))
+        return wb
+
+    @classmethod
+    def release_templates(cls) -> None:
+        """关闭并清空缓存的模板文档，OfficeLoader.close() 时自动调用"""
+        templates = list(cls._templates.values())
+        # 先清空缓存，关闭失败时也不会留下失效的文档
+        cls._templates.clear()
+        for template_doc in templates:
+            template_doc.close_doc()
+
     def save(self, save_path: str | None = None) -> None:
         if not self.doc:
             raise RuntimeError("No document to save.")
+        self.flush()
 
         path = save_path or self._filepath
         if not path:
@@ -53,6 +125,13 @@ class Workbook:
             Lo.close_office()
             raise
 
+    def to_bytes(self, fmt: str = 'xlsx') -> bytes:
+        """按目标格式（xlsx、xls、ods、csv、pdf）导出为内存中的字节串，不经过临时文件"""
+        if not self.doc:
+            raise RuntimeError("No document to save.")
+        self.flush()
+        return store_to_bytes(self.doc.component, filter_name('calc', fmt))
+
     def get_range_value(self, sheet_n: int, range_name: str) -> Tuple[Tuple, ...]:
         cell_rng = Calc.get_range_obj(range_name="A1:B2")
         return self.doc.sheets[sheet_n].get_array(range_obj=cell_rng)
@@ -61,7 +140,76 @@ class Workbook:
         self.doc.close_doc()
         return 0
 
-    def get_used_value(self, sheet_n: int, range_name: str = None) -> Tuple[Tuple, ...]:
+    def defer(self) -> None:
+        # 进入延迟写入模式，之后的写入、合并、边框操作先记录在缓冲区中
+        if self._buffers is None:
+            self._buffers = {}
+
+    def _buffer(self, sheet_n: int) -> SheetBuffer | None:
+        if self._buffers is None:
+            return None
+        return self._buffers.setdefault(sheet_n, SheetBuffer())
+
+    def flush(self) -> None:
+        if not self._buffers:
+            return
+        buffers = self._buffers
+        # 写入期间暂时退出延迟模式，让下面的调用直接作用于文档
+        self._buffers = None
+        try:
+            for sheet_n, buffer in buffers.items():
+                if not buffer:
+                    continue
+                sheet = self.doc.sheets[sheet_n]
+                formulas = {}
+                for is_formula, block, rows in buffer.value_blocks():
+                    if is_formula:
+                        for r, row in enumerate(rows):
+                            for c, formula in enumerate(row):
+                                formulas[convert_list_to_range_name([block[0] + c + 1, block[1] + r + 1])] = formula
+                    else:
+                        sheet.set_array(values=rows, name=CellRange(*block).name)
+                self.set_formulas(sheet_n, formulas)
+                self.merge_ranges(sheet_n, (CellRange(*m) for m in buffer.merges))
+                if buffer.borders:
+                    # 重叠或相邻的边框区域先合并，减少样式调用
+                    self.formatter_range(sheet_n, RangeSet(buffer.borders).coalesce())
+                buffer.clear()
+        finally:
+            self._buffers = buffers
+
+    def set_val(self, sheet_n: int, cell_name: str, value) -> None:
+        buffer = self._buffer(sheet_n)
+        if buffer is not None:
+            # 直接写入时字符串经 setFormula 写入（'=' 开头为公式），延迟写入时同样按公式写入
+            buffer.set_value(*convert_cell_name_to_list(cell_name), value, formula=isinstance(value, str))
+            return
+        self.doc.sheets[sheet_n].get_cell(cell_name=cell_name).set_val(value)
+
+    def get_val(self, sheet_n: int, cell_name: str):
+        buffer = self._buffer(sheet_n)
+        if buffer is not None:
+            pending = buffer.get(*convert_cell_name_to_list(cell_name), default=None)
+            if pending is not None:
+                return pending
+        return self.doc.sheets[sheet_n].get_cell(cell_name=cell_name).value
+
+    def get_used_value(self, sheet_n: int, range_name: str | CellRange = None,
+                       as_grid: bool = False) -> Tuple[Tuple, ...] | Grid:
+        """读取区域（默认为已使用区域）的值，as_grid 为 True 时返回按列保存的 Grid"""
+        values = self._get_used_value(sheet_n, range_name)
+        return Grid.from_rows(values) if as_grid else values
+
+    def _get_used_value(self, sheet_n: int, range_name: str | CellRange = None) -> Tuple[Tuple, ...]:
+        if isinstance(range_name, CellRange):
+            range_name = range_name.name
+        buffer = self._buffer(sheet_n)
+        if buffer and range_name is None:
+            # 已使用区域可能被待写数据扩大，先写入再读取
+            self.flush()
+        elif buffer and range_name is not None:
+            col, row = convert_cell_name_to_list(range_name.split(':')[0])
+            return buffer.overlay(col, row, self.doc.sheets[sheet_n].get_array(range_name=range_name))
 
         used_rng = self.doc.sheets[sheet_n].find_used_range_obj()
         # start_idx = used_rng.start_row_index
@@ -72,15 +220,37 @@ class Workbook:
             return self.doc.sheets[sheet_n].get_array(range_obj=used_rng)
         return self.doc.sheets[sheet_n].get_array(range_name=range_name)
 
-    def set_array_value(self, sheet_n: int, values: Tuple[Tuple, ...], range_name: str) -> None:
+    def set_array_value(self, sheet_n: int, values: Tuple[Tuple, ...] | Grid, range_name: str | CellRange) -> None:
+        if isinstance(values, Grid):
+            values = values.to_rows()
+        if isinstance(range_name, CellRange):
+            range_name = range_name.name
+        buffer = self._buffer(sheet_n)
+        if buffer is not None:
+            buffer.set_block(*convert_cell_name_to_list(range_name.split(':')[0]), values)
+            return
         self.doc.sheets[sheet_n].set_array(values=values, name=range_name)
 
     def get_end_name(self, sheet_n) -> str:
+        if self._buffer(sheet_n):
+            # 延迟模式下已使用区域需要包含尚未写入的单元格
+            end = self._used_end_index(sheet_n)
+            return convert_list_to_range_name([end[0] + 1, end[1] + 1])
         used_rng = self.doc.sheets[sheet_n].find_used_range_obj()
         end_cell = used_rng.cell_end
         return f"{end_cell.col}{end_cell.row}"
 
-    def formatter_range(self, sheet_n, range_name: str):
+    def formatter_range(self, sheet_n, range_name: str | CellRange | RangeSet):
+        if isinstance(range_name, RangeSet):
+            for rng in range_name:
+                self.formatter_range(sheet_n, rng.name)
+            return
+        if isinstance(range_name, CellRange):
+            range_name = range_name.name
+        buffer = self._buffer(sheet_n)
+        if buffer is not None:
+            buffer.add_border(range_name)
+            return
         rng = self.doc.sheets[sheet_n].get_range(range_name=range_name)
         rng.style_borders(
             border_side=Side(color=CommonColor.BLACK, width=1),
@@ -91,36 +261,131 @@ class Workbook:
         range_list = convert_range_name_to_list(range_name)
         fl = FormatterTable(format=(".2f", ">9"), idxs=(range_list[0], range_list[3]))
 
-    def set_pandas_range(self, data: pd.DataFrame, sheet_n: int, cell_name: str) -> None:
-        result = data.values.tolist()
+    def set_pandas_range(self, data: pd.DataFrame, sheet_n: int, cell_name: str, diff: bool = False) -> int:
+        if diff:
+            return self.write_pandas_diff(data, sheet_n, cell_name)
+        result = frame_to_rows(data)
         self.set_array_value(sheet_n, result, cell_name)
         self.formatter_range(sheet_n, f"{cell_name}:{self.get_end_name(sheet_n)}")
+        return data.size
+
+    def write_pandas_diff(self, data: pd.DataFrame, sheet_n: int, cell_name: str) -> int:
+        n_rows, n_cols = data.shape
+        if n_rows == 0 or n_cols == 0:
+            return 0
+        self.flush()
+        sheet = self.doc.sheets[sheet_n]
+        start_col, start_row = convert_cell_name_to_list(cell_name)
+        used_rng = sheet.find_used_range_obj()
+        end_name = convert_list_to_range_name([start_col + n_cols, start_row + n_rows])
+
+        # 一次读出目标区域，整体比较，空值按空单元格处理
+        old = np.array(sheet.get_array(range_name=f"{cell_name}:{end_name}"), dtype=object).reshape(n_rows, n_cols)
+        new = np.array(frame_to_rows(data), dtype=object).reshape(n_rows, n_cols)
+        changed = np.not_equal(old, new).astype(bool)
+        rows, cols = np.nonzero(changed)
+
+        for col_s, row_s, col_e, row_e in group_cells_into_blocks(zip(cols.tolist(), rows.tolist())):
+            values = new[row_s:row_e + 1, col_s:col_e + 1].tolist()
+            target = CellRange(start_col + col_s, start_row + row_s, start_col + col_e, start_row + row_e)
+            sheet.set_array(values=values, name=target.name)
+
+        # 数据超出原有区域时才需要补画边框
+        if start_row + n_rows - 1 > used_rng.end_row_index or start_col + n_cols - 1 > used_rng.end_col_index:
+            self.formatter_range(sheet_n, f"{cell_name}:{self.get_end_name(sheet_n)}")
+        return len(rows)
+
+    def append_dataframe(self, sheet_n: int, data: pd.DataFrame, anchor_col: str = 'A',
+                         start_col: str | None = None) -> str:
+        n_rows, n_cols = data.shape
+        if n_rows == 0:
+            return ''
+        self.flush()
+        sheet = self.doc.sheets[sheet_n]
+        xsheet = sheet.component
+
+        # 一次内容查询找到锚定列的最后一行数据；不含公式单元格，锚定列中的合计等表尾公式不算作数据行
+        anchor_rng = sheet.get_range(range_name=f"{anchor_col}1:{anchor_col}1048576").component
+        filled = anchor_rng.queryContentCells(VALUE | DATETIME | STRING).getRangeAddresses()
+        last_row_idx = max((addr.EndRow for addr in filled), default=-1)
+
+        # 数据下方还有表尾时，一次插入所需的行
+        used_rng = sheet.find_used_range_obj()
+        if used_rng.end_row_index > last_row_idx:
+            xsheet.getRows().insertByIndex(last_row_idx + 1, n_rows)
+
+        col_idx = convert_cell_name_to_list(f"{start_col or anchor_col}1")[0]
+        first = convert_list_to_range_name([col_idx + 1, last_row_idx + 2])
+        last = convert_list_to_range_name([col_idx + n_cols, last_row_idx + 1 + n_rows])
+        values = frame_to_rows(data)
+        sheet.set_array(values=values, name=f"{first}:{last}")
+
+        # 将结束于原最后一行的合计公式延伸到新数据
+        formulas = {}
+        formula_rngs = sheet.get_range(range_obj=sheet.find_used_range_obj()).component
+        for addr in formula_rngs.queryContentCells(FORMULA).getRangeAddresses():
+            block = xsheet.getCellRangeByPosition(addr.StartColumn, addr.StartRow, addr.EndColumn, addr.EndRow)
+            for r, row in enumerate(block.getFormulaArray()):
+                for c, formula in enumerate(row):
+                    shifted = shift_range_end_rows(formula, last_row_idx + 1, n_rows)
+                    if shifted != formula:
+                        name = convert_list_to_range_name([addr.StartColumn + c + 1, addr.StartRow + r + 1])
+                        formulas[name] = shifted
+        self.set_formulas(sheet_n, formulas)
+        return f"{first}:{last}"
 
     # RangeObj
     # CalcCellRange
 
-    def merge_same_cells(self, sheet_n: int, start_cell_name: str, merge_list=None) -> None:
+    def _used_end_index(self, sheet_n: int) -> list:
         used_rng = self.doc.sheets[sheet_n].find_used_range_obj()
+        end = [used_rng.end_col_index, used_rng.end_row_index]
+        buffer = self._buffer(sheet_n)
+        extent = buffer.extent() if buffer is not None else None
+        if extent is not None:
+            end = [max(end[0], extent[0]), max(end[1], extent[1])]
+        return end
+
+    def _merge_range(self, sheet_n: int, col_start: int, row_start: int, col_end: int, row_end: int) -> None:
+        buffer = self._buffer(sheet_n)
+        if buffer is not None:
+            buffer.add_merge(col_start, row_start, col_end, row_end)
+            return
+        self.doc.get_sheet(idx=sheet_n).get_range(col_start=col_start, row_start=row_start, col_end=col_end,
+                                                  row_end=row_end).merge_cells(center=True)
+
+    def merge_ranges(self, sheet_n: int, ranges) -> None:
+        # 合并区域不能再拼接，逐个按原样合并
+        for rng in ranges:
+            if isinstance(rng, str):
+                rng = CellRange.from_name(rng)
+            self._merge_range(sheet_n, *rng)
+
+    def merge_same_cells(self, sheet_n: int, start_cell_name: str, merge_list=None) -> None:
         start_list = convert_cell_name_to_list(start_cell_name)
-        end_idx = used_rng.end_row_index
+        end_idx = self._used_end_index(sheet_n)[1]
         col_idx = start_list[0]
-        sheet = self.doc.get_sheet(idx=sheet_n)
+        if start_list[1] > end_idx:
+            return
+        # 一次读出整列（含末尾的下一行），不再逐个单元格取值
+        col_name = get_cell_col_name(start_cell_name)
+        column = [row[0] for row in
+                  self.get_used_value(sheet_n, f"{col_name}{start_list[1] + 1}:{col_name}{end_idx + 2}")]
         start_row_idx = start_list[1]
         next_row_idx = start_row_idx + 1
         idx = 0
         while next_row_idx <= end_idx + 1:
-            start_cell = sheet.get_cell(col=col_idx, row=start_row_idx)
-            next_cell = sheet.get_cell(col=col_idx, row=next_row_idx)
+            start_value = column[start_row_idx - start_list[1]]
+            next_value = column[next_row_idx - start_list[1]]
             merge_flag = True
             if merge_list is not None and idx < len(merge_list) - 1:
                 merge_flag = merge_list[idx] == merge_list[idx + 1]
                 idx = idx + 1
-            if start_cell.value == next_cell.value and merge_flag:
+            if start_value == next_value and merge_flag:
                 next_row_idx = next_row_idx + 1
             else:
                 if next_row_idx > start_row_idx + 1:
-                    sheet.get_range(col_start=col_idx, row_start=start_row_idx, col_end=col_idx,
-                                    row_end=next_row_idx - 1).merge_cells(center=True)
+                    self._merge_range(sheet_n, col_idx, start_row_idx, col_idx, next_row_idx - 1)
                 start_row_idx = next_row_idx
                 next_row_idx = next_row_idx + 1
 
@@ -131,48 +396,75 @@ class Workbook:
             return merge_ranges
         start_index = 0
         current_value = index[0]
-        sheet = self.doc.get_sheet(idx=sheet_n)
-        start_cell_name_list = convert_cell_name_to_list(start_cell_name)
-        col_name = get_cell_col_name(start_cell_name)
+        col_idx, row_idx = convert_cell_name_to_list(start_cell_name)
         for j in range(1, n):
             if index[j] != current_value:
-                if start_index <= j - 1:
-                    # 生成合并区域（至少两个单元格才合并）
-                    if (j - 1 - start_index) >= 1:
-                        start_row = start_cell_name_list[1] + 1 + start_index
-                        end_row = start_cell_name_list[1] + 1 + (j - 1)
-                        merge_range = f"{col_name}{start_row}:{col_name}{end_row}"
-                        merge_ranges.append(merge_range)
+                # 生成合并区域（至少两个单元格才合并）
+                if (j - 1 - start_index) >= 1:
+                    merge_ranges.append(CellRange(col_idx, row_idx + start_index, col_idx, row_idx + j - 1))
                 start_index = j
                 current_value = index[j]
 
         # 处理最后一个区间
-        if start_index <= n - 1:
-            if (n - 1 - start_index) >= 1:
-                start_row = start_cell_name_list[1] + 1 + start_index
-                end_row = start_cell_name_list[1] + 1 + (n - 1)
-                merge_range = f"{col_name}{start_row}:{col_name}{end_row}"
-                merge_ranges.append(merge_range)
+        if (n - 1 - start_index) >= 1:
+            merge_ranges.append(CellRange(col_idx, row_idx + start_index, col_idx, row_idx + n - 1))
 
-        for m in merge_ranges:
-            sheet.get_range(range_name=m).merge_cells(center=True)
-            # return merge_ranges
+        self.merge_ranges(sheet_n, merge_ranges)
+        # return merge_ranges
 
-    def sum_col(self, sheet_n: int, sum_cell_name: str, end_cell_name: None | str = None) -> None:
-        sheet = self.doc.get_sheet(idx=sheet_n)
-        cell = sheet.get_cell(cell_name=sum_cell_name)
+    def _sum_range_name(self, sum_cell_name: str, end_cell_name: None | str, used_end_idx: int) -> str:
         sum_cell_list = convert_cell_name_to_list(sum_cell_name)
         col_name = get_cell_col_name(cell_name=sum_cell_name)
-        range_name = None
         if end_cell_name is None:
-            used_rng = sheet.find_used_range_obj()
             start_idx = sum_cell_list[1] + 2
-            end_idx = used_rng.end_row_index + 1
-            range_name = f"{col_name}{start_idx}:{col_name}{end_idx}"
+            end_idx = used_end_idx + 1
         else:
             used_list = convert_cell_name_to_list(end_cell_name)
             end_idx = used_list[1] + 1
             start_idx = sum_cell_list[1] + 2 if sum_cell_list[1] < end_idx else sum_cell_list[1]
-            range_name = f"{col_name}{start_idx}:{col_name}{end_idx}"
+        return f"{col_name}{start_idx}:{col_name}{end_idx}"
+
+    def sum_col(self, sheet_n: int, sum_cell_name: str, end_cell_name: None | str = None) -> None:
+        used_end_idx = self._used_end_index(sheet_n)[1] if end_cell_name is None else None
+        range_name = self._sum_range_name(sum_cell_name, end_cell_name, used_end_idx)
         # print(f"=SUM({range_name})")
-        cell.set_val(f"=SUM({range_name})")
+        self.set_formulas(sheet_n, {sum_cell_name: f"=SUM({range_name})"})
+
+    def sum_cols(self, sheet_n: int, sum_cell_names: [], end_cell_name: None | str = None) -> None:
+        # 已使用区域只查询一次，所有求和公式一起写入
+        used_end_idx = self._used_end_index(sheet_n)[1] if end_cell_name is None else None
+        formulas = {}
+        for name in sum_cell_names:
+            formulas[name] = f"=SUM({self._sum_range_name(name, end_cell_name, used_end_idx)})"
+        self.set_formulas(sheet_n, formulas)
+
+    def set_formulas(self, sheet_n: int, formulas: dict) -> None:
+        if not formulas:
+            return
+        buffer = self._buffer(sheet_n)
+        if buffer is not None:
+            for name, formula in formulas.items():
+                buffer.set_value(*convert_cell_name_to_list(name), formula, formula=True)
+            return
+        sheet = self.doc.get_sheet(idx=sheet_n)
+        cells = {tuple(convert_cell_name_to_list(name)): formula for name, formula in formulas.items()}
+        blocks = group_cells_into_blocks(cells.keys())
+
+        # 写入期间关闭自动计算，恢复时只重算一次
+        calc_doc = self.doc.component
+        auto_calc = calc_doc.isAutomaticCalculationEnabled()
+        calc_doc.enableAutomaticCalculation(False)
+        try:
+            for col_start, row_start, col_end, row_end in blocks:
+                rows = tuple(
+                    tuple(cells[(col, row)] for col in range(col_start, col_end + 1))
+                    for row in range(row_start, row_end + 1)
+                )
+                rng = sheet.get_range(col_start=col_start, row_start=row_start, col_end=col_end, row_end=row_end)
+                rng.component.setFormulaArray(rows)
+        finally:
+            calc_doc.enableAutomaticCalculation(auto_calc)
+
+
+# 模板文档属于当前 office 实例，实例关闭后不能再复用
+OfficeLoader.register_close(Workbook.release_templates)
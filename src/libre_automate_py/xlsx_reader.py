@@ -0,0 +1,109 @@
+from __future__ import annotations
+import posixpath
+import zipfile
+from typing import Dict, List, Tuple
+from xml.etree.ElementTree import iterparse, parse
+
+# 不依赖 soffice 的 xlsx 读取器，只解析需要的前几行，用于表头检查等轻量场景
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def _sheet_path(archive: zipfile.ZipFile, sheet_n: int) -> str:
+    sheets = parse(archive.open('xl/workbook.xml')).getroot().find(f'{_NS_MAIN}sheets')
+    rel_id = list(sheets)[sheet_n].get(f'{_NS_REL}id')
+    for rel in parse(archive.open('xl/_rels/workbook.xml.rels')).getroot().iter(f'{_NS_PKG}Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            return target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+    raise KeyError(f"Sheet {sheet_n} not found")
+
+
+def _item_text(elem) -> str:
+    # <si>/<is> 的文本：直接的 <t> 和富文本 <r> 中的 <t>，跳过注音 <rPh> 中的假名
+    parts = []
+    for child in elem:
+        if child.tag == f'{_NS_MAIN}t':
+            parts.append(child.text or '')
+        elif child.tag == f'{_NS_MAIN}r':
+            parts.append(child.findtext(f'{_NS_MAIN}t') or '')
+    return ''.join(parts)
+
+
+def _shared_strings(archive: zipfile.ZipFile, needed: int) -> List[str]:
+    # 共享字符串表可能很大，只解析到需要的最大下标为止
+    strings = []
+    if needed < 0 or 'xl/sharedStrings.xml' not in archive.namelist():
+        return strings
+    for _, elem in iterparse(archive.open('xl/sharedStrings.xml')):
+        if elem.tag == f'{_NS_MAIN}si':
+            strings.append(_item_text(elem))
+            elem.clear()
+            if len(strings) > needed:
+                break
+    return strings
+
+
+def read_xlsx_rows(path: str, sheet_n: int = 0, max_rows: int | None = None) -> Tuple[Tuple, ...]:
+    """
+    读取 xlsx 工作表的前 max_rows 行，返回与 get_used_value 相同形式的二维元组
+
+    数值为 float，空单元格为 ''。与 soffice 的已使用区域一致，去掉开头的空行和空列，
+    max_rows 从第一个非空行开始计算
+    """
+    with zipfile.ZipFile(path) as archive:
+        rows: Dict[int, Dict[int, object]] = {}
+        shared_refs = []
+        row_idx = -1
+        first_row = None
+        for _, elem in iterparse(archive.open(_sheet_path(archive, sheet_n))):
+            if elem.tag != f'{_NS_MAIN}row':
+                continue
+            row_idx = int(elem.get('r')) - 1 if elem.get('r') else row_idx + 1
+            if max_rows is not None and first_row is not None and row_idx >= first_row + max_rows:
+                break
+            cells = {}
+            col_idx = -1
+            for cell in elem.iter(f'{_NS_MAIN}c'):
+                ref = cell.get('r')
+                if ref is not None:
+                    col_idx = 0
+                    for ch in ref.rstrip('0123456789'):
+                        col_idx = col_idx * 26 + ord(ch) - 64
+                    col_idx -= 1
+                else:
+                    # 省略了 r 属性的单元格紧接在前一个单元格之后
+                    col_idx += 1
+                cell_type = cell.get('t')
+                value = cell.find(f'{_NS_MAIN}v')
+                if cell_type == 'inlineStr':
+                    inline = cell.find(f'{_NS_MAIN}is')
+                    cells[col_idx] = _item_text(inline) if inline is not None else ''
+                elif value is None or value.text is None:
+                    continue
+                elif cell_type == 's':
+                    cells[col_idx] = int(value.text)
+                    shared_refs.append((row_idx, col_idx))
+                elif cell_type in ('str', 'e'):
+                    cells[col_idx] = value.text
+                else:
+                    cells[col_idx] = float(value.text)
+            if cells:
+                rows[row_idx] = cells
+                if first_row is None:
+                    first_row = row_idx
+            elem.clear()
+
+        strings = _shared_strings(archive, max((rows[r][c] for r, c in shared_refs), default=-1))
+        for r, c in shared_refs:
+            rows[r][c] = strings[rows[r][c]]
+
+    if not rows:
+        return ()
+    first_col = min(min(cells) for cells in rows.values())
+    last_col = max(max(cells) for cells in rows.values())
+    return tuple(
+        tuple(rows.get(r, {}).get(c, '') for c in range(first_col, last_col + 1))
+        for r in range(first_row, max(rows) + 1)
+    )
@@ -0,0 +1,43 @@
+import os
+import sys
+import zipfile
+import pytest
+
+# 包内模块之间使用平铺导入（如 from myutil import ...），测试时把包目录加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'libre_automate_py'))
+
+
+def _xlsx_cell(ref, value, shared):
+    if isinstance(value, str):
+        if value not in shared:
+            shared.append(value)
+        return f'<c r="{ref}" t="s"><v>{shared.index(value)}</v></c>'
+    return f'<c r="{ref}"><v>{value}</v></c>'
+
+
+@pytest.fixture
+def make_xlsx(tmp_path):
+    """按二维列表生成只含一个工作表的最小 xlsx 文件，'' 表示空单元格"""
+    def make(name, rows):
+        shared = []
+        sheet_rows = []
+        for r, row in enumerate(rows, start=1):
+            cells = ''.join(_xlsx_cell(f"{chr(65 + c)}{r}", v, shared) for c, v in enumerate(row) if v != '')
+            sheet_rows.append(f'<row r="{r}">{cells}</row>')
+        main = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+        rel = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+        pkg = 'http://schemas.openxmlformats.org/package/2006/relationships'
+        path = tmp_path / name
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('xl/workbook.xml',
+                             f'<workbook xmlns="{main}" xmlns:r="{rel}"><sheets>'
+                             f'<sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+            archive.writestr('xl/_rels/workbook.xml.rels',
+                             f'<Relationships xmlns="{pkg}"><Relationship Id="rId1" '
+                             f'Type="{rel}/worksheet" Target="worksheets/sheet1.xml"/></Relationships>')
+            archive.writestr('xl/worksheets/sheet1.xml',
+                             f'<worksheet xmlns="{main}"><sheetData>{"".join(sheet_rows)}</sheetData></worksheet>')
+            archive.writestr('xl/sharedStrings.xml',
+                             f'<sst xmlns="{main}">{"".join(f"<si><t>{s}</t></si>" for s in shared)}</sst>')
+        return str(path)
+    return make
@@ -0,0 +1,119 @@
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from src.libre_automate_py.convert import convert, output_path, main
+
+
+class TestConvert:
+    """测试批量格式转换"""
+
+    def test_output_path(self):
+        """测试目标路径换扩展名，可指定输出目录"""
+        assert output_path('in/data.xls', 'XLSX', 'out') == os.path.join('out', 'data.xlsx')
+        assert output_path('in/teml.doc', '.pdf') == os.path.join(os.path.abspath('in'), 'teml.pdf')
+
+    @patch('src.libre_automate_py.convert.Props')
+    @patch('src.libre_automate_py.convert.FileIO')
+    @patch('src.libre_automate_py.convert.OfficeLoader')
+    @patch('src.libre_automate_py.convert.Lo')
+    def test_convert_chooses_filter_by_document(self, mock_lo, mock_office_loader, mock_fileio, mock_props):
+        """测试隐藏只读加载，并按文档类型选择导出过滤器"""
+        sheet = MagicMock()
+        sheet.supportsService.return_value = True
+        text = MagicMock()
+        text.supportsService.return_value = False
+        mock_lo.get_desktop.return_value.loadComponentFromURL.side_effect = [sheet, text]
+        mock_fileio.fnm_to_url.side_effect = lambda p: f"file://{p}"
+        mock_props.make_props.side_effect = lambda **kw: kw
+
+        results = list(convert(['data.xls', 'teml.doc'], 'pdf', output_dir='out', filter_options='44,34,76'))
+
+        assert [error for _, _, error in results] == [None, None]
+        load_props = mock_lo.get_desktop.return_value.loadComponentFromURL.call_args_list[0][0][3]
+        assert load_props == {'Hidden': True, 'ReadOnly': True, 'FilterOptions': '44,34,76'}
+        assert sheet.storeToURL.call_args[0][1]['FilterName'] == 'calc_pdf_Export'
+        assert text.storeToURL.call_args[0][1]['FilterName'] == 'writer_pdf_Export'
+        sheet.close.assert_called_once_with(True)
+        text.close.assert_called_once_with(True)
+
+    @patch('src.libre_automate_py.convert.FileIO')
+    @patch('src.libre_automate_py.convert.OfficeLoader')
+    @patch('src.libre_automate_py.convert.Lo')
+    def test_convert_reports_errors(self, mock_lo, mock_office_loader, mock_fileio):
+        """测试单个文件失败时返回错误信息，并关闭已加载的文档"""
+        component = MagicMock()
+        component.supportsService.return_value = False
+        component.storeToURL.side_effect = RuntimeError("IOException")
+        mock_lo.get_desktop.return_value.loadComponentFromURL.return_value = component
+
+        (src, dst, error), = convert(['teml.doc'], 'docx')
+
+        assert src == 'teml.doc'
+        assert error == "RuntimeError: IOException"
+        component.close.assert_called_once_with(True)
+
+    @patch('src.libre_automate_py.convert._convert_one')
+    def test_convert_rejects_collisions(self, mock_convert_one):
+        """测试输出重名或覆盖源文件时在开始转换前报错"""
+        with pytest.raises(ValueError, match='both'):
+            convert(['in/data.xls', 'in/data.doc'], 'pdf')
+        with pytest.raises(ValueError, match='overwrite'):
+            convert(['in/data.xlsx'], 'xlsx')
+        with pytest.raises(ValueError, match='overwrite'):
+            convert(['in/data.xls', 'in/data.xlsx'], 'xlsx')
+        mock_convert_one.assert_not_called()
+
+        # 输出到其他目录时不冲突
+        assert len(list(convert(['in/data.xlsx'], 'xlsx', output_dir='out'))) == 1
+
+    def test_main_rejects_collisions(self, capsys):
+        """测试命令行遇到输出重名时报错退出"""
+        with pytest.raises(SystemExit) as exc:
+            main(['data.xls', 'data.doc', '--to', 'pdf'])
+        assert exc.value.code == 2
+        assert 'data.pdf' in capsys.readouterr().err
+
+    @patch('src.libre_automate_py.convert.OfficePool')
+    def test_convert_workers(self, mock_pool):
+        """测试多个工作进程时交给 OfficePool，按完成顺序返回"""
+        pool = mock_pool.return_value.__enter__.return_value
+        pool.imap_unordered.return_value = iter([('b.xls', 'b.xlsx', None), ('a.xls', 'a.xlsx', None)])
+
+        results = list(convert(['a.xls', 'b.xls'], 'xlsx', workers=4))
+
+        assert results == [('b.xls', 'b.xlsx', None), ('a.xls', 'a.xlsx', None)]
+        mock_pool.assert_called_once_with(4)
+
+    @patch('src.libre_automate_py.convert.OfficeLoader')
+    @patch('src.libre_automate_py.convert.convert')
+    def test_main(self, mock_convert, mock_office_loader, capsys):
+        """测试命令行输出进度，有失败时返回非零"""
+        # convert 返回生成器，main 结束时会关闭它
+        rows = [('a.xls', 'a.xlsx', None), ('b.xls', 'b.xlsx', 'RuntimeError: x')]
+        mock_convert.return_value = (row for row in rows)
+
+        code = main(['a.xls', 'b.xls', '--to', 'xlsx'])
+
+        assert code == 1
+        captured = capsys.readouterr()
+        assert '[1/2] a.xls -> a.xlsx' in captured.out
+        assert 'b.xls' in captured.err
+        mock_convert.assert_called_once_with(['a.xls', 'b.xls'], 'xlsx', None, 1, None)
+
+    @patch('src.libre_automate_py.convert.OfficePool')
+    @patch('src.libre_automate_py.convert.OfficeLoader')
+    @patch('src.libre_automate_py.convert._convert_one')
+    def test_main_cleans_up_on_error(self, mock_convert_one, mock_office_loader, mock_pool):
+        """测试转换中途抛出异常时仍关闭 soffice 和进程池"""
+        mock_convert_one.side_effect = KeyboardInterrupt
+        with pytest.raises(KeyboardInterrupt):
+            main(['a.xls', 'b.xls', '--to', 'xlsx'])
+        mock_office_loader.close.assert_called_once()
+
+        pool = mock_pool.return_value.__enter__.return_value
+        pool.imap_unordered.return_value = iter([('a.xls', 'a.xlsx', None)])
+        with patch('builtins.print', side_effect=OSError("broken pipe")):
+            with pytest.raises(OSError):
+                main(['a.xls', 'b.xls', '--to', 'xlsx', '-j', '2'])
+        mock_pool.return_value.__exit__.assert_called_once()
+        mock_office_loader.close.assert_called_once()
@@ -0,0 +1,113 @@
+import multiprocessing
+import uuid
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from multiprocessing import shared_memory
+from src.libre_automate_py.dataset_cache import DatasetCache
+
+
+def _sum_in_worker(lock, key, queue):
+    cache = DatasetCache(lock)
+    df = cache.attach(key)
+    queue.put((float(df['金额'].sum()), list(df['机构'].astype(str))))
+    del df
+    cache.close()
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        '机构': ['甲', '乙', '甲', None],
+        '金额': [1.5, 2.0, 3.0, np.nan],
+        '笔数': pd.array([1, None, 3, 4], dtype='Int64'),
+        '日期': pd.to_datetime(['2024-01-01', '2024-02-01', None, '2024-03-01']),
+    })
+
+
+class TestDatasetCache:
+    """测试共享内存数据集缓存"""
+
+    def test_publish_and_attach(self, frame):
+        """测试发布后在另一个缓存实例中零拷贝附加"""
+        key = f"test-{uuid.uuid4()}"
+        owner, reader = DatasetCache(), DatasetCache()
+        frame.attrs['date_formats'] = {'日期': ['%Y/%m/%d', True]}
+        published = owner.publish(key, frame)
+        attached = reader.attach(key)
+        assert attached.attrs == frame.attrs
+
+        assert list(attached.columns) == list(frame.columns)
+        assert attached['金额'].equals(frame['金额'])
+        assert attached['笔数'].equals(frame['笔数'])
+        assert attached['日期'].equals(frame['日期'])
+        assert attached['机构'].tolist()[:3] == ['甲', '乙', '甲']
+        assert pd.isna(attached['机构'].iloc[3])
+        assert attached['机构'].dtype == 'category'
+        assert np.shares_memory(attached['金额'].to_numpy(), reader._handles[key][1].buf)
+        # 共享内存只读，原地修改会报错，不会影响其他进程看到的数据
+        with pytest.raises(ValueError):
+            attached['金额'].to_numpy()[0] = 0.0
+        with pytest.raises(ValueError):
+            attached['笔数'].array._data[0] = 0
+        copied = attached.copy()
+        copied.iloc[0, 1] = 0.0
+        assert attached['金额'].iloc[0] == 1.5
+
+        del published, attached, copied
+        reader.release(key)
+        assert reader.attach(key) is not None
+        reader.close()
+        owner.close()
+        assert DatasetCache().attach(key) is None
+
+    def test_publish_failure_unlinks_meta(self, frame):
+        """测试数据块分配失败时删除已创建的元数据块"""
+        key = f"test-{uuid.uuid4()}"
+        real = shared_memory.SharedMemory
+
+        def fake(name=None, create=False, size=0):
+            if create and name.endswith('_d'):
+                raise OSError(28, "No space left on device")
+            return real(name=name, create=create, size=size)
+
+        cache = DatasetCache()
+        with patch('src.libre_automate_py.dataset_cache.shared_memory.SharedMemory', side_effect=fake):
+            with pytest.raises(OSError):
+                cache.publish(key, frame)
+
+        assert cache.attach(key) is None
+        # 元数据块已删除，可以重新发布
+        cache.publish(key, frame)
+        cache.close()
+
+    def test_get_or_load(self, frame):
+        """测试只调用一次加载函数"""
+        key = f"test-{uuid.uuid4()}"
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return frame
+
+        with DatasetCache() as a, DatasetCache() as b:
+            a.get_or_load(key, loader)
+            b.get_or_load(key, loader)
+        assert calls == [1]
+        assert DatasetCache().attach(key) is None
+
+    def test_worker_process(self, frame):
+        """测试其他进程按 key 附加"""
+        key = f"test-{uuid.uuid4()}"
+        lock = multiprocessing.Lock()
+        with DatasetCache(lock) as cache:
+            cache.publish(key, frame)
+            queue = multiprocessing.Queue()
+            worker = multiprocessing.Process(target=_sum_in_worker, args=(lock, key, queue))
+            worker.start()
+            total, names = queue.get(timeout=30)
+            worker.join()
+        assert total == 6.5
+        assert names[:3] == ['甲', '乙', '甲']
+        assert DatasetCache().attach(key) is None
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from src.libre_automate_py.grid import Grid
+
+
+class TestGrid:
+    """测试按列保存的表格数据"""
+
+    def test_from_rows_types(self):
+        """测试数值列转为 float64 加空值掩码，混合列保留 object"""
+        rows = (('a', 1.0, ''), ('b', '', 2.0), ('', 3.0, ''))
+        grid = Grid.from_rows(rows)
+
+        assert grid.shape == (3, 3)
+        assert grid.columns[0].dtype == object
+        assert grid.columns[1].dtype == np.float64
+        assert grid.masks[1].tolist() == [False, True, False]
+        assert grid.to_rows() == rows
+        assert grid[1] == ('b', '', 2.0)
+        assert list(grid) == list(rows)
+
+    def test_slice_is_view(self):
+        """测试行切片不复制数据"""
+        grid = Grid.from_rows(tuple((float(i), 'x') for i in range(10)))
+        part = grid[2:5]
+        assert len(part) == 3
+        assert np.shares_memory(part.columns[0], grid.columns[0])
+        assert part[0] == (2.0, 'x')
+
+    def test_frame_round_trip(self):
+        """测试与 DataFrame 互相转换，数值列共享内存"""
+        df = pd.DataFrame({
+            'x': [1.5, None],
+            'd': pd.to_datetime(['2024-01-01', None]),
+            's': ['a', None],
+        })
+        grid = Grid.from_frame(df)
+        assert grid.names == ['x', 'd', 's']
+        assert np.shares_memory(grid.columns[0], df['x'].to_numpy())
+        assert grid.to_rows() == ((1.5, '2024-01-01', 'a'), ('', '', ''))
+
+        frame = grid.to_frame()
+        assert list(frame.columns) == ['x', 'd', 's']
+        assert np.shares_memory(frame['x'].to_numpy(), grid.columns[0])
+
+    def test_nonempty_rows(self):
+        """测试空行识别"""
+        grid = Grid.from_rows((('a', 1.0), ('', ''), ('', 2.0)))
+        assert grid.nonempty_rows().tolist() == [True, False, True]
+        assert len(grid.take(grid.nonempty_rows())) == 2
+
+    def test_memory(self):
+        """测试数值数据占用远小于元组"""
+        grid = Grid.from_rows(tuple(tuple(float(i * 10 + j) for j in range(10)) for i in range(1000)))
+        assert grid.nbytes <= 10 * 1000 * 9
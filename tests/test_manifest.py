@@ -0,0 +1,68 @@
+import os
+import pytest
+from src.libre_automate_py.manifest import BuildManifest, file_hash
+
+
+class TestBuildManifest:
+    """测试构建清单"""
+
+    @pytest.fixture
+    def files(self, tmp_path):
+        src = tmp_path / 'src.xlsx'
+        tpl = tmp_path / 'tpl.xlsx'
+        out = tmp_path / 'out.xlsx'
+        src.write_bytes(b'source')
+        tpl.write_bytes(b'template')
+        out.write_bytes(b'output')
+        return str(src), str(tpl), str(out), str(tmp_path / 'build_manifest.json')
+
+    def test_file_hash(self, tmp_path):
+        """测试相同内容得到相同摘要"""
+        a, b = tmp_path / 'a', tmp_path / 'b'
+        a.write_bytes(b'x' * 3_000_000)
+        b.write_bytes(b'x' * 3_000_000)
+        assert file_hash(str(a)) == file_hash(str(b))
+        b.write_bytes(b'y')
+        assert file_hash(str(a)) != file_hash(str(b))
+
+    def test_unchanged_skips(self, files):
+        """测试记录后未变化的报表不需要重建，且清单可持久化"""
+        src, tpl, out, path = files
+        manifest = BuildManifest(path)
+        assert manifest.needs_rebuild('report', [src, tpl], [out])
+
+        manifest.record('report', [src, tpl], [out], params={'date': '2025年3月'})
+        manifest.save()
+
+        reloaded = BuildManifest(path)
+        assert not reloaded.needs_rebuild('report', [src, tpl], [out], params={'date': '2025年3月'})
+        assert reloaded.needs_rebuild('report', [src, tpl], [out], params={'date': '2025年4月'})
+
+    def test_changes_trigger_rebuild(self, files):
+        """测试输入变化、输出被删除时需要重建"""
+        src, tpl, out, path = files
+        manifest = BuildManifest(path)
+        manifest.record('report', [src, tpl], [out])
+
+        with open(src, 'wb') as f:
+            f.write(b'changed source')
+        assert manifest.needs_rebuild('report', [src, tpl], [out])
+
+        manifest.record('report', [src, tpl], [out])
+        os.remove(out)
+        assert manifest.needs_rebuild('report', [src, tpl], [out])
+
+    def test_touch_without_change(self, files):
+        """测试仅修改时间变化时重新计算摘要但不触发重建"""
+        src, tpl, out, path = files
+        manifest = BuildManifest(path)
+        manifest.record('report', [src], [out])
+        os.utime(src, ns=(0, 0))
+        assert not manifest.needs_rebuild('report', [src], [out])
+
+    def test_record_missing_output(self, files):
+        """测试输出不存在时不能记录"""
+        src, tpl, out, path = files
+        manifest = BuildManifest(path)
+        with pytest.raises(FileNotFoundError):
+            manifest.record('report', [src], [out + '.missing'])
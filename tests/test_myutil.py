@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import pandas as pd
 import os
 import tempfile
@@ -14,7 +15,24 @@ from src.libre_automate_py.myutil import (
     convert_range_name_to_list,
     convert_list_to_range_name,
     reorder_dataframe_columns,
-    check_files_exist
+    check_files_exist,
+    group_cells_into_blocks,
+    shift_range_end_rows,
+    probe_schema,
+    Grid,
+    column_name_to_index,
+    column_index_to_name,
+    parse_cell_name,
+    parse_range_name,
+    encode_cells,
+    decode_cells,
+    MAX_COLS,
+    MAX_ROWS,
+    format_values,
+    infer_column_kind,
+    frame_to_rows,
+    load_schema_cache,
+    save_schema_cache
 )
 
 
@@ -97,6 +115,88 @@ class TestMyUtilFunctions:
         assert result['mixed'].dtype == 'string'
         assert result['text'].dtype == 'string'
     
+    def test_infer_column_kind(self):
+        """测试列类型推断"""
+        assert infer_column_kind(pd.Series(['1', '2', '', '4'], dtype=object)) == 'int'
+        assert infer_column_kind(pd.Series(['1.5', '2', None], dtype=object)) == 'float'
+        assert infer_column_kind(pd.Series(['2025-03-01', '2025-03-31', ''], dtype=object)) == 'date:%Y-%m-%d'
+        assert infer_column_kind(pd.Series(['甲支行', '乙支行'] * 10, dtype=object)) == 'category'
+        assert infer_column_kind(pd.Series(['apple', 'banana'], dtype=object)) == 'string'
+        assert infer_column_kind(pd.Series(['', ''], dtype=object)) == 'string'
+
+    def test_auto_convert_objects_kinds(self):
+        """测试日期、分类和可空整数列的转换"""
+        df = pd.DataFrame({
+            '贷款发放行名称': ['甲支行', '乙支行', '甲支行', '丙支行'] * 3,
+            '发放日期': ['2025-01-0' + str(i % 9 + 1) for i in range(12)],
+            '欠本天数': ['1', '', '3', '4'] * 3,
+            '贷款余额': ['1.5', '2', '3', '4'] * 3,
+        })
+        result = auto_convert_objects(df)
+
+        assert result['贷款发放行名称'].dtype == 'category'
+        assert pd.api.types.is_datetime64_any_dtype(result['发放日期'])
+        assert result['欠本天数'].dtype == 'Int64'
+        assert result['欠本天数'].isna().sum() == 3
+        assert result['贷款余额'].dtype == 'float64'
+
+    def test_auto_convert_objects_overrides_and_cache(self):
+        """测试用户指定类型与按数据源缓存"""
+        df = pd.DataFrame({'code': ['001', '002'], 'name': ['a', 'b']})
+        result = auto_convert_objects(df, overrides={'code': 'string'}, source='test_source.xlsx')
+        assert result['code'].tolist() == ['001', '002']
+
+        # 缓存的类型直接复用
+        df2 = pd.DataFrame({'code': ['003', '004'], 'name': ['c', 'd']})
+        result2 = auto_convert_objects(df2, source='test_source.xlsx')
+        assert result2['code'].dtype == 'string'
+
+        # 缓存类型不适用时重新推断
+        df3 = pd.DataFrame({'x': ['1', '2']})
+        auto_convert_objects(df3, source='drift.xlsx')
+        df4 = pd.DataFrame({'x': ['1.5', 'n/a']})
+        assert auto_convert_objects(df4, source='drift.xlsx')['x'].dtype == 'string'
+
+        # 指定的类型无法转换时报错
+        with pytest.raises(ValueError):
+            auto_convert_objects(pd.DataFrame({'x': ['a']}), overrides={'x': 'float'})
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'schema.json')
+            save_schema_cache(path)
+            load_schema_cache(path)
+
+    def test_frame_to_rows(self):
+        """测试 DataFrame 转为可写入的二维列表"""
+        df = pd.DataFrame({
+            'a': pd.array([1, None], dtype='Int64'),
+            'b': [1.5, None],
+            'c': pd.to_datetime(['2025-03-01', None]),
+            'd': pd.Categorical(['x', 'y']),
+        })
+        assert frame_to_rows(df) == [[1, 1.5, '2025-03-01', 'x'], ['', '', '', 'y']]
+
+    def test_frame_to_rows_date_round_trip(self):
+        """测试由文本推断的日期列按原文本格式写回"""
+        data = (
+            ('斜杠', '中文', '中文补零', 'ISO'),
+            ('2024/01/15', '2024年1月5日', '2024年01月05日', '2024-1-5'),
+            ('2024/12/01', '2024年12月31日', '2024年12月31日', '2024-12-31'),
+            ('2025/03/09', '', '2025年03月09日', '2025-3-9'),
+        )
+        df = array2df(data)
+        assert df['中文'].dtype.kind == 'M'
+
+        rows = frame_to_rows(df)
+
+        assert rows == [
+            ['2024/01/15', '2024年1月5日', '2024年01月05日', '2024-1-5'],
+            ['2024/12/01', '2024年12月31日', '2024年12月31日', '2024-12-31'],
+            ['2025/03/09', '', '2025年03月09日', '2025-3-9'],
+        ]
+        # 列顺序变化后仍按列名找到格式
+        assert frame_to_rows(df[['中文', '斜杠']])[0] == ['2024年1月5日', '2024/01/15']
+
     def test_array2df(self):
         """测试数组转DataFrame函数"""
         # 测试数据
@@ -117,6 +217,111 @@ class TestMyUtilFunctions:
         assert result.iloc[1]['Name'] == 'Bob'
         assert result.iloc[2]['Name'] == 'Charlie'
     
+    def test_array2df_empty_rows(self):
+        """默认去掉整行为空的数据行，drop_empty_rows=False 时保留，行数与表格一致"""
+        data = (
+            ('Name', 'Age'),
+            ('Alice', 25.0),
+            ('', ''),
+            ('Bob', ''),
+        )
+        for rows in (data, Grid.from_rows(data)):
+            assert array2df(rows)['Name'].tolist() == ['Alice', 'Bob']
+
+            result = array2df(rows, drop_empty_rows=False)
+            assert len(result) == 3
+            assert result['Name'].tolist()[::2] == ['Alice', 'Bob']
+            assert result['Age'].isna().tolist() == [False, True, True]
+
+    def test_array2df_keeps_rows_equal_to_header(self):
+        """与列名相同的数据行不应被丢弃，表头之前的标题行应被跳过"""
+        data = (
+            ('报表标题', '', ''),
+            ('Name', 'Age', 'City'),
+            ('Alice', '25', 'New York'),
+            ('Name', 'Age', 'City'),
+        )
+        result = array2df(data)
+        assert list(result.columns) == ['Name', 'Age', 'City']
+        assert list(result['Name']) == ['Alice', 'Name']
+
+    def test_array2df_explicit_header(self):
+        """指定表头行号或无表头"""
+        data = (
+            ('a', '', 'c'),
+            ('1', '2', '3'),
+        )
+        result = array2df(data, header=0)
+        assert list(result.columns) == ['a', '', 'c']
+        assert result.iloc[0]['a'] == 1
+
+        result = array2df(data, header=None)
+        assert list(result.columns) == [0, 1, 2]
+        assert len(result) == 2
+
+    def test_array2df_multi_row_header(self):
+        """多行合并表头拼接列名，重复列名加后缀"""
+        data = (
+            ('机构', '贷款', '', '贷款'),
+            ('', '笔数', '金额', '笔数'),
+            ('A', '1', '2.5', '3'),
+        )
+        result = array2df(data, header=0, header_rows=2)
+        assert list(result.columns) == ['机构', '贷款_笔数', '贷款_金额', '贷款_笔数.1']
+        assert result.iloc[0]['贷款_金额'] == 2.5
+
+    def test_array2df_no_header(self):
+        """找不到表头时报错"""
+        with pytest.raises(ValueError):
+            array2df((('a', ''), ('', 'b')))
+
+    def test_array2df_grid(self):
+        """测试 Grid 输入与二维元组输入的类型推断和类型覆盖结果一致"""
+        data = (
+            ('Name', 'Age', 'Rate', 'id', 'Empty', 'Mixed'),
+            ('Alice', 25.0, 0.5, 1001.0, '', 1.0),
+            ('', '', '', '', '', ''),
+            ('Bob', 30.0, '', 1002.0, '', 'x'),
+            ('Carol', '', 1.25, 1003.0, '', 2.0),
+        )
+        for overrides in (None, {'id': 'string', 'Age': 'float'}):
+            expected = array2df(data, overrides=overrides)
+            result = array2df(Grid.from_rows(data), overrides=overrides)
+            pd.testing.assert_series_equal(result.dtypes, expected.dtypes)
+            pd.testing.assert_frame_equal(result, expected)
+
+        result = array2df(Grid.from_rows(data))
+        assert result['Age'].dtype == 'Int64'
+        assert result['Rate'].dtype == 'float64'
+        assert array2df(Grid.from_rows(data), overrides={'id': 'string'})['id'].dtype == 'string'
+
+        # 指定为整数但含小数的列与元组输入一样报错
+        with pytest.raises(ValueError):
+            array2df(Grid.from_rows(data), overrides={'Rate': 'int'})
+        with pytest.raises(ValueError):
+            array2df(data, overrides={'Rate': 'int'})
+
+    def test_probe_schema(self, make_xlsx):
+        """测试只读表头检查列名，一次报告所有问题"""
+        good = make_xlsx('good.xlsx', [['标题', '', ''], ['客户名称', '贷款余额', '五级分类'], ['A', 1, '正常']])
+        typo = make_xlsx('typo.xlsx', [['客户名', '贷款余额', '五级分类']])
+        missing = good + '.missing.xlsx'
+        expected = ['客户名称', '贷款余额', '五级分类']
+
+        assert probe_schema([good], expected) == {}
+
+        problems = probe_schema([good, typo, missing], expected, raise_error=False)
+        assert set(problems) == {typo, missing}
+        assert "'客户名称'" in problems[typo]
+
+        with pytest.raises(ValueError) as e:
+            probe_schema([typo, missing], {typo: expected, missing: expected})
+        assert typo in str(e.value) and missing in str(e.value)
+
+        # 字典中缺少某个文件时作为问题报告，而不是抛出 KeyError
+        problems = probe_schema([good, typo], {typo: expected}, raise_error=False)
+        assert problems[good] == "no expected columns given"
+
     def test_process_value_to_str(self):
         """测试值处理转字符串函数"""
         # 空值
@@ -154,6 +359,48 @@ class TestMyUtilFunctions:
         row = {'type': '-5', 'value': '15'}
         assert process_value_to_str(row) == '10'
     
+    def test_format_values(self):
+        """测试向量化格式化与逐行处理结果一致"""
+        df = pd.DataFrame({
+            'type': ['', '', '', '增减值', '增减值', '/10000', '*100', '+10', '-5', 'unknown', '/3', '增减值', ''],
+            'value': ['', 'text', '123.45', '10.5', '-5.2', '50000', '0.25', '20', '15', '123', '10', '0', ' 7.0 '],
+        })
+        expected = df.apply(process_value_to_str, axis=1)
+        result = format_values(df, 'value', 'type')
+
+        assert result.tolist() == expected.tolist()
+        assert result.tolist()[:5] == ['', 'text', '123.45', '增加10.5', '减少5.2']
+
+        # 保留位数
+        assert format_values(df, 'value', 'type', 0).tolist() == df.apply(
+            process_value_to_str, axis=1, decimal_places=0).tolist()
+
+        # 超出 int64 范围的长数字串和超出浮点范围的数，与 float() 解析结果一致
+        df = pd.DataFrame({
+            'type': ['', '/10000', '', '增减值'],
+            'value': ['123456789012345678901234', '123456789012345678901234', '1e400', '-1e400'],
+        })
+        assert format_values(df, 'value', 'type').tolist() == df.apply(process_value_to_str, axis=1).tolist()
+
+    def test_format_values_random(self):
+        """随机数据下与逐行处理结果一致"""
+        rng = np.random.default_rng(1)
+        n = 2000
+        numbers = rng.normal(0, 1e4, n)
+        df = pd.DataFrame({
+            'type': rng.choice(['', '增减值', '/10000', '*100', '+10', '-5', '/3'], n),
+            'value': [f"{x:.{i % 6}f}" for i, x in enumerate(numbers)],
+        })
+        assert format_values(df, 'value', 'type').tolist() == df.apply(process_value_to_str, axis=1).tolist()
+
+    def test_format_values_numeric_column(self):
+        """测试数值列与除零"""
+        df = pd.DataFrame({'type': ['', '/100', '增减值'], 'value': [1.5, 250.0, None]})
+        assert format_values(df, 'value', 'type').tolist() == ['1.5', '2.5', '']
+
+        with pytest.raises(ZeroDivisionError):
+            format_values(pd.DataFrame({'type': ['/0'], 'value': ['1']}), 'value', 'type')
+
     def test_get_cell_col_name(self):
         """测试获取单元格列名函数"""
         assert get_cell_col_name("A1") == "A"
@@ -232,6 +479,95 @@ class TestMyUtilFunctions:
         with pytest.raises(ValueError):
             convert_list_to_range_name(['a', 1])
     
+    def test_parse_cell_name_variants(self):
+        """测试绝对引用、带工作表名和 R1C1 形式的单元格地址"""
+        assert parse_cell_name("$A$1") == (0, 0)
+        assert parse_cell_name("A$10") == (0, 9)
+        assert parse_cell_name("Sheet1.B2") == (1, 1)
+        assert parse_cell_name("$Sheet1.$B$2") == (1, 1)
+        assert parse_cell_name("Sheet1!AA3") == (26, 2)
+        assert parse_cell_name("'My Sheet'!C4") == (2, 3)
+        assert parse_cell_name("R1C1") == (0, 0)
+        assert parse_cell_name("r10c28") == (27, 9)
+        assert parse_cell_name("XFD1048576") == (MAX_COLS - 1, MAX_ROWS - 1)
+
+        # 超出范围或格式错误
+        with pytest.raises(ValueError):
+            parse_cell_name("XFE1")
+        with pytest.raises(ValueError):
+            parse_cell_name("A1048577")
+        with pytest.raises(ValueError):
+            parse_cell_name("A0")
+        with pytest.raises(ValueError):
+            parse_cell_name("R0C1")
+
+    def test_parse_range_name_variants(self):
+        """测试整列、整行及带工作表名的区域地址"""
+        assert parse_range_name("$A$1:$C$3") == (0, 0, 2, 2)
+        assert parse_range_name("Sheet1.A1:B2") == (0, 0, 1, 1)
+        assert parse_range_name("A:C") == (0, 0, 2, MAX_ROWS - 1)
+        assert parse_range_name("3:5") == (0, 2, MAX_COLS - 1, 4)
+        assert parse_range_name("R1C1:R2C3") == (0, 0, 2, 1)
+
+    def test_column_codec_round_trip(self):
+        """测试所有列号（A 到 XFD）的编码与解码一致"""
+        for index in range(MAX_COLS):
+            name = column_index_to_name(index)
+            assert column_name_to_index(name) == index
+            assert convert_list_to_range_name([index + 1, 1]) == f"{name}1"
+        assert column_index_to_name(MAX_COLS - 1) == "XFD"
+        with pytest.raises(ValueError):
+            column_index_to_name(MAX_COLS)
+
+    def test_cell_codec_round_trip_property(self):
+        """随机抽样测试单元格地址与坐标的双向转换一致"""
+        rng = np.random.default_rng(20250301)
+        cols = np.concatenate([[0, 25, 26, 701, 702, MAX_COLS - 1], rng.integers(0, MAX_COLS, 5000)])
+        rows = np.concatenate([[0, 0, 1, MAX_ROWS - 1, 99, MAX_ROWS - 1], rng.integers(0, MAX_ROWS, 5000)])
+
+        names = encode_cells(cols, rows)
+        decoded_cols, decoded_rows = decode_cells(names)
+        assert np.array_equal(decoded_cols, cols)
+        assert np.array_equal(decoded_rows, rows)
+
+        # 批量结果与标量接口一致
+        for col, row, name in zip(cols[:500].tolist(), rows[:500].tolist(), names[:500].tolist()):
+            assert convert_list_to_range_name([col + 1, row + 1]) == name
+            assert convert_cell_name_to_list(name) == [col, row]
+
+    def test_decode_cells_invalid(self):
+        """测试批量解码的错误输入"""
+        with pytest.raises(ValueError):
+            decode_cells(["A1", "1A"])
+        with pytest.raises(ValueError):
+            encode_cells([MAX_COLS], [0])
+
+    def test_group_cells_into_blocks(self):
+        """测试单元格坐标合并为矩形块"""
+        # 同一行相邻列合并为一块
+        assert group_cells_into_blocks([[1, 3], [2, 3], [3, 3]]) == [[1, 3, 3, 3]]
+
+        # 不相邻的列分成两块
+        assert group_cells_into_blocks([[4, 3], [1, 3], [5, 3]]) == [[1, 3, 1, 3], [4, 3, 5, 3]]
+
+        # 列跨度相同的相邻行合并为矩形
+        cells = [[0, 0], [1, 0], [0, 1], [1, 1], [0, 3]]
+        assert group_cells_into_blocks(cells) == [[0, 0, 1, 1], [0, 3, 0, 3]]
+
+        # 空输入
+        assert group_cells_into_blocks([]) == []
+
+    def test_shift_range_end_rows(self):
+        """测试延伸公式中的区域引用"""
+        assert shift_range_end_rows("=SUM(F5:F20)", 20, 3) == "=SUM(F5:F23)"
+        assert shift_range_end_rows("=SUM($F$5:$F$20)", 20, 2) == "=SUM($F$5:$F$22)"
+
+        # 结束行不同的引用保持不变
+        assert shift_range_end_rows("=SUM(F5:F19)+G20", 20, 3) == "=SUM(F5:F19)+G20"
+
+        # 多个引用只延伸匹配的部分
+        assert shift_range_end_rows("=SUM(F5:F20)-SUM(G5:G10)", 20, 1) == "=SUM(F5:F21)-SUM(G5:G10)"
+
     def test_reorder_dataframe_columns(self):
         """测试DataFrame列重排序函数"""
         # 创建测试DataFrame
@@ -3,7 +3,7 @@ import unittest.mock as mock
 from unittest.mock import patch, MagicMock
 import threading
 import time
-from src.libre_automate_py.officeLoader import OfficeLoader
+from src.libre_automate_py.officeLoader import OfficeLoader, OfficePool, _init_worker
 
 
 class TestOfficeLoader:
@@ -13,6 +13,8 @@ class TestOfficeLoader:
         """每个测试方法前重置单例"""
         OfficeLoader._instance = None
         OfficeLoader._loader = None
+        OfficeLoader._connect_kwargs = {}
+        OfficeLoader._cache_obj = None
     
     def teardown_method(self):
         """每个测试方法后清理资源"""
@@ -78,6 +80,23 @@ class TestOfficeLoader:
         # 验证Lo.close_office被调用
         mock_lo.close_office.assert_called_once()
     
+    @patch('src.libre_automate_py.officeLoader.Lo')
+    def test_close_runs_callbacks_first(self, mock_lo):
+        """测试关闭 office 之前调用登记的回调，重复登记只调用一次"""
+        calls = []
+
+        def callback():
+            calls.append(mock_lo.close_office.called)
+
+        OfficeLoader()
+        with patch.object(OfficeLoader, '_close_callbacks', []):
+            OfficeLoader.register_close(callback)
+            OfficeLoader.register_close(callback)
+            OfficeLoader.close()
+
+        assert calls == [False]
+        mock_lo.close_office.assert_called_once()
+
     @patch('src.libre_automate_py.officeLoader.Lo')
     def test_close_not_initialized(self, mock_lo):
         """测试在未初始化时关闭不会报错"""
@@ -169,6 +188,64 @@ class TestOfficeLoader:
         # 验证Lo.load_office被调用两次
         assert mock_lo.load_office.call_count == 2
 
+    @patch('src.libre_automate_py.officeLoader.Lo')
+    def test_configure(self, mock_lo):
+        """测试连接参数传给 ConnectSocket"""
+        OfficeLoader.configure(port=2005)
+        OfficeLoader()
+        mock_lo.ConnectSocket.assert_called_once_with(port=2005)
+
+    @patch('src.libre_automate_py.officeLoader.multiprocessing')
+    @patch('src.libre_automate_py.officeLoader.Lo')
+    def test_init_worker(self, mock_lo, mock_mp):
+        """测试工作进程按序号分配端口并启动 office"""
+        counter = MagicMock()
+        counter.value = 1
+
+        _init_worker(counter, 2003, {'headless': True})
+
+        assert counter.value == 2
+        mock_lo.ConnectSocket.assert_called_once_with(port=2004, headless=True)
+        mock_lo.load_office.assert_called_once_with(mock_lo.ConnectSocket.return_value,
+                                                    cache_obj=OfficeLoader._cache_obj)
+        mock_mp.util.Finalize.assert_called_once_with(None, OfficeLoader.close, exitpriority=10)
+
+    @patch('src.libre_automate_py.officeLoader.multiprocessing')
+    @patch('src.libre_automate_py.officeLoader.Cache')
+    @patch('src.libre_automate_py.officeLoader.Lo')
+    def test_init_worker_profiles(self, mock_lo, mock_cache, mock_mp):
+        """测试每个工作进程使用独立的新建用户配置目录，不会连到同一个 soffice"""
+        mock_cache.side_effect = lambda **kwargs: MagicMock()
+        counter = MagicMock()
+        counter.value = 0
+        profiles = []
+        for _ in range(2):
+            _init_worker(counter, 2003, {})
+            profiles.append(mock_lo.load_office.call_args[1]['cache_obj'])
+            OfficeLoader.close()
+
+        assert mock_cache.call_args_list == [mock.call(profile_path='')] * 2
+        assert profiles[0] is not profiles[1]
+
+    @patch('src.libre_automate_py.officeLoader.multiprocessing')
+    def test_office_pool(self, mock_mp):
+        """测试进程池使用 spawn 并在退出时等待工作进程结束"""
+        ctx = mock_mp.get_context.return_value
+        pool = ctx.Pool.return_value
+        pool.imap.return_value = iter(['a', 'b'])
+
+        with OfficePool(workers=3, base_port=2100) as office_pool:
+            assert list(office_pool.imap(str, [1, 2])) == ['a', 'b']
+
+        mock_mp.get_context.assert_called_once_with('spawn')
+        args, kwargs = ctx.Pool.call_args
+        assert args == (3,)
+        assert kwargs['initializer'] is _init_worker
+        assert kwargs['initargs'][1:] == (2100, {})
+        pool.close.assert_called_once()
+        pool.join.assert_called_once()
+
+
 
 # 测试数据
 class OfficeLoaderTestData:
@@ -208,4 +285,4 @@ class OfficeLoaderTestData:
                 'exception': TimeoutError("Connection timeout"),
                 'expected_error': TimeoutError
             }
-        ]
\ No newline at end of file
+        ]
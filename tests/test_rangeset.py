@@ -0,0 +1,102 @@
+import pytest
+import numpy as np
+from src.libre_automate_py.rangeset import CellRange, RangeSet
+
+
+class TestCellRange:
+    """测试单个矩形区域"""
+
+    def test_from_name(self):
+        """测试由区域名创建"""
+        rng = CellRange.from_name("B2:C5")
+        assert tuple(rng) == (1, 1, 2, 4)
+        assert rng.name == "B2:C5"
+        assert rng.size == 8
+
+        cell = CellRange.from_name("AA10")
+        assert tuple(cell) == (26, 9, 26, 9)
+
+        with pytest.raises(ValueError):
+            CellRange(2, 0, 1, 0)
+
+    def test_intersection_and_contains(self):
+        """测试相交与包含"""
+        a = CellRange.from_name("A1:C3")
+        b = CellRange.from_name("B2:D4")
+        assert a.intersection(b) == CellRange.from_name("B2:C3")
+        assert a.intersection(CellRange.from_name("E5:F6")) is None
+        assert a.contains(CellRange.from_name("B2:B3"))
+        assert not a.contains(b)
+        assert len({a, CellRange.from_name("A1:C3")}) == 1
+
+
+class TestRangeSet:
+    """测试区域集合的运算"""
+
+    def test_coalesce_vertical_runs(self):
+        """测试同一列上相邻的小区域合并为一个"""
+        ranges = RangeSet(f"A{i}" for i in range(5, 105))
+        merged = ranges.coalesce()
+        assert merged.names() == ["A5:A104"]
+
+    def test_coalesce_rectangle(self):
+        """测试相邻的行块合并为矩形，重叠部分不重复计数"""
+        ranges = RangeSet(["A1:C1", "A2:C2", "B2:C3", "A3:A3"])
+        merged = ranges.coalesce()
+        assert merged.names() == ["A1:C3"]
+        assert ranges.cell_count == 9
+
+    def test_union(self):
+        """测试并集"""
+        result = RangeSet(["A1:B2"]) | RangeSet(["C1:C2"])
+        assert result.names() == ["A1:C2"]
+
+    def test_intersection(self):
+        """测试交集"""
+        result = RangeSet(["A1:C3"]) & ["B2:D4", "A1"]
+        assert sorted(result.names()) == ["A1:A1", "B2:C3"]
+        assert len(RangeSet(["A1"]) & ["C3"]) == 0
+
+    def test_difference(self):
+        """测试差集"""
+        result = RangeSet(["A1:C3"]) - ["B2"]
+        assert result.cell_count == 8
+        assert len(result.intersection(["B2"])) == 0
+
+        # 减去自身为空
+        assert len(RangeSet(["A1:C3"]) - ["A1:C3"]) == 0
+
+    def test_add_and_iter(self):
+        """测试追加区域与遍历"""
+        ranges = RangeSet()
+        ranges.add("A1:A2")
+        ranges.add(CellRange(1, 0, 1, 1))
+        ranges.add((2, 0, 2, 1))
+        assert [tuple(r) for r in ranges] == [(0, 0, 0, 1), (1, 0, 1, 1), (2, 0, 2, 1)]
+        assert ranges.coalesce().names() == ["A1:C2"]
+
+    def test_random_against_raster(self):
+        """随机区域的集合运算结果与逐格计算一致"""
+        rng = np.random.default_rng(7)
+
+        def random_rects(n):
+            starts = rng.integers(0, 20, size=(n, 2))
+            sizes = rng.integers(0, 6, size=(n, 2))
+            return [(int(c), int(r), int(c + w), int(r + h)) for (c, r), (w, h) in zip(starts, sizes)]
+
+        def raster(rects):
+            grid = np.zeros((30, 30), dtype=bool)
+            for c1, r1, c2, r2 in rects:
+                grid[r1:r2 + 1, c1:c2 + 1] = True
+            return grid
+
+        for _ in range(20):
+            a, b = random_rects(15), random_rects(15)
+            set_a, set_b = RangeSet(a), RangeSet(b)
+            assert np.array_equal(raster(tuple(r) for r in set_a | set_b), raster(a) | raster(b))
+            assert np.array_equal(raster(tuple(r) for r in set_a & set_b), raster(a) & raster(b))
+            assert np.array_equal(raster(tuple(r) for r in set_a - set_b), raster(a) & ~raster(b))
+            # 合并后的矩形互不重叠
+            merged = set_a.coalesce()
+            assert merged.cell_count == int(raster(a).sum())
+            assert sum(r.size for r in merged) == int(raster(a).sum())
@@ -0,0 +1,84 @@
+import pytest
+from src.libre_automate_py.sheet_buffer import SheetBuffer
+
+
+class TestSheetBuffer:
+    """测试延迟写入缓冲区"""
+
+    def test_set_and_get(self):
+        """测试写入后直接从缓冲区读取"""
+        buffer = SheetBuffer()
+        assert not buffer
+
+        buffer.set_value(1, 2, 'x')
+        buffer.set_value(1, 2, 'y')  # 覆盖
+        assert buffer
+        assert buffer.get(1, 2) == 'y'
+        assert buffer.get(0, 0, default=None) is None
+        with pytest.raises(KeyError):
+            buffer.get(0, 0)
+
+    def test_value_blocks_coalesce(self):
+        """测试相邻值合并为矩形块，公式单独成块"""
+        buffer = SheetBuffer()
+        buffer.set_block(0, 0, (('a', 1.0), ('b', 2.0)))
+        buffer.set_value(2, 0, '=SUM(B1:B2)', formula=True)
+        buffer.set_value(0, 5, 'c')
+
+        blocks = buffer.value_blocks()
+
+        assert blocks == [
+            (False, [0, 0, 1, 1], (('a', 1.0), ('b', 2.0))),
+            (False, [0, 5, 0, 5], (('c',),)),
+            (True, [2, 0, 2, 0], (('=SUM(B1:B2)',),)),
+        ]
+
+    def test_value_blocks_text_starting_with_equals(self):
+        """测试普通写入的 '=' 开头文本按值写入，只有公式写入才按公式处理"""
+        buffer = SheetBuffer()
+        buffer.set_block(0, 0, (('=不是公式',),))
+        buffer.set_value(1, 0, '=A1', formula=True)
+        buffer.set_value(1, 0, '=A1')  # 按值覆盖后不再是公式
+
+        blocks = buffer.value_blocks()
+
+        assert blocks == [(False, [0, 0, 1, 0], (('=不是公式', '=A1'),))]
+        buffer.clear()
+        assert not buffer.formulas
+
+    def test_overlay(self):
+        """测试用待写值覆盖读取结果"""
+        buffer = SheetBuffer()
+        buffer.set_value(1, 1, 'new')
+        buffer.set_value(9, 9, 'outside')
+
+        result = buffer.overlay(0, 0, (('a', 'b'), ('c', 'd')))
+
+        assert result == (('a', 'b'), ('c', 'new'))
+
+    def test_merge_dedup(self):
+        """测试合并计划去重与覆盖"""
+        buffer = SheetBuffer()
+        buffer.add_merge(0, 0, 0, 1)
+        buffer.add_merge(0, 0, 0, 1)
+        buffer.add_merge(0, 2, 0, 3)
+        assert list(buffer.merges) == [(0, 0, 0, 1), (0, 2, 0, 3)]
+
+        # 更大的区域替换被覆盖的计划
+        buffer.add_merge(0, 0, 0, 3)
+        assert list(buffer.merges) == [(0, 0, 0, 3)]
+
+        # 被覆盖的计划直接忽略
+        buffer.add_merge(0, 1, 0, 2)
+        assert list(buffer.merges) == [(0, 0, 0, 3)]
+
+    def test_extent_and_clear(self):
+        """测试待写区域范围与清空"""
+        buffer = SheetBuffer()
+        assert buffer.extent() is None
+        buffer.set_block(2, 3, (('a', 'b'),))
+        buffer.add_border("A1:B2")
+        assert buffer.extent() == [3, 3]
+
+        buffer.clear()
+        assert not buffer
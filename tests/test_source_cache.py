@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+from src.libre_automate_py.source_cache import SourceCache
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'src.xlsx'
+    path.write_bytes(b'source v1')
+    return str(path)
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        '机构': pd.array(['甲', None], dtype='string'),
+        '金额': [1.5, None],
+        '笔数': pd.array([1, None], dtype='Int64'),
+        '日期': pd.to_datetime(['2024-01-01', None]),
+    })
+
+
+class TestSourceCache:
+    """测试磁盘列式缓存"""
+
+    def test_load_hits_cache(self, tmp_path, source, frame):
+        """测试第二次读取不调用加载函数，内容变化后重新加载"""
+        cache = SourceCache(str(tmp_path / 'cache'))
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return frame
+
+        frame.attrs['date_formats'] = {'日期': ['%Y年%m月%d日', False]}
+        first = cache.load(source, loader, header='auto')
+        second = cache.load(source, loader, header='auto')
+        assert calls == [1]
+        assert second.attrs == frame.attrs
+        pd.testing.assert_frame_equal(first, frame)
+        pd.testing.assert_frame_equal(second, frame)
+
+        cache.load(source, loader, header=0)  # 读取参数不同
+        assert calls == [1, 1]
+
+        with open(source, 'wb') as f:
+            f.write(b'source v2')
+        cache.load(source, loader, header='auto')
+        assert calls == [1, 1, 1]
+
+    def test_column_names(self, tmp_path):
+        """测试非字符串和重复列名"""
+        cache = SourceCache(str(tmp_path / 'cache'))
+        df = pd.DataFrame([[1.0, 2.0, 3.0]], columns=[0, 'a', 'a'])
+        assert cache.put('k', df)
+        assert list(cache.get('k').columns) == [0, 'a', 'a']
+        assert cache.get('missing') is None
+
+    def test_mixed_column_not_cached(self, tmp_path):
+        """测试 Arrow 无法表示的列不缓存"""
+        cache = SourceCache(str(tmp_path / 'cache'))
+        assert not cache.put('k', pd.DataFrame({'x': [1.0, 'a']}))
+        assert cache.get('k') is None
+
+    def test_evict_lru(self, tmp_path, frame):
+        """测试超过容量时淘汰最久未使用的条目"""
+        cache = SourceCache(str(tmp_path / 'cache'), max_bytes=10 ** 9)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, frame)
+        os.utime(cache._path('a'), ns=(1, 1))
+        os.utime(cache._path('b'), ns=(2, 2))
+        size = os.path.getsize(cache._path('c'))
+
+        cache.max_bytes = size * 2
+        cache.evict()
+        assert cache.get('a') is None
+        assert cache.get('b') is not None
+        assert cache.get('c') is not None
+
+    def test_get_maps_numeric_columns(self, tmp_path):
+        """测试没有缺失值的数值列直接引用内存映射的数据，不复制"""
+        cache = SourceCache(str(tmp_path / 'cache'))
+        frame = pd.DataFrame({'a': np.arange(1000, dtype=np.float64), 'b': np.arange(1000, dtype=np.int64),
+                              'c': ['x'] * 1000})
+        assert cache.put('k', frame)
+
+        result = cache.get('k')
+
+        pd.testing.assert_frame_equal(result, frame)
+        assert not result['a'].to_numpy().flags.writeable
+        assert not result['b'].to_numpy().flags.writeable
@@ -1,9 +1,93 @@
 import pytest
 from unittest.mock import patch, MagicMock
+import pandas as pd
 from typing import Sequence
 from src.libre_automate_py.word import Word
 
 
+class FakeEnumeration:
+    def __init__(self, items):
+        self._items = list(items)
+
+    def hasMoreElements(self):
+        return bool(self._items)
+
+    def nextElement(self):
+        return self._items.pop(0)
+
+
+class FakePortion:
+    def __init__(self, text, kind='Text'):
+        self.text = text
+        self.kind = kind
+
+    def getString(self):
+        return self.text
+
+    def getPropertyValue(self, name):
+        return {'TextPortionType': self.kind, 'CharStyleName': ''}[name]
+
+
+class FakeParagraph:
+    def __init__(self, text, style='Standard'):
+        self.text = text
+        self.style = style
+
+    def supportsService(self, name):
+        return False
+
+    def getString(self):
+        return self.text
+
+    def getPropertyValue(self, name):
+        return {'ParaStyleName': self.style}[name]
+
+    def createEnumeration(self):
+        return FakeEnumeration([FakePortion(self.text)])
+
+
+class FakeText:
+    def __init__(self, *elements):
+        self.elements = elements
+
+    def createEnumeration(self):
+        return FakeEnumeration(self.elements)
+
+
+class FakeTable:
+    def __init__(self, cells):
+        self.cells = cells
+
+    def supportsService(self, name):
+        return name == "com.sun.star.text.TextTable"
+
+    def getCellNames(self):
+        return tuple(self.cells)
+
+    def getCellByName(self, name):
+        return self.cells[name]
+
+
+def make_template_doc():
+    """正文两段加一个表格，页脚含一个占位符"""
+    body = FakeText(
+        FakeParagraph("贷款余额$(a1)亿元，较上月$(a2)。"),
+        FakeTable({'A1': FakeText(FakeParagraph("合计")), 'B1': FakeText(FakeParagraph("$(a3)"))}),
+        FakeParagraph("无占位符"),
+    )
+    footer = FakeText(FakeParagraph("数据日期：$(date)"))
+    style = MagicMock()
+    style.getPropertyValue.side_effect = lambda name: {
+        'HeaderIsOn': False, 'FooterIsOn': True, 'FooterText': footer}[name]
+    styles = MagicMock()
+    styles.getElementNames.return_value = ('Default Page Style',)
+    styles.getByName.return_value = style
+    doc = MagicMock()
+    doc.component.getText.return_value = body
+    doc.component.getStyleFamilies.return_value.getByName.return_value = styles
+    return doc
+
+
 class TestWord:
     """测试Word类的文档操作功能"""
     
@@ -207,6 +291,314 @@ class TestWord:
         mock_replaceable.replaceAll.assert_called_once_with(mock_replace_desc)
 
 
+    @patch('src.libre_automate_py.word.Lo')
+    def test_replace_many(self, mock_lo):
+        """测试一次扫描替换多个标签并报告未出现的标签"""
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        mock_searchable = MagicMock()
+        mock_search_desc = MagicMock()
+        word.doc.qi.return_value = mock_searchable
+        mock_searchable.createSearchDescriptor.return_value = mock_search_desc
+
+        hits = [MagicMock(), MagicMock(), MagicMock()]
+        for hit, text in zip(hits, ["$(a1)", "$(a10)", "$(a1)"]):
+            hit.getString.return_value = text
+        mock_matches = MagicMock()
+        mock_matches.getCount.return_value = 3
+        mock_matches.getByIndex.side_effect = lambda i: hits[i]
+        mock_searchable.findAll.return_value = mock_matches
+        mock_lo.qi.side_effect = lambda _, obj: obj
+
+        replaced, unmatched = word.replace_many({"$(a1)": "1.00", "$(a10)": 2, "$(a2)": "x", "": "y"})
+
+        assert replaced == 3
+        assert unmatched == ["$(a2)"]
+        hits[0].setString.assert_called_once_with("1.00")
+        hits[1].setString.assert_called_once_with("2")
+        mock_searchable.findAll.assert_called_once_with(mock_search_desc)
+        pattern = mock_search_desc.setSearchString.call_args[0][0]
+        assert pattern.index("a10") < pattern.index("a1\\)")
+        mock_search_desc.setPropertyValue.assert_called_once_with("SearchRegularExpression", True)
+        word.doc.component.unlockControllers.assert_called_once()
+
+    def test_build_placeholder_index(self):
+        """测试扫描正文、表格和页脚中的占位符位置"""
+        word = Word.__new__(Word)
+        word.doc = make_template_doc()
+
+        index = word.build_placeholder_index()
+
+        assert index == [
+            {'label': '$(a1)', 'path': ['body', 0], 'start': 4, 'length': 5},
+            {'label': '$(a2)', 'path': ['body', 0], 'start': 15, 'length': 5},
+            {'label': '$(a3)', 'path': ['body', [1, 'B1'], 0], 'start': 0, 'length': 5},
+            {'label': '$(date)', 'path': ['footer:Default Page Style', 0], 'start': 5, 'length': 7},
+        ]
+        assert Word.missing_labels(index, {'$(a1)': 1, '$(x)': 2}) == ['$(a2)', '$(a3)', '$(date)']
+
+    def test_placeholder_index_cached(self, tmp_path):
+        """测试索引按文件摘要缓存，第二次不再扫描"""
+        doc_file = tmp_path / 'teml.doc'
+        doc_file.write_bytes(b'template')
+        word = Word.__new__(Word)
+        word.doc = make_template_doc()
+        word._input_fnm = str(doc_file)
+
+        first = word.placeholder_index(cache_dir=str(tmp_path / 'idx'))
+        word.build_placeholder_index = MagicMock()
+        second = word.placeholder_index(cache_dir=str(tmp_path / 'idx'))
+
+        assert second == first
+        word.build_placeholder_index.assert_not_called()
+
+    def test_fill_placeholders(self):
+        """测试按索引定位替换，同段落从后往前，过期位置退回 replace_many"""
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        paragraph = MagicMock()
+        word._root_texts = MagicMock(return_value={'body': FakeText(paragraph)})
+        word.placeholder_index = MagicMock(return_value=[
+            {'label': '$(a1)', 'path': ['body', 0], 'start': 4, 'length': 5},
+            {'label': '$(a2)', 'path': ['body', 0], 'start': 15, 'length': 5},
+            {'label': '$(a3)', 'path': ['body', 0], 'start': 30, 'length': 5},
+        ])
+        cursors = [MagicMock(), MagicMock()]
+        cursors[0].getString.return_value = '$(a2)'
+        cursors[1].getString.return_value = '已改动'  # 索引过期
+        paragraph.getText.return_value.createTextCursorByRange.side_effect = cursors
+        word.replace_many = MagicMock(return_value=(1, []))
+
+        replaced, missing, unmatched = word.fill_placeholders({'$(a1)': '1.00', '$(a2)': '2.00', '$(x)': 0})
+
+        assert replaced == 2
+        assert missing == ['$(a3)']
+        assert unmatched == ['$(x)']
+        cursors[0].goRight.assert_any_call(15, False)
+        cursors[0].setString.assert_called_once_with('2.00')
+        cursors[1].setString.assert_not_called()
+        word.replace_many.assert_called_once_with({'$(a1)': '1.00'})
+
+    @patch('src.libre_automate_py.word.Lo')
+    def test_find_all(self, mock_lo):
+        """测试多个短语一次搜索，偏移由上一处匹配累加"""
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        mock_searchable = MagicMock()
+        mock_search_desc = MagicMock()
+        word.doc.qi.return_value = mock_searchable
+        mock_searchable.createSearchDescriptor.return_value = mock_search_desc
+        hits = [MagicMock(), MagicMock(), MagicMock()]
+        for hit, text in zip(hits, ["风险", "不良", "风险"]):
+            hit.getString.return_value = text
+        mock_matches = MagicMock()
+        mock_matches.getCount.return_value = 3
+        mock_matches.getByIndex.side_effect = lambda i: hits[i]
+        mock_searchable.findAll.return_value = mock_matches
+        mock_lo.qi.side_effect = lambda _, obj: obj
+
+        cursor = word.doc.component.getText.return_value.createTextCursor.return_value
+        cursor.getString.side_effect = ["前文", "风险后的文字"]
+        cursor.gotoRange.side_effect = [None, None, RuntimeError("not in body text")]
+        view_cursor = word.doc.component.getCurrentController.return_value.getViewCursor.return_value
+        view_cursor.getPage.side_effect = [1, 2, 2]
+
+        result = word.find_all(["风险", "不良"])
+
+        assert [(m['text'], m['page'], m['offset']) for m in result] == [
+            ("风险", 1, 2), ("不良", 2, 8), ("风险", 2, None)]
+        assert result[0]['range'] is hits[0]
+        mock_searchable.findAll.assert_called_once_with(mock_search_desc)
+        mock_search_desc.setSearchString.assert_called_once_with("风险|不良")
+
+    @patch('src.libre_automate_py.word.Lo')
+    def test_format_all(self, mock_lo):
+        """测试对全部匹配设置字符属性"""
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        mock_searchable = MagicMock()
+        word.doc.qi.return_value = mock_searchable
+        hits = [MagicMock(), MagicMock()]
+        mock_matches = MagicMock()
+        mock_matches.getCount.return_value = 2
+        mock_matches.getByIndex.side_effect = lambda i: hits[i]
+        mock_searchable.findAll.return_value = mock_matches
+        mock_lo.qi.side_effect = lambda _, obj: obj
+
+        result = word.format_all("风险", CharWeight=150.0, CharColor=0xFF0000)
+
+        assert result == 2
+        for hit in hits:
+            hit.setPropertyValues.assert_called_once_with(("CharColor", "CharWeight"), (0xFF0000, 150.0))
+            hit.setPropertyValue.assert_not_called()
+        word.doc.component.unlockControllers.assert_called_once()
+
+    def test_iter_paragraphs(self):
+        """测试逐段产出，可选是否进入表格和页眉页脚"""
+        word = Word.__new__(Word)
+        word.doc = make_template_doc()
+
+        body_only = list(word.iter_paragraphs(include_tables=False))
+        assert [p['location'] for p in body_only] == [['body', 0], ['body', 2]]
+        assert body_only[1] == {'text': '无占位符', 'style': 'Standard', 'location': ['body', 2]}
+
+        everything = [p['text'] for p in word.iter_paragraphs(include_headers=True)]
+        assert everything == ["贷款余额$(a1)亿元，较上月$(a2)。", "合计", "$(a3)", "无占位符", "数据日期：$(date)"]
+
+        # 生成器可以提前停止
+        paragraphs = word.iter_paragraphs()
+        assert next(paragraphs)['location'] == ['body', 0]
+
+    def test_iter_text_portions(self):
+        """测试逐个产出文本片段"""
+        word = Word.__new__(Word)
+        word.doc = make_template_doc()
+
+        portions = list(word.iter_text_portions(include_tables=False))
+
+        assert portions[0] == {'text': "贷款余额$(a1)亿元，较上月$(a2)。", 'type': 'Text', 'style': '',
+                               'location': ['body', 0, 0]}
+        assert len(portions) == 2
+
+    def test_fill_table(self):
+        """测试一次插入所需行并整体写入表格"""
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        text_table = word.doc.component.getTextTables.return_value.getByName.return_value
+        rows = text_table.getRows.return_value
+        rows.getCount.return_value = 2
+        formats = word.doc.component.getNumberFormats.return_value
+        formats.queryKey.return_value = -1
+        formats.addNew.return_value = 42
+        df = pd.DataFrame({'客户': ['甲', '乙', '丙'], '贷款余额': [1.5, None, 3.0]})
+
+        result = word.fill_table('Table1', df, number_formats={'贷款余额': '#,##0.00'})
+
+        assert result == 3
+        rows.insertByIndex.assert_called_once_with(2, 2)
+        text_table.getCellRangeByPosition.assert_any_call(0, 1, 1, 3)
+        data_range = text_table.getCellRangeByPosition.return_value
+        data_range.setDataArray.assert_called_once_with((('甲', 1.5), ('乙', ''), ('丙', 3.0)))
+        text_table.getCellRangeByPosition.assert_any_call(1, 1, 1, 3)
+        data_range.setPropertyValue.assert_called_once_with("NumberFormat", 42)
+
+    def test_fill_table_no_grow(self):
+        """测试不允许扩展时行数不足报错"""
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        text_table = word.doc.component.getTextTables.return_value.getByIndex.return_value
+        text_table.getRows.return_value.getCount.return_value = 2
+
+        with pytest.raises(ValueError):
+            word.fill_table(0, pd.DataFrame({'a': [1.0, 2.0]}), grow=False)
+
+    @patch('src.libre_automate_py.word.Word.from_template')
+    def test_render_batch(self, mock_from_template):
+        """测试每行数据从模板生成一份文档"""
+        docs = [MagicMock(), MagicMock()]
+        mock_from_template.side_effect = docs
+        rows = pd.DataFrame({'$(机构)': ['昭阳', '鲁甸'], '$(余额)': [1.5, None]})
+
+        outputs = Word.render_batch('teml.doc', rows, 'out/{index}_{$(机构)}.docx')
+
+        assert outputs == ['out/0_昭阳.docx', 'out/1_鲁甸.docx']
+        mock_from_template.assert_any_call('teml.doc', filepath='out/1_鲁甸.docx', visible=False)
+        docs[1].replace_many.assert_called_once()
+        assert docs[1].replace_many.call_args[0][0] == {'$(机构)': '鲁甸', '$(余额)': ''}
+        for doc in docs:
+            doc.save.assert_called_once()
+            doc.close.assert_called_once()
+
+    @patch('src.libre_automate_py.word.OfficePool')
+    def test_render_batch_workers(self, mock_pool):
+        """测试多个工作进程时交给 OfficePool"""
+        pool = mock_pool.return_value.__enter__.return_value
+        pool.imap.return_value = iter(['a.docx'])
+
+        outputs = Word.render_batch('teml.doc', [{'$(a)': 1}], '{index}.docx', workers=2)
+
+        assert outputs == ['a.docx']
+        mock_pool.assert_called_once_with(2)
+        func, jobs = pool.imap.call_args[0]
+        assert list(jobs) == [('teml.doc', {'$(a)': 1}, '0.docx')]
+
+    @patch('src.libre_automate_py.word.PAGE_BEFORE', 'PAGE_BEFORE')
+    @patch('src.libre_automate_py.word.FileIO')
+    def test_append_documents(self, mock_fileio):
+        """测试逐篇插入文档，后续文档前分页"""
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        text = word.doc.component.getText.return_value
+        cursor = text.createTextCursor.return_value
+        cursor.getString.return_value = ''  # 空文档
+        mock_fileio.get_absolute_path.side_effect = lambda p: f"/abs/{p}"
+        mock_fileio.fnm_to_url.side_effect = lambda p: f"file://{p}"
+
+        result = word.append_documents(p for p in ['a.docx', 'b.docx', 'c.docx'])
+
+        assert result == 3
+        assert [c[0][0] for c in cursor.insertDocumentFromURL.call_args_list] == [
+            'file:///abs/a.docx', 'file:///abs/b.docx', 'file:///abs/c.docx']
+        assert text.insertControlCharacter.call_count == 2
+        assert cursor.setPropertyValue.call_args_list == [(("BreakType", 'PAGE_BEFORE'),)] * 2
+        word.doc.component.unlockControllers.assert_called_once()
+
+    @patch('src.libre_automate_py.word.FileIO')
+    def test_append_documents_page_style(self, mock_fileio):
+        """测试非空文档追加并指定页面样式"""
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        text = word.doc.component.getText.return_value
+        cursor = text.createTextCursor.return_value
+        cursor.getString.return_value = '已有内容'
+
+        word.append_documents(['a.docx'], page_style='Landscape')
+
+        text.insertControlCharacter.assert_called_once()
+        cursor.setPropertyValue.assert_called_once_with("PageDescName", 'Landscape')
+
+    def test_set_fields(self):
+        """测试一次遍历批量设置用户字段和输入字段"""
+        def make_field(service, **props):
+            field = MagicMock()
+            field.supportsService.side_effect = lambda name: name == service
+            field.getPropertyValue.side_effect = props.__getitem__
+            return field
+
+        master = MagicMock()
+        master.getPropertyValue.side_effect = {'Name': 'name'}.__getitem__
+        user1 = make_field("com.sun.star.text.textfield.User", TextFieldMaster=master)
+        user2 = make_field("com.sun.star.text.textfield.User", TextFieldMaster=master)
+        input_field = make_field("com.sun.star.text.textfield.Input", Hint='date')
+        other = make_field("com.sun.star.text.textfield.PageNumber")
+
+        word = Word.__new__(Word)
+        word.doc = MagicMock()
+        text_fields = word.doc.component.getTextFields.return_value
+        text_fields.createEnumeration.return_value = FakeEnumeration([user1, input_field, user2, other])
+
+        updated, unmatched = word.set_fields({'name': '张三', 'date': 20240101, 'missing': 1})
+
+        assert updated == 3
+        assert unmatched == ['missing']
+        master.setPropertyValue.assert_called_once_with("Content", '张三')
+        input_field.setPropertyValue.assert_called_once_with("Content", '20240101')
+        text_fields.refresh.assert_called_once()
+        word.doc.component.unlockControllers.assert_called_once()
+
+    @patch('src.libre_automate_py.word.load_from_bytes')
+    @patch('src.libre_automate_py.word.OfficeLoader')
+    @patch('src.libre_automate_py.word.WriteDoc')
+    def test_from_bytes_to_bytes(self, mock_writedoc, mock_office_loader, mock_load):
+        """测试经内存字节流打开和导出文档"""
+        word = Word.from_bytes(b'docx')
+        mock_load.assert_called_once_with(b'docx', filter=None, hidden=True, read_only=False)
+        assert word.doc is mock_writedoc.return_value
+
+        with patch('src.libre_automate_py.word.store_to_bytes', return_value=b'pdf') as mock_store:
+            assert word.to_bytes('pdf') == b'pdf'
+        mock_store.assert_called_once_with(word.doc.component, 'writer_pdf_Export')
+
 class WordTestData:
     """Word测试数据类"""
     
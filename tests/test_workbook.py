@@ -2,7 +2,7 @@ import pytest
 import pandas as pd
 from unittest.mock import patch, MagicMock, mock_open
 from typing import Tuple
-from src.libre_automate_py.workbook import Workbook
+from src.libre_automate_py.workbook import Workbook, CellRange, RangeSet, Grid
 
 
 class TestWorkbook:
@@ -182,6 +182,31 @@ class TestWorkbook:
         
         mock_sheet.set_array.assert_called_once_with(values=test_values, name="A1:B2")
     
+    def test_get_used_value_as_grid(self):
+        """测试以 Grid 形式读取"""
+        mock_sheet = MagicMock()
+        wb = Workbook.__new__(Workbook)
+        wb.doc = MagicMock()
+        wb.doc.sheets = [mock_sheet]
+        mock_sheet.get_array.return_value = (('a', 1.0), ('b', ''))
+
+        result = wb.get_used_value(0, "A1:B2", as_grid=True)
+
+        assert isinstance(result, Grid)
+        assert result.masks[1].tolist() == [False, True]
+        assert result.to_rows() == (('a', 1.0), ('b', ''))
+
+    def test_set_array_value_grid(self):
+        """测试写入 Grid"""
+        mock_sheet = MagicMock()
+        wb = Workbook.__new__(Workbook)
+        wb.doc = MagicMock()
+        wb.doc.sheets = [mock_sheet]
+
+        wb.set_array_value(0, Grid.from_rows((('a', 1.0), ('b', ''))), "A1:B2")
+
+        mock_sheet.set_array.assert_called_once_with(values=(('a', 1.0), ('b', '')), name="A1:B2")
+
     @patch('src.libre_automate_py.workbook.convert_range_name_to_list')
     @patch('src.libre_automate_py.workbook.Side')
     @patch('src.libre_automate_py.workbook.CommonColor')
@@ -227,6 +252,312 @@ class TestWorkbook:
         # 验证get_range被调用（具体调用次数取决于需要合并的区域数量）
         assert mock_sheet.get_range.call_count >= 0
 
+    def test_set_formulas(self):
+        """测试批量写入公式（按连续块写入并延迟重算）"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+        mock_range = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.get_sheet.return_value = mock_sheet
+        mock_sheet.get_range.return_value = mock_range
+        mock_doc.component.isAutomaticCalculationEnabled.return_value = True
+
+        wb.set_formulas(0, {'B4': '=SUM(B5:B9)', 'C4': '=SUM(C5:C9)', 'D4': '=SUM(D5:D9)'})
+
+        # 三个相邻单元格只需要一次区域写入
+        mock_sheet.get_range.assert_called_once_with(col_start=1, row_start=3, col_end=3, row_end=3)
+        mock_range.component.setFormulaArray.assert_called_once_with(
+            (('=SUM(B5:B9)', '=SUM(C5:C9)', '=SUM(D5:D9)'),)
+        )
+        mock_doc.component.enableAutomaticCalculation.assert_any_call(False)
+        mock_doc.component.enableAutomaticCalculation.assert_called_with(True)
+
+    def test_sum_cols(self):
+        """测试多列求和只查询一次已使用区域"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+        mock_range = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.get_sheet.return_value = mock_sheet
+        wb.doc.sheets = [mock_sheet]
+        mock_sheet.get_range.return_value = mock_range
+        mock_sheet.find_used_range_obj.return_value.end_row_index = 19
+
+        wb.sum_cols(0, ['F4', 'G4'])
+
+        mock_sheet.find_used_range_obj.assert_called_once()
+        mock_range.component.setFormulaArray.assert_called_once_with((('=SUM(F5:F20)', '=SUM(G5:G20)'),))
+
+    @patch('src.libre_automate_py.workbook.os.path.getmtime')
+    @patch('src.libre_automate_py.workbook.OfficeLoader')
+    @patch('src.libre_automate_py.workbook.CalcDoc')
+    @patch('src.libre_automate_py.workbook.FileIO')
+    def test_from_template_parses_once(self, mock_fileio, mock_calcdoc, mock_office_loader, mock_getmtime):
+        """测试同一模板只解析一次，之后在内存中克隆"""
+        Workbook._templates.clear()
+        mock_office_loader.return_value.get_loader.return_value = MagicMock()
+        mock_fileio.get_absolute_path.return_value = "/abs/template.xlsx"
+        mock_getmtime.return_value = 1.0
+
+        template_doc = MagicMock()
+        template_doc.component.getSheets.return_value.getElementNames.return_value = ('封面', '明细')
+        mock_calcdoc.open_doc.return_value = template_doc
+        new_doc = MagicMock()
+        new_sheets = new_doc.component.getSheets.return_value
+        new_sheets.getElementNames.return_value = ('Sheet1',)
+        mock_calcdoc.create_doc.return_value = new_doc
+
+        wb1 = Workbook.from_template("template.xlsx", filepath="out1.xlsx")
+        wb2 = Workbook.from_template("template.xlsx", filepath="out2.xlsx")
+
+        mock_calcdoc.open_doc.assert_called_once()
+        assert wb1._filepath == "out1.xlsx"
+        assert wb2.doc is new_doc
+        new_sheets.importSheet.assert_any_call(template_doc.component, '明细', 1)
+        new_sheets.removeByName.assert_called_with("__blank_0")
+
+        Workbook.release_templates()
+        template_doc.close_doc.assert_called_once()
+        assert Workbook._templates == {}
+
+    def test_templates_released_on_office_close(self):
+        """测试关闭 office 时清空模板缓存，新实例不会复用失效的文档"""
+        from src.libre_automate_py.workbook import OfficeLoader
+        template_doc = MagicMock()
+        Workbook._templates[(1, '/abs/template.xlsx', 1.0)] = template_doc
+
+        with patch.object(OfficeLoader, '_instance', MagicMock()), patch('officeLoader.Lo') as mock_lo:
+            OfficeLoader.close()
+
+        template_doc.close_doc.assert_called_once()
+        mock_lo.close_office.assert_called_once()
+        assert Workbook._templates == {}
+
+    @patch('src.libre_automate_py.workbook.load_from_bytes')
+    @patch('src.libre_automate_py.workbook.OfficeLoader')
+    @patch('src.libre_automate_py.workbook.CalcDoc')
+    def test_from_bytes(self, mock_calcdoc, mock_office_loader, mock_load):
+        """测试从内存中的文件内容打开工作簿"""
+        wb = Workbook.from_bytes(b'xlsx', filter='Calc MS Excel 2007 XML', read_only=True)
+
+        mock_load.assert_called_once_with(b'xlsx', filter='Calc MS Excel 2007 XML', hidden=True, read_only=True)
+        mock_calcdoc.assert_called_once_with(mock_load.return_value)
+        assert wb.doc is mock_calcdoc.return_value
+        assert wb._filepath is None
+
+    @patch('src.libre_automate_py.workbook.store_to_bytes')
+    def test_to_bytes(self, mock_store):
+        """测试按目标格式导出为字节串"""
+        wb = Workbook.__new__(Workbook)
+        wb.doc = MagicMock()
+        mock_store.return_value = b'data'
+
+        assert wb.to_bytes('PDF') == b'data'
+        mock_store.assert_called_once_with(wb.doc.component, 'calc_pdf_Export')
+        with pytest.raises(ValueError):
+            wb.to_bytes('docx')
+
+    def test_write_pandas_diff(self):
+        """测试差异写入只写变化的单元格"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.sheets = [mock_sheet]
+
+        mock_sheet.find_used_range_obj.return_value.end_row_index = 10
+        mock_sheet.find_used_range_obj.return_value.end_col_index = 10
+        mock_sheet.get_array.return_value = (
+            ('甲行', 100.0, 1.0),
+            ('乙行', 200.0, 2.0),
+            ('丙行', 300.0, ''),
+        )
+        data = pd.DataFrame({
+            'name': ['甲行', '乙行', '丙行'],
+            'amount': [100.0, 250.0, 300.0],
+            'count': [1.0, 5.0, None],
+        })
+
+        changed = wb.set_pandas_range(data, 0, 'A5', diff=True)
+
+        assert changed == 2
+        mock_sheet.get_array.assert_called_once_with(range_name="A5:C7")
+        # 同一行相邻的两个变化合并为一次写入
+        mock_sheet.set_array.assert_called_once_with(values=[[250.0, 5.0]], name="B6:C6")
+
+    def test_write_pandas_diff_unchanged(self):
+        """测试数据未变化时不写入"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.sheets = [mock_sheet]
+
+        mock_sheet.find_used_range_obj.return_value.end_row_index = 10
+        mock_sheet.find_used_range_obj.return_value.end_col_index = 10
+        mock_sheet.get_array.return_value = (('a', 1.0),)
+
+        assert wb.write_pandas_diff(pd.DataFrame({'x': ['a'], 'y': [1]}), 0, 'A1') == 0
+        mock_sheet.set_array.assert_not_called()
+
+    def test_append_dataframe_with_footer(self):
+        """测试在表尾前追加数据并延伸合计公式"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+        mock_block = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.sheets = [mock_sheet]
+        wb.doc.get_sheet.return_value = mock_sheet
+        mock_doc.component.isAutomaticCalculationEnabled.return_value = True
+
+        # 锚定列最后一行数据在第 10 行（索引 9），表尾在第 11 行
+        anchor_addr = MagicMock(EndRow=9)
+        formula_addr = MagicMock(StartColumn=5, StartRow=10, EndColumn=5, EndRow=10)
+        mock_range = mock_sheet.get_range.return_value
+        mock_range.component.queryContentCells.return_value.getRangeAddresses.side_effect = [
+            (anchor_addr,), (formula_addr,)
+        ]
+        mock_sheet.find_used_range_obj.return_value.end_row_index = 10
+        mock_sheet.component.getCellRangeByPosition.return_value = mock_block
+        mock_block.getFormulaArray.return_value = (('=SUM(F5:F10)',),)
+
+        data = pd.DataFrame({'上报时间': ['2025年3月', '2025年3月'], '金额': [1.0, None]})
+        written = wb.append_dataframe(0, data, anchor_col='A')
+
+        assert written == "A11:B12"
+        mock_sheet.component.getRows.return_value.insertByIndex.assert_called_once_with(10, 2)
+        mock_sheet.set_array.assert_called_once_with(
+            values=[['2025年3月', 1.0], ['2025年3月', '']], name="A11:B12"
+        )
+        mock_range.component.setFormulaArray.assert_called_once_with((('=SUM(F5:F12)',),))
+
+    @patch('src.libre_automate_py.workbook.FORMULA', 16)
+    @patch('src.libre_automate_py.workbook.STRING', 4)
+    @patch('src.libre_automate_py.workbook.DATETIME', 2)
+    @patch('src.libre_automate_py.workbook.VALUE', 1)
+    def test_append_dataframe_footer_formula_in_anchor_col(self):
+        """测试锚定列中的表尾公式不算作最后一行数据，新数据写在表尾之前"""
+        mock_sheet = MagicMock()
+        wb = Workbook.__new__(Workbook)
+        wb.doc = MagicMock()
+        wb.doc.sheets = [mock_sheet]
+        wb.doc.get_sheet.return_value = mock_sheet
+
+        # A1:A10 为数据，A11 为合计公式 =COUNTA(A2:A10)
+        mock_range = mock_sheet.get_range.return_value
+        mock_range.component.queryContentCells.return_value.getRangeAddresses.side_effect = [
+            (MagicMock(EndRow=9),), ()
+        ]
+        mock_sheet.find_used_range_obj.return_value.end_row_index = 10
+
+        written = wb.append_dataframe(0, pd.DataFrame({'a': ['x']}), anchor_col='A')
+
+        assert mock_range.component.queryContentCells.call_args_list[0][0] == (1 | 2 | 4,)
+        assert written == "A11:A11"
+        mock_sheet.component.getRows.return_value.insertByIndex.assert_called_once_with(10, 1)
+
+    def test_deferred_writes_flush_in_blocks(self):
+        """测试延迟模式下的写入合并为批量调用"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.sheets = [mock_sheet]
+        wb.doc.get_sheet.return_value = mock_sheet
+        mock_doc.component.isAutomaticCalculationEnabled.return_value = True
+
+        wb.defer()
+        wb.set_val(0, 'A1', 0.5)
+        wb.set_val(0, 'B1', 1.0)
+        wb.set_array_value(0, (('y', 2.0),), 'A2')
+        wb.set_val(0, 'B2', 3.0)  # 覆盖尚未写入的值
+        wb.set_formulas(0, {'C1': '=SUM(B1:B2)'})
+
+        # 读取待写单元格直接命中缓冲区
+        assert wb.get_val(0, 'B2') == 3.0
+        mock_sheet.set_array.assert_not_called()
+
+        wb.flush()
+
+        mock_sheet.set_array.assert_called_once_with(values=((0.5, 1.0), ('y', 3.0)), name="A1:B2")
+        mock_sheet.get_range.return_value.component.setFormulaArray.assert_called_once_with((('=SUM(B1:B2)',),))
+
+    def test_deferred_sum_col_writes_formula(self):
+        """测试延迟模式下 sum_col 和 set_val 的字符串与直接写入一样按公式写入"""
+        mock_sheet = MagicMock()
+        wb = Workbook.__new__(Workbook)
+        wb.doc = MagicMock()
+        wb.doc.sheets = [mock_sheet]
+        wb.doc.get_sheet.return_value = mock_sheet
+        wb.doc.component.isAutomaticCalculationEnabled.return_value = True
+        mock_sheet.find_used_range_obj.return_value.end_col_index = 5
+        mock_sheet.find_used_range_obj.return_value.end_row_index = 19
+
+        wb.defer()
+        wb.sum_col(0, 'F4')
+        wb.set_val(0, 'H4', '=F4*2')
+        wb.set_array_value(0, (('=不是公式',),), 'J4')
+        wb.flush()
+
+        formula_calls = mock_sheet.get_range.return_value.component.setFormulaArray.call_args_list
+        assert [c[0][0] for c in formula_calls] == [(('=SUM(F5:F20)',),), (('=F4*2',),)]
+        mock_sheet.set_array.assert_called_once_with(values=(('=不是公式',),), name="J4:J4")
+
+    def test_deferred_merges_are_deduplicated(self):
+        """测试延迟模式下重复和被覆盖的合并计划只执行一次"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.sheets = [mock_sheet]
+        wb.doc.get_sheet.return_value = mock_sheet
+
+        wb.defer()
+        wb.merge_cells_by_index(0, 'A1', [1, 1, 2, 2])
+        wb.merge_cells_by_index(0, 'A1', [1, 1, 2, 2])
+        wb.merge_cells_by_index(0, 'A1', [1, 1, 1, 1])
+        wb.flush()
+
+        mock_sheet.get_range.assert_called_once_with(col_start=0, row_start=0, col_end=0, row_end=3)
+
+    def test_merge_ranges_accepts_range_objects(self):
+        """测试合并接口直接接受区域对象"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.get_sheet.return_value = mock_sheet
+
+        wb.merge_ranges(0, [CellRange(0, 4, 0, 6), "B5:B6"])
+
+        assert mock_sheet.get_range.call_args_list[0].kwargs == dict(col_start=0, row_start=4, col_end=0, row_end=6)
+        assert mock_sheet.get_range.call_args_list[1].kwargs == dict(col_start=1, row_start=4, col_end=1, row_end=5)
+
+    @patch('src.libre_automate_py.workbook.FormatterTable')
+    def test_formatter_range_with_range_set(self, mock_formatter_table):
+        """测试边框格式化接受区域集合"""
+        mock_doc = MagicMock()
+        mock_sheet = MagicMock()
+
+        wb = Workbook.__new__(Workbook)
+        wb.doc = mock_doc
+        wb.doc.sheets = [mock_sheet]
+
+        wb.formatter_range(0, RangeSet(["A5:C5", "A6:C6", "A7:C9"]).coalesce())
+
+        mock_sheet.get_range.assert_called_once_with(range_name="A5:C9")
+
 
 class WorkbookTestData:
     """Workbook测试数据类"""
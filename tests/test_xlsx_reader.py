@@ -0,0 +1,65 @@
+import zipfile
+from src.libre_automate_py.xlsx_reader import read_xlsx_rows
+
+
+def _replace_member(path, name, content):
+    # 重写 zip 中的一个文件
+    with zipfile.ZipFile(path) as archive:
+        members = {n: archive.read(n) for n in archive.namelist()}
+    members[name] = content
+    with zipfile.ZipFile(path, 'w') as archive:
+        for n, data in members.items():
+            archive.writestr(n, data)
+
+
+class TestXlsxReader:
+    """测试不依赖 soffice 的 xlsx 读取"""
+
+    def test_read_rows(self, make_xlsx):
+        """测试共享字符串、数值和空单元格"""
+        path = make_xlsx('a.xlsx', [
+            ['标题', '', ''],
+            ['Name', 'Age', 'City'],
+            ['Alice', 25, ''],
+        ])
+        assert read_xlsx_rows(path) == (
+            ('标题', '', ''),
+            ('Name', 'Age', 'City'),
+            ('Alice', 25.0, ''),
+        )
+
+    def test_max_rows(self, make_xlsx):
+        """测试只读取前几行"""
+        path = make_xlsx('b.xlsx', [['a', 'b']] + [[i, i] for i in range(100)])
+        assert read_xlsx_rows(path, max_rows=2) == (('a', 'b'), (0.0, 0.0))
+
+    def test_trims_leading_empty_rows_and_columns(self, make_xlsx):
+        """测试数据不从 A1 开始时与已使用区域对齐"""
+        path = make_xlsx('c.xlsx', [
+            ['', '', ''],
+            ['', 'Name', 'Age'],
+            ['', 'Alice', 25],
+            ['', 'Bob', 30],
+        ])
+        assert read_xlsx_rows(path) == (('Name', 'Age'), ('Alice', 25.0), ('Bob', 30.0))
+        assert read_xlsx_rows(path, max_rows=2) == (('Name', 'Age'), ('Alice', 25.0))
+
+    def test_phonetic_runs_skipped(self, make_xlsx):
+        """测试富文本按片段拼接，注音 rPh 不计入文本"""
+        path = make_xlsx('d.xlsx', [['x', 'y']])
+        main = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+        _replace_member(path, 'xl/sharedStrings.xml',
+                        f'<sst xmlns="{main}">'
+                        f'<si><t>東京</t><rPh sb="0" eb="2"><t>トウキョウ</t></rPh><phoneticPr fontId="1"/></si>'
+                        f'<si><r><t>余</t></r><r><rPr><b/></rPr><t>额</t></r></si></sst>')
+        assert read_xlsx_rows(path) == (('東京', '余额'),)
+
+    def test_cells_without_reference(self, make_xlsx):
+        """测试省略 r 属性的单元格按前一个单元格的下一列对齐"""
+        path = make_xlsx('e.xlsx', [['x']])
+        main = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+        _replace_member(path, 'xl/worksheets/sheet1.xml',
+                        f'<worksheet xmlns="{main}"><sheetData><row r="1">'
+                        f'<c r="A1"><v>1</v></c><c r="C1"><v>3</v></c><c><v>4</v></c><c><v>5</v></c>'
+                        f'</row></sheetData></worksheet>')
+        assert read_xlsx_rows(path) == ((1.0, '', 3.0, 4.0, 5.0),)